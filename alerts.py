@@ -0,0 +1,234 @@
+# ==========================================
+# 🚨 PRICE ALERTS (價位觸發警報)
+# ==========================================
+# stop_price / sniper_stop / VAL / POC / VAH / SMA200 原本只在每次執行時和收盤價比一次。
+# 這裡把整個觀察清單的關卡價位登記成「每個 Ticker 一個已排序的價位索引」：
+#   - 每來一個價格，以 bisect 找出上一個價格到這個價格之間被穿越的所有價位：O(log n + 命中數)，
+#     與清單大小無關 (暴力法每個 tick 要比對所有價位)
+#   - 穿越即發出事件 (例如跌破 ATR 止盈線 / 狙擊手止損、站回年線) 給各個 sink：stdout / JSON Lines 檔 / webhook
+#   - 同一個 Ticker 同一價位同一方向在 config.ALERT_COOLDOWN_MINUTES 內只發一次 (價格在關卡附近來回震盪時不洗版)
+# 價位取自本地行情庫在該交易日之前最後一根已收盤 K 棒 (panel_store + scanner.scan_panel，整個清單一次向量化算完)，
+# 價格來自 stream.py 的分鐘線 (SignalStream.subscribe(bars=True))。
+# 每個交易日的第一根分鐘線 (含啟動時) 先增量更新行情庫 (market_store.refresh)，再重算全部價位；
+# --poll 常駐跨日時，止盈 / 止損 / VAL / POC / 年線會跟著前一日收盤更新。
+#
+# 用法: python alerts.py --replay bars/ [--tickers SPY QQQ] [--universe-file sp500.txt] [--file alerts.jsonl] [--webhook URL] [--signals]
+#       python alerts.py --poll 60 [--no-refresh]
+import os
+import sys
+import json
+import queue
+import asyncio
+import argparse
+import threading
+import urllib.request
+from bisect import bisect_left, bisect_right
+import numpy as np
+import config
+
+# 價位種類 → (名稱, 向下穿越, 向上穿越)
+LEVELS = {
+    'stop_price': ('ATR 止盈線', "▼ 跌破 ATR 止盈線 (獲利了結)", "▲ 站回 ATR 止盈線"),
+    'sniper_stop': ('Sniper 止損', "▼ 跌破狙擊手止損", "▲ 站回狙擊手止損"),
+    'val': ('VAL', "▼ 跌破 VAL", "★ 站回 VAL"),
+    'poc': ('POC', "▼ 跌破 POC", "▲ 突破 POC"),
+    'vah': ('VAH', "▼ 跌回價值區 (VAH)", "▲ 突破 VAH"),
+    'sma200': ('SMA200', "🚨 跌破年線 (SMA200)", "▲ 站上年線 (SMA200)"),
+}
+
+# ==========================================
+# 1. 單一 Ticker 的價位索引
+# ==========================================
+class LevelIndex:
+    # levels: [(kind, price)]；價位排序後存成兩個平行的 list，供 bisect 使用
+    def __init__(self, levels=()):
+        items = sorted((float(p), kind) for kind, p in levels if p is not None and np.isfinite(p))
+        self.prices = [p for p, _ in items]
+        self.kinds = [k for _, k in items]
+
+    def __len__(self):
+        return len(self.prices)
+
+    def crossed(self, p0, p1):
+        # 上漲：p0 < 價位 <= p1；下跌：p1 <= 價位 < p0 → [(價位, kind, 'up' / 'down')] (依穿越順序)
+        if p1 > p0:
+            lo, hi = bisect_right(self.prices, p0), bisect_right(self.prices, p1)
+            return [(self.prices[i], self.kinds[i], 'up') for i in range(lo, hi)]
+        if p1 < p0:
+            lo, hi = bisect_left(self.prices, p1), bisect_left(self.prices, p0)
+            return [(self.prices[i], self.kinds[i], 'down') for i in reversed(range(lo, hi))]
+        return []
+
+# ==========================================
+# 2. 警報引擎
+# ==========================================
+class AlertEngine:
+    def __init__(self, sinks=(), cooldown_minutes=None):
+        self.sinks = list(sinks)
+        minutes = config.ALERT_COOLDOWN_MINUTES if cooldown_minutes is None else cooldown_minutes
+        self.cooldown = np.timedelta64(int(minutes * 60), 's')
+        self.indexes = {}   # ticker → LevelIndex
+        self.last = {}      # ticker → 上一個價格
+        self._fired = {}    # (ticker, kind, direction) → 上次發出的時間
+        self.ticks = 0
+        self.events = 0
+
+    def set_levels(self, ticker, levels, price=None):
+        # levels: {kind: 價位}；price: 價位計算時的收盤價 (第一個 tick 以此為起點，開盤跳空也會觸發)
+        self.indexes[ticker] = LevelIndex(levels.items())
+        if price is not None: self.last[ticker] = float(price)
+
+    def on_price(self, ticker, price, time=None):
+        # → 這個價格觸發的事件 (list)；time: 行情時間 (datetime64，用於冷卻)
+        self.ticks += 1
+        price = float(price)
+        prev = self.last.get(ticker)
+        self.last[ticker] = price
+        index = self.indexes.get(ticker)
+        if index is None or prev is None: return []
+        events = []
+        for level, kind, direction in index.crossed(prev, price):
+            key = (ticker, kind, direction)
+            if time is not None:
+                t = np.datetime64(time, 's')
+                if key in self._fired and t - self._fired[key] < self.cooldown: continue
+                self._fired[key] = t
+            name, down, up = LEVELS.get(kind, (kind, f"▼ 跌破 {kind}", f"▲ 突破 {kind}"))
+            events.append({'ticker': ticker, 'time': None if time is None else str(time), 'kind': kind, 'name': name,
+                           'direction': direction, 'level': level, 'price': price, 'prev_price': prev,
+                           'message': down if direction == 'down' else up})
+        self.events += len(events)
+        return events
+
+    def emit(self, events):
+        for event in events:
+            for sink in self.sinks:
+                try:
+                    sink(event)
+                except Exception as e:
+                    print(f"❌ 警報輸出失敗 ({type(sink).__name__}): {e}")
+
+    def close(self):
+        for sink in self.sinks:
+            if hasattr(sink, 'close'): sink.close()
+
+# ==========================================
+# 3. 輸出 (sink)
+# ==========================================
+class StdoutSink:
+    def __call__(self, e):
+        print(f"🚨 {e['time'] or ''} {e['ticker']:<6} {e['message']} | {e['name']} {e['level']:.2f} | "
+              f"{e['prev_price']:.2f} → {e['price']:.2f}")
+
+class FileSink:
+    # 每個事件一行 JSON (追加)
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, event):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+class WebhookSink:
+    # POST JSON 到 url (Slack / Discord / 自架服務)；在背景執行緒送出，不阻塞行情迴圈
+    def __init__(self, url, timeout=5):
+        self.url, self.timeout = url, timeout
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def __call__(self, event):
+        self.queue.put(event)
+
+    def _worker(self):
+        while (event := self.queue.get()) is not None:
+            try:
+                body = json.dumps({'text': f"{event['ticker']} {event['message']} @ {event['price']:.2f}", **event},
+                                  ensure_ascii=False).encode('utf-8')
+                req = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+                urllib.request.urlopen(req, timeout=self.timeout).close()
+            except Exception as e:
+                print(f"❌ webhook 失敗: {e}")
+
+    def close(self):
+        # 送完佇列中的事件再結束
+        self.queue.put(None)
+        self.thread.join()
+
+# ==========================================
+# 4. 價位來源 & 串流整合
+# ==========================================
+def levels_from_store(tickers, calendar='SPY', kinds=None, before=None):
+    # 本地行情庫最後一根 K 棒的關卡價位 → {ticker: ({kind: 價位}, 收盤價)}
+    # before: 交易日 (只用該日之前已收盤的 K 棒；盤中更新時行情庫最後一根是當天未收盤的數據)
+    import panel_store
+    import scanner
+    kinds = kinds or config.ALERT_LEVELS
+    panel = panel_store.load(tickers, calendar=calendar)
+    dates = panel.dates64
+    n = len(dates) if before is None else int(np.searchsorted(dates, np.datetime64(before, 'D')))
+    if n == 0: return {}
+    rows = scanner.scan_panel(dates[:n], {f: panel[f][:, :n] for f in ('High', 'Low', 'Close', 'Volume')}, panel.tickers)
+    return {r['ticker']: ({k: float(r[k]) for k in kinds}, r['price']) for r in rows}
+
+def reload_levels(engine, tickers, calendar='SPY', session=None, refresh=True):
+    # 交易日切換：增量更新行情庫 → 以 session 之前的收盤重算所有價位 (整份替換)
+    import market_store
+    if refresh: market_store.refresh(list(dict.fromkeys([*tickers, calendar])), force=True)
+    levels = levels_from_store(tickers, calendar, before=session)
+    engine.indexes.clear()
+    for t, (lv, price) in levels.items():
+        engine.set_levels(t, lv, price)
+    print(f"🚨 {session or ''} 監看 {len(engine.indexes)} 檔，{sum(map(len, engine.indexes.values()))} 個價位")
+
+async def watch(bars, engine, reload=None):
+    # 消費 SignalStream.subscribe(bars=True) 的每一根分鐘線 (None = 結束)
+    # reload(交易日)：每個交易日的第一根分鐘線之前呼叫 (在背景執行緒，下載不阻塞事件迴圈)
+    session = None
+    while (bar := await bars.get()) is not None:
+        day = np.datetime64(bar.time, 'D')
+        if reload is not None and day != session:
+            session = day
+            await asyncio.to_thread(reload, day)
+        engine.emit(engine.on_price(bar.ticker, bar.close, bar.time))
+
+async def main(args):
+    import stream
+    sinks = [StdoutSink()]
+    if args.file: sinks.append(FileSink(args.file))
+    if args.webhook: sinks.append(WebhookSink(args.webhook))
+    engine = AlertEngine(sinks, args.cooldown)
+    reload = lambda day: reload_levels(engine, args.tickers, args.calendar, day, refresh=not args.no_refresh)
+
+    feed = stream.ReplayFeed(args.replay, args.tickers, args.speed) if args.replay else stream.PollingFeed(args.tickers, args.poll)
+    sig = stream.SignalStream(args.tickers if args.signals else [], feed)
+    tasks = [asyncio.create_task(watch(sig.subscribe(bars=True), engine, reload))]
+    if args.signals: tasks.append(asyncio.create_task(stream.print_events(sig.subscribe())))
+    await sig.run()
+    await asyncio.gather(*tasks)
+    engine.close()
+    print(f"✅ {engine.ticks} 個價格，{engine.events} 個警報")
+
+if __name__ == "__main__":
+    import main as dashboard
+    parser = argparse.ArgumentParser(description="價位觸發警報 (止盈 / 止損 / VAL / POC / 年線)")
+    parser.add_argument('--tickers', nargs='+', default=None)
+    parser.add_argument('--universe-file', default=None, help="Ticker 清單檔 (每行一個)")
+    parser.add_argument('--calendar', default='SPY')
+    parser.add_argument('--replay', default=None, help="重播分鐘線 CSV 目錄")
+    parser.add_argument('--speed', type=float, default=0)
+    parser.add_argument('--poll', type=int, default=60)
+    parser.add_argument('--file', default=config.ALERT_FILE, help="事件 JSON Lines 檔 (空字串 = 不寫檔)")
+    parser.add_argument('--webhook', default=os.environ.get('ALERT_WEBHOOK_URL') or config.ALERT_WEBHOOK_URL, help="事件 POST 到此 URL")
+    parser.add_argument('--cooldown', type=float, default=None, help="同一價位同一方向的冷卻分鐘數")
+    parser.add_argument('--signals', action='store_true', help="同時印出盤中訊號變化 (stream.py)")
+    parser.add_argument('--no-refresh', action='store_true', help="不更新行情，只讀本地行情庫")
+    args = parser.parse_args()
+    if args.tickers is None:
+        import scanner
+        args.tickers = scanner.read_universe(args.universe_file) if args.universe_file else dashboard.target_tickers
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,134 @@
+// ==========================================
+// 🖼️ 瀏覽器端 K 線 + 成交量分佈圖 (main.py --output data)
+// ==========================================
+// 讀取 chart_data/<TICKER>.json (chart_data.py 產生)，在 <canvas data-chart="..."> 上畫出
+// 與 charts.generate_chart 相同的內容：K 線、SMA200 / ATR 止盈 / Sniper 止損 / POC / VAL、現價、右側成交量分佈。
+(function () {
+    'use strict';
+
+    var BG = '#161b22', GRID = '#30363d', TEXT = '#c9d1d9';
+    var UP = '#3fb950', DOWN = '#f85149';
+    var POC = '#d29922', VAL = '#3fb950', VA = '#58a6ff';
+
+    function hline(ctx, y, x0, x1, color, width, dash, alpha) {
+        ctx.save();
+        ctx.globalAlpha = alpha || 1;
+        ctx.strokeStyle = color;
+        ctx.lineWidth = width;
+        ctx.setLineDash(dash || []);
+        ctx.beginPath();
+        ctx.moveTo(x0, y);
+        ctx.lineTo(x1, y);
+        ctx.stroke();
+        ctx.restore();
+    }
+
+    function draw(canvas, data) {
+        var dpr = window.devicePixelRatio || 1;
+        var w = canvas.clientWidth, h = Math.round(w * 0.6);
+        canvas.style.height = h + 'px';
+        canvas.width = Math.round(w * dpr);
+        canvas.height = Math.round(h * dpr);
+        var ctx = canvas.getContext('2d');
+        ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+        ctx.fillStyle = BG;
+        ctx.fillRect(0, 0, w, h);
+
+        var bars = data.bars, lv = data.levels, prof = data.profile;
+        var pad = {top: 10, bottom: 22, left: 8, right: 52};
+        var split = Math.round((w - pad.right) * 0.75);   // 左 3/4 K 線，右 1/4 成交量分佈 (同 width_ratios=(3, 1))
+        var plotH = h - pad.top - pad.bottom;
+
+        // Y 軸範圍：K 棒高低點 + 各關卡價位
+        var lo = Infinity, hi = -Infinity;
+        bars.forEach(function (b) { lo = Math.min(lo, b[3]); hi = Math.max(hi, b[2]); });
+        [lv.sma200, lv.poc, lv.val, lv.stop > 0 ? lv.stop : null, lv.sniper_stop > 0 ? lv.sniper_stop : null]
+            .forEach(function (v) { if (v !== null) { lo = Math.min(lo, v); hi = Math.max(hi, v); } });
+        var margin = (hi - lo) * 0.05 || 1;
+        lo -= margin; hi += margin;
+        var y = function (p) { return pad.top + (hi - p) / (hi - lo) * plotH; };
+
+        // K 線
+        var step = (split - pad.left) / bars.length;
+        var body = Math.max(1, step * 0.7);
+        bars.forEach(function (b, i) {
+            var x = pad.left + (i + 0.5) * step;
+            var color = b[4] >= b[1] ? UP : DOWN;
+            ctx.strokeStyle = color;
+            ctx.fillStyle = color;
+            ctx.lineWidth = 1;
+            ctx.beginPath();
+            ctx.moveTo(x, y(b[2]));
+            ctx.lineTo(x, y(b[3]));
+            ctx.stroke();
+            var top = y(Math.max(b[1], b[4])), bot = y(Math.min(b[1], b[4]));
+            ctx.fillRect(x - body / 2, top, body, Math.max(1, bot - top));
+        });
+
+        // 關卡價位
+        var legend = [];
+        if (lv.sma200 !== null) { hline(ctx, y(lv.sma200), pad.left, split, 'gray', 1, [5, 4], 0.7); legend.push(['SMA200', 'gray']); }
+        if (lv.stop > 0) { hline(ctx, y(lv.stop), pad.left, split, data.colors.atr_stop, 1.5, [], 0.9); legend.push(['ATR Stop (' + data.atr_mult + 'x)', data.colors.atr_stop]); }
+        if (lv.sniper_stop > 0) { hline(ctx, y(lv.sniper_stop), pad.left, split, data.colors.sniper_stop, 1.5, [2, 3], 0.9); legend.push(['Sniper Stop (' + data.atr_mult + 'x)', data.colors.sniper_stop]); }
+        hline(ctx, y(lv.poc), pad.left, split, POC, 1.5, [2, 3], 0.8); legend.push(['POC (Entry Only)', POC]);
+        hline(ctx, y(lv.val), pad.left, split, VAL, 1, [5, 4], 0.8); legend.push(['VAL (Entry Only)', VAL]);
+
+        var last = bars[bars.length - 1][4];
+        hline(ctx, y(last), pad.left, split, 'white', 0.8, [2, 3]);
+        ctx.font = '11px Consolas, monospace';
+        ctx.fillStyle = 'white';
+        ctx.textBaseline = 'middle';
+        ctx.fillText(last.toFixed(2), w - pad.right + 4, y(last));
+
+        // 圖例
+        ctx.textBaseline = 'top';
+        legend.forEach(function (item, i) {
+            ctx.fillStyle = item[1];
+            ctx.fillRect(pad.left + 6, pad.top + 6 + i * 14 + 4, 12, 3);
+            ctx.fillStyle = TEXT;
+            ctx.fillText(item[0], pad.left + 22, pad.top + 6 + i * 14);
+        });
+
+        // 日期 (頭 / 中 / 尾)
+        ctx.fillStyle = 'gray';
+        ctx.textBaseline = 'alphabetic';
+        [0, Math.floor(bars.length / 2), bars.length - 1].forEach(function (i, k) {
+            ctx.textAlign = ['left', 'center', 'right'][k];
+            ctx.fillText(bars[i][0], pad.left + (i + 0.5) * step, h - 6);
+        });
+        ctx.textAlign = 'left';
+
+        // 成交量分佈：價值區藍色、POC 金色、其餘灰色
+        var maxVol = Math.max.apply(null, prof.volume) || 1;
+        var pocIdx = prof.volume.indexOf(maxVol);
+        var binH = prof.mids.length > 1 ? Math.abs(y(prof.mids[1]) - y(prof.mids[0])) * 0.8 : 2;
+        var x0 = split + 6, width = w - pad.right - x0;
+        ctx.globalAlpha = 0.8;
+        prof.mids.forEach(function (p, i) {
+            ctx.fillStyle = i === pocIdx ? POC : (lv.val <= p && p <= lv.vah ? VA : GRID);
+            ctx.fillRect(x0, y(p) - binH / 2, prof.volume[i] / maxVol * width, Math.max(1, binH));
+        });
+        ctx.globalAlpha = 1;
+    }
+
+    function load(canvas) {
+        fetch(canvas.getAttribute('data-chart'), {cache: 'no-cache'})
+            .then(function (r) { if (!r.ok) throw new Error(r.status); return r.json(); })
+            .then(function (data) {
+                canvas._chartData = data;
+                draw(canvas, data);
+            })
+            .catch(function (e) { canvas.replaceWith(document.createTextNode('⚠️ 無法載入圖表 (' + e.message + ')')); });
+    }
+
+    var canvases = Array.prototype.slice.call(document.querySelectorAll('canvas[data-chart]'));
+    canvases.forEach(load);
+
+    var timer = null;
+    window.addEventListener('resize', function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () {
+            canvases.forEach(function (c) { if (c._chartData) draw(c, c._chartData); });
+        }, 150);
+    });
+})();
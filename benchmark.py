@@ -0,0 +1,193 @@
+# ==========================================
+# ⏱️ BENCHMARK SUITE (離線效能基準)
+# ==========================================
+# 以固定種子的合成 OHLCV (1k ~ 1M 根 K 棒 × 1 ~ 1000 檔) 分別計時訊號流程的每個階段：
+#   rsi / atr (true range + 滾動平均) / volume_profile (分箱 + 價值區擴張，分段計算以限制記憶體) / decide (決策樹)
+#   last_bar (main.calculate_data 的路徑) / chart (generate_chart) / html (卡片 + 頁面組裝) / structure (結構表)
+# 不需要網路，也不讀本地行情庫；結果存成 JSON，可用 --compare 與前一次比較找出效能退步。
+#
+# 用法: python benchmark.py [--bars 1000 100000] [--tickers 1 100] [--stages rsi atr] [--compare bench_results/old.json]
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import datetime
+import numpy as np
+import config
+import signal_engine as se
+
+BARS = [1_000, 10_000, 100_000, 1_000_000]
+TICKERS = [1, 10, 100, 1000]
+MAX_CELLS = 20_000_000         # bars × tickers 超過此值的組合略過 (記憶體)
+PROFILE_CHUNK = 200_000        # 全歷史成交量分佈會展開 bars × LOOKBACK 的視窗 (記憶體 ∝ LOOKBACK 倍)：每段最多這麼多個視窗
+OUT_DIR = "bench_results"
+REGRESSION_RATIO = 1.2         # --compare 時慢 20% 以上標示為退步
+
+# ==========================================
+# 1. 合成 OHLCV (固定種子，可重現)
+# ==========================================
+def synthetic_ohlcv(bars, tickers=1, seed=0, start="2000-01-03"):
+    # 幾何布朗運動收盤價 + 隨機上下影線 + 整數成交量；回傳 (dates, {field: (tickers, bars)})
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0003, 0.012, (tickers, bars))
+    close = 100 * np.exp(np.cumsum(returns, axis=1))
+    open_ = np.empty_like(close)
+    open_[:, 0] = 100
+    open_[:, 1:] = close[:, :-1] * np.exp(rng.normal(0, 0.003, (tickers, bars - 1)))
+    wick = np.abs(rng.normal(0, 0.006, (2, tickers, bars)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = np.round(rng.lognormal(15, 0.4, (tickers, bars)))
+    dates = np.busday_offset(np.datetime64(start, 'D'), np.arange(bars), roll='forward')
+    return dates, {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}
+
+# ==========================================
+# 2. 各階段
+# ==========================================
+def _chart_args(dates, panel, bar):
+    lookback = config.CORE_PARAMS['LOOKBACK']
+    ohlcv = np.column_stack([panel[f][0, -lookback:] for f in ('Open', 'High', 'Low', 'Close', 'Volume')])
+    return (dates[-lookback:], ohlcv, bar['sma200'], bar['poc'], bar['val'], bar['vah'],
+            bar['bin_mids'], bar['vol_bin'], bar['stop_price'], bar['sniper_stop'])
+
+def _fake_result(ticker, bar):
+    # main.build_card 所需欄位 (文字內容不影響計時)
+    return {'name': ticker, 'ticker': ticker, 'price': bar['poc'], 'stop_price': bar['stop_price'],
+            'sniper_stop': bar['sniper_stop'], 'poc': bar['poc'], 'val': bar['val'], 'sma200': bar['sma200'],
+            'status_html': '-', 'action_html': se.SIGNAL_LABELS[bar['signal_code']],
+            'color_class': 'yellow', 'signal_code': bar['signal_code']}
+
+def chunked_value_area(high, low, close, volume, lookback, bins, va_pct, chunk=PROFILE_CHUNK):
+    # 全歷史 POC / VAL / VAH，分段計算 (每段 ≤ chunk 個視窗，記憶體有上限)；結果與一次算完相同
+    tickers, bars = close.shape
+    out = {k: np.full(close.shape, np.nan) for k in ('poc', 'val', 'vah')}
+    rows = max(1, min(tickers, chunk // bars))
+    step = max(chunk // rows, 1)
+    for r in range(0, tickers, rows):
+        for a in range(lookback - 1, bars, step):
+            b = min(a + step, bars)  # 這一段算結束於 a ~ b-1 的視窗
+            part = (x[r:r + rows, a - lookback + 1:b] for x in (high, low, close, volume))
+            levels = se.value_area(*part, lookback, bins, va_pct)
+            for k in out: out[k][r:r + rows, a:b] = levels[k][:, lookback - 1:]
+    return out
+
+def build_stages(dates, panel, only=None):
+    # 回傳 {stage: 可重複呼叫的函數}；輸入都事先算好，只計時該階段本身 (only: 只準備這些階段)
+    import main
+    import structure
+    core, sniper = config.CORE_PARAMS, config.SNIPER_PARAMS
+    high, low, close, volume = (panel[f] for f in ('High', 'Low', 'Close', 'Volume'))
+    tickers, bars = close.shape
+    names = [f"T{i:04d}" for i in range(tickers)]
+    want = lambda stage: not only or stage in only
+    stages = {
+        'rsi': lambda: se.rsi(close),
+        'atr': lambda: se.rolling_mean(se.true_range(high, low, close), se.ATR_WINDOW),
+        'structure': lambda: structure.compute_table(dates, close, names),
+    }
+
+    va_args = (high, low, close, volume, core['LOOKBACK'], core['BINS'], core['VA_PCT'])
+    if bars >= core['LOOKBACK']:
+        stages['volume_profile'] = lambda: chunked_value_area(*va_args)
+    if bars >= core['LOOKBACK'] and want('decide'):
+        ind = se.base_indicators(high, low, close)
+        levels = chunked_value_area(*va_args)
+        stop_price, sniper_stop = se.trailing_stops(close, ind['atr'], core['LOOKBACK'], core['ATR_MULT'], sniper['STOP_LOOKBACK'])
+        stages['decide'] = lambda: se.decide(close, ind, levels, stop_price, sniper_stop,
+                                             core['PANIC_MULT'], sniper['RSI_THRESHOLD'], sniper['BIAS_THRESHOLD'])
+
+    if bars > se.warmup(core['LOOKBACK']):
+        bar = se.last_bar(high[0], low[0], close[0], volume[0])
+        stages['last_bar'] = lambda: [se.last_bar(high[i], low[i], close[i], volume[i]) for i in range(tickers)]
+        results = [_fake_result(t, bar) for t in names]
+        stages['html'] = lambda: main.build_html(results, {t: main.build_card(res) for t, res in zip(names, results)}, announce=False)
+        try:
+            import charts
+            charts._setup()
+            args = _chart_args(dates, panel, bar)
+            stages['chart'] = lambda: charts.generate_chart(*args)
+        except ImportError:
+            pass  # 沒有安裝 matplotlib / mplfinance
+    return stages
+
+# ==========================================
+# 3. 計時 & 輸出
+# ==========================================
+def time_stage(fn, repeat, budget):
+    # 至少跑一次；之後在 budget 秒內最多 repeat 次，回傳 (最佳, 中位數, 次數)
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeat and (not times or time.perf_counter() - start < budget):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), float(np.median(times)), len(times)
+
+def run(bars_list, tickers_list, stages=None, repeat=5, budget=5.0, seed=0):
+    rows = []
+    for bars in bars_list:
+        for tickers in tickers_list:
+            if bars * tickers > MAX_CELLS:
+                print(f"⏭️ {bars:>9,} bars × {tickers:>4} 檔: 超過 MAX_CELLS，略過")
+                continue
+            dates, panel = synthetic_ohlcv(bars, tickers, seed)
+            for stage, fn in build_stages(dates, panel, stages).items():
+                if stages and stage not in stages: continue
+                best, median, n = time_stage(fn, repeat, budget)
+                # last_bar / html 只處理尾段 (每檔一次)，chart 只畫一張；其餘以 bars × tickers 計
+                per_unit = best / {'last_bar': tickers, 'html': tickers, 'chart': 1}.get(stage, bars * tickers)
+                rows.append({'stage': stage, 'bars': bars, 'tickers': tickers, 'best_s': best, 'median_s': median,
+                             'runs': n, 'per_unit_us': per_unit * 1e6})
+                print(f"   {stage:<15}{bars:>10,} bars × {tickers:>4} 檔  best {best * 1000:>10.2f} ms"
+                      f"  median {median * 1000:>10.2f} ms  ({n} 次)")
+    return rows
+
+def metadata():
+    try:
+        import subprocess
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'time': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': sys.version.split()[0], 'numpy': np.__version__, 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'core_params': config.CORE_PARAMS}
+
+def compare(rows, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['stage'], r['bars'], r['tickers']): r for r in json.load(f)['results']}
+    print(f"\n📊 與 {baseline_path} 比較 (best，> {REGRESSION_RATIO:.1f}x 標示為退步):")
+    regressions = 0
+    for r in rows:
+        old = baseline.get((r['stage'], r['bars'], r['tickers']))
+        if old is None: continue
+        ratio = r['best_s'] / old['best_s']
+        flag = "🔴 退步" if ratio > REGRESSION_RATIO else ("🟢 進步" if ratio < 1 / REGRESSION_RATIO else "")
+        regressions += ratio > REGRESSION_RATIO
+        print(f"   {r['stage']:<15}{r['bars']:>10,} × {r['tickers']:>4}  {old['best_s'] * 1000:>10.2f} → {r['best_s'] * 1000:>10.2f} ms  ({ratio:.2f}x) {flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="訊號流程各階段的離線效能基準")
+    parser.add_argument('--bars', type=int, nargs='+', default=BARS)
+    parser.add_argument('--tickers', type=int, nargs='+', default=TICKERS)
+    parser.add_argument('--stages', nargs='+', default=None,
+                        help="只跑指定階段: rsi atr volume_profile decide last_bar chart html structure")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=5.0, help="每個階段的重複計時上限秒數")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help="結果 JSON，預設 bench_results/bench_<時間>.json")
+    parser.add_argument('--compare', default=None, help="與之前的結果 JSON 比較")
+    args = parser.parse_args()
+
+    print(f"⏱️ Benchmark: bars {args.bars} × tickers {args.tickers} (seed {args.seed})")
+    rows = run(args.bars, args.tickers, args.stages, args.repeat, args.budget, args.seed)
+
+    out = args.out or os.path.join(OUT_DIR, f"bench_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({'meta': {**metadata(), 'seed': args.seed}, 'results': rows}, f, indent=2)
+    print(f"✅ 結果已存到 {out}")
+    if args.compare and compare(rows, args.compare):
+        sys.exit(1)  # 有退步時回傳非 0，方便在 CI 中把關
@@ -0,0 +1,190 @@
+# ==========================================
+# 📈 MARKET BREADTH (成分股市場廣度)
+# ==========================================
+# structure.py 原本只比較 SPY vs RSP 的日漲跌；這裡對整個指數成分股 (例如 S&P 500) 計算：
+#   - 上漲 / 下跌家數 & A/D Line (騰落線)
+#   - 站上 SMA50 / SMA200 的家數比例
+#   - 收盤創 52 週新高 / 新低家數
+#   - McClellan Oscillator (淨上漲家數的 EMA19 − EMA39)
+# 每天的數字都是 (ticker × date) 收盤價面板沿 ticker 軸的向量化加總。
+#
+# 收盤價讀自 panel_store 的 float32 面板 (成分股共用一份，只有變動的 Ticker 會重讀)。
+# 結果存成 data/breadth.npz。每日更新只重算最後儲存日 (可能是盤中數據) 之後的日期，
+# 只需讀取前面 WARMUP 根暖機；A/D Line 與 EMA 從已存的狀態接續，不重算整段歷史。
+# 成分股清單或參數改變時自動全量重算。
+#
+# 用法: python breadth.py [--universe-file sp500.txt] [--full] [--no-refresh]
+import os
+import argparse
+import hashlib
+import numpy as np
+import config
+import market_store
+import panel_store
+import signal_engine as se
+import metrics
+
+SMA_WINDOWS = (50, 200)
+HIGH_LOW_WINDOW = 252   # 52 週
+MCCLELLAN_SPANS = (19, 39)
+WARMUP = max(*SMA_WINDOWS, HIGH_LOW_WINDOW)
+
+COUNT_FIELDS = ['members', 'advances', 'declines',
+                *[f'{k}_{w}' for w in SMA_WINDOWS for k in ('above', 'valid')], 'new_highs', 'new_lows']
+STATE_FIELDS = ['dates', *COUNT_FIELDS, 'ad_line', *[f'ema_{s}' for s in MCCLELLAN_SPANS]]
+
+# ==========================================
+# 1. 成分股清單
+# ==========================================
+def default_universe():
+    # config.BREADTH_UNIVERSE_FILE 存在時用成分股清單，否則退回 structure.py 的板塊 ETF
+    path = config.BREADTH_UNIVERSE_FILE
+    if path and os.path.exists(path):
+        import scanner
+        return scanner.read_universe(path)
+    import structure
+    return list(structure.tickers_config['Sectors'])
+
+def universe_key(tickers, calendar):
+    # 成分股 / 日曆 / 參數的指紋：任何一項改變，已存的狀態就不能接續
+    text = '|'.join([calendar, *sorted(tickers), *map(str, (*SMA_WINDOWS, HIGH_LOW_WINDOW, *MCCLELLAN_SPANS)),
+                     np.dtype(panel_store.DTYPE).name])
+    return hashlib.sha256(text.encode()).hexdigest()
+
+# ==========================================
+# 2. 向量化計算 (面板 → 每日家數)
+# ==========================================
+def daily_counts(close):
+    # close: (tickers, dates) 收盤價 (缺值為 NaN) → {欄位: (dates,) int64}
+    close = np.asarray(close, dtype=np.float64)
+    prev = se._shift(close)
+    counts = {'members': (~np.isnan(close)).sum(axis=0)}
+    with np.errstate(invalid='ignore'):
+        counts['advances'] = (close > prev).sum(axis=0)
+        counts['declines'] = (close < prev).sum(axis=0)
+        for w in SMA_WINDOWS:
+            sma = se.rolling_mean(close, w)
+            counts[f'above_{w}'] = (close > sma).sum(axis=0)
+            counts[f'valid_{w}'] = (~np.isnan(sma)).sum(axis=0)
+        # 視窗內有缺值時 rolling_max / min 為 NaN，比較結果為 False (歷史不足 52 週的不計)
+        counts['new_highs'] = (close >= se.rolling_max(close, HIGH_LOW_WINDOW)).sum(axis=0)
+        counts['new_lows'] = (close <= se.rolling_min(close, HIGH_LOW_WINDOW)).sum(axis=0)
+    return {k: v.astype(np.int64) for k, v in counts.items()}
+
+def _ema(x, span, prev=None):
+    # 同 .ewm(span=span, adjust=False).mean()；prev 為前一天的 EMA (接續已存的狀態)
+    alpha = 2 / (span + 1)
+    out = np.empty(len(x))
+    ema = prev
+    for i, v in enumerate(x):
+        ema = v if ema is None else ema + alpha * (v - ema)
+        out[i] = ema
+    return out
+
+def mcclellan(state):
+    fast, slow = MCCLELLAN_SPANS
+    return state[f'ema_{fast}'] - state[f'ema_{slow}']
+
+# ==========================================
+# 3. 狀態存取 & 增量更新
+# ==========================================
+def state_path(data_dir=None):
+    return os.path.join(data_dir or config.DATA_DIR, 'breadth.npz')
+
+def load_state(path):
+    if not os.path.exists(path): return None
+    with np.load(path) as f:
+        return {k: f[k] for k in f.files}
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **state)
+    os.replace(tmp, path)
+
+def update(tickers=None, calendar=None, data_dir=None, full=False):
+    tickers = list(dict.fromkeys(tickers or default_universe()))
+    calendar = calendar or config.BREADTH_CALENDAR
+    path = state_path(data_dir)
+    key = universe_key(tickers, calendar)
+
+    cal = market_store.load_arrays(calendar, data_dir)
+    if cal is None or len(cal[0]) == 0:
+        raise ValueError(f"本地行情庫沒有交易日曆 {calendar} 的數據")
+    cal_dates = np.asarray(cal[0])
+
+    state = None if full else load_state(path)
+    if state is not None and (str(state['key']) != key or len(state['dates']) == 0):
+        state = None
+    if state is None:
+        resume, start = cal_dates[0], cal_dates[0]
+    else:
+        # 從最後儲存日重算 (可能是盤中數據)；往前多讀 WARMUP 根供 SMA / 52 週高低點暖機
+        resume = state['dates'][-1]
+        start = cal_dates[max(int(np.searchsorted(cal_dates, resume)) - WARMUP, 0)]
+
+    panel = panel_store.load(tickers, calendar=calendar, data_dir=data_dir)
+    dates = panel.dates64[panel.index(start):]
+    keep = dates >= resume
+    counts = {k: v[keep] for k, v in daily_counts(panel.window(start=start, fields=['Close'])['Close']).items()}
+
+    n0 = 0 if state is None else int(np.searchsorted(state['dates'], resume))
+    net = (counts['advances'] - counts['declines']).astype(np.float64)
+    ad_line = (state['ad_line'][n0 - 1] if n0 else 0.0) + np.cumsum(net)
+    new = {'dates': dates[keep], **counts, 'ad_line': ad_line}
+    for span in MCCLELLAN_SPANS:
+        new[f'ema_{span}'] = _ema(net, span, prev=state[f'ema_{span}'][n0 - 1] if n0 else None)
+
+    if state is not None:
+        new = {k: np.concatenate([state[k][:n0], new[k]]) for k in STATE_FIELDS}
+    new['key'] = np.array(key)
+    save_state(path, new)
+    print(f"📈 市場廣度: {len(tickers)} 檔，{'增量' if state is not None else '全量'}計算 {int(keep.sum())} 天")
+    return new
+
+def latest(state, i=-1):
+    # 單日摘要 (structure.py 橫幅用)
+    pct = lambda w: float(state[f'above_{w}'][i] / state[f'valid_{w}'][i] * 100) if state[f'valid_{w}'][i] else float('nan')
+    return {
+        'date': str(state['dates'][i]),
+        'members': int(state['members'][i]),
+        'advances': int(state['advances'][i]),
+        'declines': int(state['declines'][i]),
+        **{f'pct_above_{w}': pct(w) for w in SMA_WINDOWS},
+        'new_highs': int(state['new_highs'][i]),
+        'new_lows': int(state['new_lows'][i]),
+        'ad_line': float(state['ad_line'][i]),
+        'mcclellan': float(mcclellan(state)[i]),
+    }
+
+def get_breadth(tickers=None, refresh=True):
+    # structure.py 使用：失敗時回傳 None，不影響其餘表格
+    try:
+        tickers = tickers or default_universe()
+        if refresh: market_store.refresh(list(dict.fromkeys([*tickers, config.BREADTH_CALENDAR])))
+        with metrics.stage('breadth', tickers=len(tickers)) as m:
+            state = update(tickers)
+            m['rows'] = len(state['dates'])
+        return latest(state)
+    except Exception as e:
+        print(f"❌ 計算市場廣度時發生錯誤: {e}")
+        return None
+
+if __name__ == "__main__":
+    import scanner
+    parser = argparse.ArgumentParser(description="成分股市場廣度 (A/D Line / SMA50 / SMA200 / 新高新低 / McClellan)")
+    parser.add_argument('--universe-file', default=None, help="成分股清單檔 (每行一個)，預設 config.BREADTH_UNIVERSE_FILE")
+    parser.add_argument('--full', action='store_true', help="忽略已存狀態，全量重算")
+    parser.add_argument('--no-refresh', action='store_true', help="不更新行情，只讀本地行情庫")
+    parser.add_argument('--days', type=int, default=10)
+    args = parser.parse_args()
+
+    tickers = scanner.read_universe(args.universe_file) if args.universe_file else default_universe()
+    if not args.no_refresh: market_store.refresh(list(dict.fromkeys([*tickers, config.BREADTH_CALENDAR])))
+    state = update(tickers, full=args.full)
+    print(f"{'Date':<12}{'Adv':>6}{'Dec':>6}{'>SMA50':>9}{'>SMA200':>9}{'NH':>6}{'NL':>6}{'A/D Line':>10}{'McClellan':>11}")
+    for i in range(-min(args.days, len(state['dates'])), 0):
+        r = latest(state, i)
+        print(f"{r['date']:<12}{r['advances']:>6}{r['declines']:>6}{r['pct_above_50']:>8.1f}%{r['pct_above_200']:>8.1f}%"
+              f"{r['new_highs']:>6}{r['new_lows']:>6}{r['ad_line']:>10.0f}{r['mcclellan']:>11.2f}")
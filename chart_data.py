@@ -0,0 +1,66 @@
+# ==========================================
+# 📦 CHART DATA (瀏覽器端繪圖的數據檔)
+# ==========================================
+# CHART_OUTPUT = "data" 時取代 charts.py：不載入 matplotlib，每檔只輸出一個精簡 JSON
+# (最近 LOOKBACK 根 K 棒 + 成交量分佈 + POC/VAL/VAH/SMA200/止盈止損)，
+# 由 assets/charts.js 在瀏覽器用 <canvas> 畫出 K 線與成交量分佈。
+#   - 每根 K 棒一行：每天的 git diff 只有頭尾幾行 + 關卡價位，不會像 base64 PNG 整張重寫
+#   - 內容沒變就不重寫檔案 (mtime / git 都不變)
+import os
+import json
+import numpy as np
+import config
+import fsutil
+import metrics
+
+PRICE_DECIMALS = 4
+
+def _num(x, decimals=PRICE_DECIMALS):
+    x = float(x)
+    return None if np.isnan(x) else round(x, decimals)
+
+def chart_json(ticker, chart_args):
+    # chart_args 與 charts.generate_chart 相同 → JSON 字串
+    dates, ohlcv, sma200, poc, val, vah, bin_mids, vol_bin, stop_price, sniper_stop = chart_args
+    ohlcv = np.asarray(ohlcv, dtype=np.float64)
+    head = {
+        'ticker': ticker,
+        'atr_mult': config.CORE_PARAMS['ATR_MULT'],
+        'colors': {'atr_stop': config.UI_COLORS['ATR_STOP'], 'sniper_stop': config.UI_COLORS['SNIPER_STOP']},
+        'levels': {'sma200': _num(sma200), 'poc': _num(poc), 'val': _num(val), 'vah': _num(vah),
+                   'stop': _num(stop_price), 'sniper_stop': _num(sniper_stop)},
+        'profile': {'mids': [_num(p) for p in bin_mids], 'volume': [int(v) for v in np.asarray(vol_bin)]},
+    }
+    # bars: [日期, 開, 高, 低, 收, 量]，每根一行
+    bars = [json.dumps([str(d), *(_num(x) for x in row[:4]), int(row[4])], separators=(',', ':'))
+            for d, row in zip(np.asarray(dates, dtype='datetime64[D]'), ohlcv)]
+    body = json.dumps(head, ensure_ascii=False, separators=(',', ':'))[:-1]
+    return body + ',"bars":[\n' + ',\n'.join(bars) + '\n]}\n'
+
+def data_path(ticker, data_dir=None):
+    return os.path.join(data_dir or config.CHART_DATA_DIR, f"{ticker}.json")
+
+def write_chart_data(jobs, data_dir=None):
+    # jobs: {ticker: chart_args} → {ticker: 相對路徑}；內容相同的檔案不重寫
+    data_dir = data_dir or config.CHART_DATA_DIR
+    paths, written = {}, 0
+    with metrics.stage('chart_data', tickers=len(jobs)) as m:
+        for t, args in jobs.items():
+            path = data_path(t, data_dir)
+            try:
+                text = chart_json(t, args)
+                old = None
+                if os.path.exists(path):
+                    with open(path, encoding='utf-8') as f:
+                        old = f.read()
+                if text != old:
+                    fsutil.atomic_write(path, text)
+                    written += 1
+                paths[t] = path.replace(os.sep, '/')
+                metrics.record('chart_data', t, bytes=len(text.encode('utf-8')), changed=text != old)
+            except Exception as e:
+                print(f"Error writing chart data for {t}: {e}")
+                metrics.error('chart_data', t, e)
+        m['rows'] = written
+    print(f"📦 圖表數據: {len(paths)} 檔，{written} 檔有更新 → {data_dir}/")
+    return paths
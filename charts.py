@@ -0,0 +1,155 @@
+# ==========================================
+# 🖼️ CHART RENDERING (K 線 + 成交量分佈圖)
+# ==========================================
+# generate_chart 是 main.py 最慢的一步 (mplfinance + barh，PNG dpi=100)。
+#   - 以輸入內容 (K 線切片 + POC/VAL/VAH/止盈止損 + 顏色設定) 的 SHA-256 作為快取鍵，
+#     內容沒變就直接讀快取的 PNG，不重畫
+#   - 未命中快取的圖表交給 process pool 平行渲染
+# pandas / matplotlib / mplfinance 只在真正需要畫圖時才載入。
+import os
+import io
+import time
+import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import config
+import fsutil
+import metrics
+
+COLOR_ATR_STOP = config.UI_COLORS['ATR_STOP']
+COLOR_SNIPER_STOP = config.UI_COLORS['SNIPER_STOP']
+CHART_VERSION = 1  # 修改繪圖樣式時 +1，讓舊快取失效
+
+_mpl = None
+
+def _setup():
+    # 延遲載入並設定繪圖環境 (每個行程只做一次)
+    global _mpl
+    if _mpl is None:
+        import matplotlib
+        matplotlib.use('Agg')  # 設定後端為非互動模式
+        import matplotlib.pyplot as plt
+        import mplfinance as mpf
+        plt.rcParams['axes.unicode_minus'] = False
+        plt.style.use('dark_background')
+        mpf_style = mpf.make_mpf_style(base_mpf_style='nightclouds', rc={'axes.grid': False})
+        _mpl = (plt, mpf, mpf_style)
+    return _mpl
+
+def generate_chart(dates, ohlcv, sma200_val, poc_price, val_price, vah_price, price_bins, vol_by_bin, stop_price, sniper_stop):
+    # dates / ohlcv: 最近 LOOKBACK 根 K 棒 (datetime64[D] / (n, 5) 陣列)
+    import pandas as pd
+    plt, mpf, mpf_style = _setup()
+    lookback_slice = pd.DataFrame(np.asarray(ohlcv), index=pd.DatetimeIndex(np.asarray(dates).astype('datetime64[ns]')),
+                                  columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+    atr_mult = config.CORE_PARAMS['ATR_MULT']
+    fig = plt.figure(figsize=(10, 6), facecolor='#161b22')
+    gs = fig.add_gridspec(1, 2,  width_ratios=(3, 1), left=0.05, right=0.95, wspace=0.05)
+    ax1 = fig.add_subplot(gs[0])
+    ax2 = fig.add_subplot(gs[1], sharey=ax1)
+
+    mpf.plot(lookback_slice, type='candle', style=mpf_style, ax=ax1, show_nontrading=False, datetime_format='%Y-%m-%d')
+
+    if not np.isnan(sma200_val):
+         ax1.axhline(y=sma200_val, color='gray', linestyle='--', linewidth=1, label='SMA200', alpha=0.7)
+
+    # 繪製標準 ATR 止盈線 (紅色)
+    if stop_price > 0:
+        ax1.axhline(y=stop_price, color=COLOR_ATR_STOP, linewidth=1.5, linestyle='-', label=f'ATR Stop ({atr_mult}x)', alpha=0.9)
+
+    # 繪製狙擊手止損線 (亮粉色)
+    if sniper_stop > 0:
+        ax1.axhline(y=sniper_stop, color=COLOR_SNIPER_STOP, linewidth=1.5, linestyle=':', label=f'Sniper Stop ({atr_mult}x)', alpha=0.9)
+
+    ax1.axhline(y=poc_price, color='#d29922', linewidth=1.5, linestyle=':', label='POC (Entry Only)', alpha=0.8)
+    ax1.axhline(y=val_price, color='#3fb950', linewidth=1, linestyle='--', label='VAL (Entry Only)', alpha=0.8)
+
+    current_price = lookback_slice['Close'].iloc[-1]
+    ax1.axhline(y=current_price, color='white', linewidth=0.8, linestyle=':')
+    ax1.text(len(lookback_slice) + 1, current_price, f'{current_price:.2f}', color='white', va='center', fontsize=9)
+
+    ax1.set_ylabel("Price")
+    ax1.legend(fontsize='small', facecolor='#161b22', edgecolor='#30363d')
+
+    colors = []
+    for p in price_bins:
+        if val_price <= p <= vah_price: colors.append('#58a6ff')
+        else: colors.append('#30363d')
+
+    poc_idx = np.argmax(vol_by_bin)
+    colors[poc_idx] = '#d29922'
+
+    ax2.barh(price_bins, vol_by_bin, height=(price_bins[1]-price_bins[0])*0.8, align='center', color=colors, alpha=0.8)
+    ax2.axis('off')
+
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', bbox_inches='tight', dpi=100, facecolor=fig.get_facecolor())
+    plt.close(fig)
+    return buf.getvalue()
+
+# ==========================================
+# 快取 & 平行渲染
+# ==========================================
+def chart_key(chart_args):
+    dates, ohlcv, *levels = chart_args
+    h = hashlib.sha256()
+    h.update(f"v{CHART_VERSION}|{COLOR_ATR_STOP}|{COLOR_SNIPER_STOP}|{config.CORE_PARAMS['ATR_MULT']}".encode())
+    h.update(np.asarray(dates, dtype='datetime64[D]').view(np.int64).tobytes())
+    h.update(np.ascontiguousarray(ohlcv, dtype=np.float64).tobytes())
+    for level in levels:
+        h.update(np.ascontiguousarray(level, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+def _cache_path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.png")
+
+def _render_to_cache(chart_args, path):
+    # 回傳渲染秒數 (在子行程中計時，主行程再記入 metrics)
+    t0 = time.perf_counter()
+    fsutil.atomic_write(path, generate_chart(*chart_args))
+    return time.perf_counter() - t0
+
+def prune_cache(cache_dir, max_age_days=7):
+    # 每天的 K 線切片都不同，舊圖表不會再被命中；超過 max_age_days 沒被讀取的就刪掉
+    if not os.path.isdir(cache_dir): return
+    cutoff = time.time() - max_age_days * 86400
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.endswith('.png') and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+def render_charts(jobs, workers=None, cache_dir=None):
+    # jobs: {ticker: chart_args} → {ticker: base64 PNG}；命中快取的不重畫，其餘平行渲染
+    cache_dir = cache_dir or config.CHART_CACHE_DIR
+    paths = {t: _cache_path(chart_key(args), cache_dir) for t, args in jobs.items()}
+    missing = [t for t, path in paths.items() if not os.path.exists(path)]
+    print(f"🖼️ 圖表: {len(jobs) - len(missing)} 張命中快取，{len(missing)} 張需渲染")
+
+    with metrics.stage('chart', cached=len(jobs) - len(missing), rendered=len(missing)) as m:
+        if len(missing) > 1 and workers != 1:
+            with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(missing))) as pool:
+                futures = {t: pool.submit(_render_to_cache, jobs[t], paths[t]) for t in missing}
+                for t, future in futures.items():
+                    try:
+                        metrics.record('chart', t, cached=False, wall_s=round(future.result(), 6))
+                    except Exception as e:
+                        print(f"Error rendering chart for {t}: {e}")
+                        metrics.error('chart', t, e)
+        else:
+            for t in missing:
+                try:
+                    metrics.record('chart', t, cached=False, wall_s=round(_render_to_cache(jobs[t], paths[t]), 6))
+                except Exception as e:
+                    print(f"Error rendering chart for {t}: {e}")
+                    metrics.error('chart', t, e)
+
+        images = {}
+        for t, path in paths.items():
+            if os.path.exists(path):
+                os.utime(path)  # 更新 mtime，供 prune_cache 判斷是否仍在使用
+                with open(path, 'rb') as f:
+                    images[t] = base64.b64encode(f.read()).decode('utf-8')
+        prune_cache(cache_dir)
+        m['bytes'] = sum(len(b) for b in images.values())
+    return images
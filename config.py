@@ -31,4 +31,44 @@ SNIPER_PARAMS = {
 UI_COLORS = {
     'ATR_STOP': '#e5534b',     # 紅色 (長線止盈)
     'SNIPER_STOP': '#ff79c6'   # 亮粉色 (短線止損)
-}
\ No newline at end of file
+}
+
+# --- 5. 💾 本地行情庫 & 數據源 (market_store.py / providers.py) ---
+DATA_DIR = "data"              # 每個 Ticker 一組 .npy (memmap)，歷史保留至 START_DATE
+DATA_PROVIDER = "yfinance"     # 數據源: "yfinance" (線上) / "fixture" (本地 CSV，離線 & benchmark)
+FIXTURE_DIR = "fixtures"       # fixture 數據源的 CSV 目錄 (每個 Ticker 一個檔)
+
+# --- 6. 🖼️ 圖表渲染 (charts.py) ---
+CHART_CACHE_DIR = ".chart_cache"   # 以輸入內容雜湊為鍵的 PNG 快取，內容不變就不重畫
+CHART_OUTPUT = "png"               # "png" = 內嵌 base64 圖片；"data" = 每檔輸出 JSON，由瀏覽器 (assets/charts.js) 繪製
+CHART_DATA_DIR = "chart_data"      # CHART_OUTPUT = "data" 時的 JSON 目錄 (與 index.html 一起發佈)
+
+# --- 7. 📈 成分股市場廣度 (breadth.py) ---
+BREADTH_UNIVERSE_FILE = "universe/sp500.txt"   # 每行一個成分股 Ticker；檔案不存在時改用板塊 ETF
+BREADTH_CALENDAR = "SPY"                       # 對齊用的交易日曆
+
+# --- 8. 📏 執行指標 (metrics.py) ---
+METRICS_FILE = "metrics/metrics.jsonl"   # 每次執行追加各階段的時間 / K 棒數 / 數據量 / RSS / 錯誤 (JSON Lines)
+METRICS_PROM_FILE = None                 # Prometheus textfile 路徑 (例如 node_exporter 的 textfile 目錄)；None = 不輸出
+
+# --- 9. ⚡ 數值核心 (kernels.py) ---
+USE_JIT = True   # 有安裝 numba 時，滾動平均 / ATR / RSI / 滾動最高價 / 價值區擴張改用編譯版 (結果與 NumPy 版逐位元相同)
+
+# --- 10. 🗃️ 訊號歷史 (signal_history.py) ---
+SIGNAL_HISTORY_DB = "data/signal_history.sqlite"   # 每次執行追加的訊號紀錄 (SQLite)；缺少的交易日由本地行情庫回補
+
+# --- 11. 🧩 依賴圖執行器 (pipeline.py) ---
+PIPELINE_STATE_DIR = "data/pipeline"   # 各節點的輸入指紋 & 上次輸出；輸入沒變的節點直接跳過
+PIPELINE_WORKERS = None                # 同時執行的節點數；None = CPU 核心數 + 2 (最多 8)
+
+# --- 12. 🚨 價位警報 (alerts.py) ---
+ALERT_LEVELS = ['stop_price', 'sniper_stop', 'val', 'poc', 'sma200']   # 監看的關卡價位 (scanner 欄位；可加入 'vah')
+ALERT_COOLDOWN_MINUTES = 15                                             # 同一 Ticker 同一價位同一方向在冷卻時間內只發一次
+ALERT_FILE = "alerts/alerts.jsonl"                                      # 事件追加寫入的 JSON Lines 檔；None = 不寫檔
+ALERT_WEBHOOK_URL = None                                                # 事件 POST 的 webhook URL (也可用環境變數 ALERT_WEBHOOK_URL)；None = 不送出
+
+# --- 13. 💼 組合回測 (portfolio.py) ---
+PORTFOLIO_WEIGHTS = None           # {ticker: 配置比例}；None = 等權
+PORTFOLIO_ALLOCATION = "fixed"     # "fixed" = 每檔固定一份資金；"active" = 資金平均分給有持倉的標的
+PORTFOLIO_REBALANCE = "signal"     # "signal" / "weekly" / "monthly" / "daily"
+PORTFOLIO_COST = 0.0005            # 單邊交易成本 (成交金額比例，0.0005 = 5bps)
@@ -0,0 +1,298 @@
+# ==========================================
+# 🔗 CORRELATION (滾動相關性 & 市場狀態)
+# ==========================================
+# structure.py 只有各資產各自的漲跌幅；這裡計算整個觀察清單兩兩之間的滾動共變異數 / 相關係數 (20 / 60 / 120 日)：
+#   - 日對數報酬 (對齊 BREADTH_CALENDAR 的交易日；休市日沿用前一日收盤，最多 FFILL_LIMIT 天)
+#   - 每個視窗一組 Welford 統計量 (平均 + 離差乘積和)：每天加入最新一天、移除掉出視窗的那天，各 O(N²)，
+#     不必每天對整段歷史重算 df.corr()，數百檔也只是幾個 N × N 矩陣
+#   - 每日摘要：板塊平均兩兩相關、股債 (SPY vs TLT) 相關、SPY 視窗報酬 → 市場狀態 (齊漲齊跌 / 分化 / 股債同向)
+# 收盤價讀自 panel_store 的 float32 面板。統計量存在 data/correlation/<清單指紋>.npz：
+# 行情庫每次會重抓最後 REVISE 根日線，所以狀態存在倒數第 REVISE + 1 天，每日更新只從那裡往後推。
+# 清單或參數改變時自動全量重算 (只保留最近 HISTORY 天的每日摘要)。
+#
+# 用法: python correlation.py [--universe-file sp500.txt] [--window 60] [--matrix] [--full] [--no-refresh]
+import os
+import argparse
+import hashlib
+import numpy as np
+import config
+import market_store
+import panel_store
+import metrics
+
+WINDOWS = (20, 60, 120)
+MATRIX_WINDOW = 60      # structure.html 顯示的相關矩陣
+HISTORY = 504           # 全量重算時的每日摘要天數 (約 2 年)
+REVISE = 2              # 行情庫每次重抓的最後幾根日線
+FFILL_LIMIT = 5         # 休市 / 缺值沿用前一日收盤的最多天數
+STOCK, BOND = 'SPY', 'TLT'
+CORR_HIGH, CORR_LOW = 0.7, 0.4   # 板塊平均相關：齊漲齊跌 / 分化的門檻
+STOCK_BOND = 0.3                 # 股債相關超過 ±0.3 才下結論
+INPUT_ATOL = 1e-6                # 檢查點報酬的比對容忍度 (float32 收盤的捨入誤差約 1e-7)
+SUMMARY_FIELDS = [f'{k}_{w}' for w in WINDOWS for k in ('avg_corr', 'stock_bond', 'stock_ret')]
+
+# ==========================================
+# 1. 滾動視窗的 Welford 共變異數
+# ==========================================
+class RollingCov:
+    # 固定長度視窗：add / remove 各一次外積更新；missing 為各資產在視窗內的缺值天數 (缺值以 0 代入)
+    def __init__(self, n_assets, window):
+        self.window = window
+        self.n = 0
+        self.mean = np.zeros(n_assets)
+        self.m2 = np.zeros((n_assets, n_assets))
+        self.missing = np.zeros(n_assets, dtype=np.int64)
+
+    def add(self, x, missing):
+        self.n += 1
+        dx = x - self.mean
+        self.mean += dx / self.n
+        self.m2 += np.outer(dx, x - self.mean)
+        self.missing += missing
+
+    def remove(self, x, missing):
+        self.n -= 1
+        dx = x - self.mean
+        self.mean -= dx / self.n
+        self.m2 -= np.outer(dx, x - self.mean)
+        self.missing -= missing
+
+    @property
+    def full(self):
+        return self.n == self.window
+
+    def cov(self):
+        return self.m2 / (self.n - 1)
+
+    def corr(self, idx=None):
+        # 視窗內有缺值或沒有波動的資產 → NaN；idx: 只算部分資產 (子矩陣)
+        idx = np.arange(len(self.mean)) if idx is None else np.asarray(idx)
+        m2 = self.m2[np.ix_(idx, idx)]
+        sd = np.sqrt(np.maximum(np.diag(m2), 0))
+        bad = (self.missing[idx] > 0) | (sd == 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.clip(m2 / np.outer(sd, sd), -1, 1)
+        corr[bad, :] = np.nan
+        corr[:, bad] = np.nan
+        return corr
+
+    def to_state(self, prefix):
+        return {f'{prefix}_n': np.array(self.n), f'{prefix}_mean': self.mean.copy(),
+                f'{prefix}_m2': self.m2.copy(), f'{prefix}_missing': self.missing.copy()}
+
+    @classmethod
+    def from_state(cls, state, prefix, window):
+        obj = cls(len(state[f'{prefix}_mean']), window)
+        obj.n = int(state[f'{prefix}_n'])
+        obj.mean = state[f'{prefix}_mean'].copy()
+        obj.m2 = state[f'{prefix}_m2'].copy()
+        obj.missing = state[f'{prefix}_missing'].copy()
+        return obj
+
+def log_returns(close):
+    # close: (tickers, dates) → 日對數報酬；缺值沿用前一日收盤 (最多 FFILL_LIMIT 天)，再之前的缺值維持 NaN
+    n = close.shape[1]
+    last = np.maximum.accumulate(np.where(np.isnan(close), -1, np.arange(n)), axis=1)
+    ok = (last >= 0) & (np.arange(n) - last <= FFILL_LIMIT)
+    filled = np.where(ok, np.take_along_axis(close, np.maximum(last, 0), axis=1), np.nan)
+    ret = np.full(close.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ret[:, 1:] = np.log(filled[:, 1:] / filled[:, :-1])
+    ret[~np.isfinite(ret)] = np.nan
+    return ret
+
+# ==========================================
+# 2. 每日摘要 & 市場狀態
+# ==========================================
+def default_group(tickers):
+    # 平均相關所用的族群：structure.py 的板塊 ETF (不在清單內時用全部)
+    import structure
+    group = [t for t in structure.tickers_config['Sectors'] if t in tickers]
+    return group if len(group) >= 2 else list(tickers)
+
+def summary(stat, group_idx, stock, bond):
+    c = stat.corr(group_idx)
+    iu = np.triu_indices(len(group_idx), 1)
+    pairs = c[iu]
+    avg = float(np.nanmean(pairs)) if np.any(~np.isnan(pairs)) else np.nan
+    sb = float(stat.corr([stock, bond])[0, 1]) if stock is not None and bond is not None else np.nan
+    ret = float(stat.mean[stock] * stat.window) if stock is not None and stat.missing[stock] == 0 else np.nan
+    return avg, sb, ret
+
+def regime(latest):
+    # 短視窗的板塊平均相關 → 齊漲齊跌 / 分化；與長視窗比較看趨勢；股債相關看債券是否還能避險
+    c = latest.get(f'avg_corr_{WINDOWS[0]}', np.nan)
+    c_long = latest.get(f'avg_corr_{WINDOWS[-1]}', np.nan)
+    ret = latest.get(f'stock_ret_{WINDOWS[0]}', np.nan)
+    sb = latest.get(f'stock_bond_{MATRIX_WINDOW}', np.nan)
+    if np.isnan(c): title, color = "⚪ 數據不足", "#8b949e"
+    elif c >= CORR_HIGH and ret < 0: title, color = "🔴 齊跌：板塊高度同步下跌 (系統性風險 / Risk-Off)", "#ff7b72"
+    elif c >= CORR_HIGH: title, color = "🟡 齊漲：Beta 主導，板塊同步", "#d29922"
+    elif c <= CORR_LOW: title, color = "🟢 分化：板塊輪動 / 選股行情", "#3fb950"
+    else: title, color = "⚪ 正常：板塊相關性中等", "#8b949e"
+    trend = "" if np.isnan(c) or np.isnan(c_long) else (
+        "相關性快速升高" if c - c_long > 0.15 else "相關性下降" if c - c_long < -0.15 else "相關性持平")
+    if np.isnan(sb): bond = ""
+    elif sb > STOCK_BOND: bond = "⚠️ 股債同向 (債券避險失效)"
+    elif sb < -STOCK_BOND: bond = "🛡️ 股債負相關 (債券可避險)"
+    else: bond = "股債相關性低"
+    return {'title': title, 'color': color, 'trend': trend, 'bond': bond}
+
+# ==========================================
+# 3. 狀態存取 & 增量更新
+# ==========================================
+def universe_key(tickers, group, calendar):
+    text = '|'.join([calendar, *tickers, '#', *group, *map(str, (*WINDOWS, HISTORY, REVISE, FFILL_LIMIT)),
+                     np.dtype(panel_store.DTYPE).name])
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def state_path(key, data_dir=None):
+    return os.path.join(data_dir or config.DATA_DIR, 'correlation', f"{key[:16]}.npz")
+
+def load_state(path):
+    if not os.path.exists(path): return None
+    with np.load(path) as f:
+        return {k: f[k] for k in f.files}
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **state)
+    os.replace(tmp, path)
+
+def _inputs(close, i):
+    # 檢查點時視窗內實際用到的日對數報酬：晚到的數據 / 修訂過的歷史 → 不能接續。
+    # 比對報酬而不是價位：除權息的回溯調整把整段收盤乘上同一個比例，報酬不變
+    wmax = max(WINDOWS)
+    region = np.asarray(close[:, max(i - wmax - FFILL_LIMIT - 1, 0):i + 1], dtype=np.float64)
+    return log_returns(region)[:, -wmax:].astype(np.float32)
+
+def _same_inputs(old, new):
+    return old.shape == new.shape and np.allclose(old, new, rtol=0, atol=INPUT_ATOL, equal_nan=True)
+
+def _checkpoint(stats, dates, close, i):
+    return {'checkpoint': dates[i], 'inputs': _inputs(close, i),
+            **{k: v for w, s in stats.items() for k, v in s.to_state(f'w{w}').items()}}
+
+def update(tickers=None, group=None, calendar=None, data_dir=None, full=False):
+    # → {'tickers', 'dates', 每日摘要..., 'stats': {視窗: RollingCov (最新一天)}}
+    import structure
+    tickers = list(dict.fromkeys(tickers or structure.all_tickers))
+    group = [t for t in (group or default_group(tickers)) if t in tickers]
+    calendar = calendar or config.BREADTH_CALENDAR
+    key = universe_key(tickers, group, calendar)
+    path = state_path(key, data_dir)
+
+    panel = panel_store.load(tickers, calendar=calendar, data_dir=data_dir)
+    dates = panel.dates64
+    n_days, wmax = len(dates), max(WINDOWS)
+    if n_days < 2: raise ValueError(f"本地行情庫沒有交易日曆 {calendar} 的數據")
+
+    state = None if full else load_state(path)
+    if state is not None:
+        ci = int(np.searchsorted(dates, state['checkpoint']))
+        if str(state['key']) != key or ci >= n_days or dates[ci] != state['checkpoint']: state = None
+        elif not _same_inputs(state['inputs'], _inputs(panel['Close'], ci)):
+            print("⚠️ 檢查點之前的數據有變動 (晚到 / 修訂)，全量重算相關性")
+            state = None
+    if state is None:
+        begin = max(1, n_days - HISTORY - wmax + 1)
+        stats = {w: RollingCov(len(tickers), w) for w in WINDOWS}
+    else:
+        begin = ci + 1
+        stats = {w: RollingCov.from_state(state, f'w{w}', w) for w in WINDOWS}
+
+    # 往前多讀 wmax 根 (移出視窗) + FFILL_LIMIT 根 (沿用收盤)：同一天的報酬每次算出來都一樣
+    lo = max(begin - wmax - FFILL_LIMIT - 1, 0)
+    ret = log_returns(np.asarray(panel['Close'][:, lo:], dtype=np.float64))
+    missing = np.isnan(ret).astype(np.int64)
+    ret = np.nan_to_num(ret)
+
+    slot = {t: i for i, t in enumerate(tickers)}
+    group_idx = [slot[t] for t in group]
+    stock, bond = slot.get(STOCK), slot.get(BOND)
+    ckpt_at = n_days - 1 - REVISE
+    ckpt = _checkpoint(stats, dates, panel['Close'], begin - 1)
+    days, rows = [], []
+    for t in range(begin, n_days):
+        j = t - lo
+        for w, s in stats.items():
+            if s.full: s.remove(ret[:, j - w], missing[:, j - w])
+            s.add(ret[:, j], missing[:, j])
+        if t == ckpt_at:
+            ckpt = _checkpoint(stats, dates, panel['Close'], t)
+        if stats[wmax].full:
+            days.append(dates[t])
+            rows.append([x for w in WINDOWS for x in summary(stats[w], group_idx, stock, bond)])
+
+    rows = np.array(rows, dtype=np.float64).reshape(len(rows), len(SUMMARY_FIELDS))
+    new = {'dates': np.array(days, dtype='datetime64[D]'), **{f: rows[:, i] for i, f in enumerate(SUMMARY_FIELDS)}}
+    if state is not None:
+        keep = state['dates'] <= dates[begin - 1]
+        new = {k: np.concatenate([state[k][keep], new[k]])[-HISTORY:] for k in ['dates', *SUMMARY_FIELDS]}
+    save_state(path, {**new, **ckpt, 'key': np.array(key)})
+    print(f"🔗 相關性: {len(tickers)} 檔，{'增量' if state is not None else '全量'}推進 {n_days - begin} 天")
+    return {'tickers': tickers, 'group': group, **new, 'stats': stats}
+
+def latest(result, i=-1):
+    return {'date': str(result['dates'][i]), **{f: float(result[f][i]) for f in SUMMARY_FIELDS}}
+
+def shifts(result, top=5):
+    # 短 / 長視窗相關性差距最大的組合 (相關性突然改變)
+    short, long_ = result['stats'][WINDOWS[0]].corr(), result['stats'][WINDOWS[-1]].corr()
+    iu = np.triu_indices(len(result['tickers']), 1)
+    diff = (short - long_)[iu]
+    order = [k for k in np.argsort(-np.abs(np.nan_to_num(diff))) if not np.isnan(diff[k])][:top]
+    return [(result['tickers'][iu[0][k]], result['tickers'][iu[1][k]], float(short[iu][k]), float(long_[iu][k])) for k in order]
+
+def get_correlation(tickers=None, refresh=True):
+    # structure.py 使用：失敗時回傳 None，不影響其餘表格
+    try:
+        import structure
+        tickers = tickers or structure.all_tickers
+        if refresh: market_store.refresh(list(dict.fromkeys([*tickers, config.BREADTH_CALENDAR])))
+        with metrics.stage('correlation', tickers=len(tickers)) as m:
+            result = update(tickers)
+            m['rows'] = len(result['dates'])
+        if len(result['dates']) == 0: return None
+        now = latest(result)
+        return {**now, 'regime': regime(now), 'tickers': result['tickers'], 'window': MATRIX_WINDOW,
+                'matrix': result['stats'][MATRIX_WINDOW].corr(), 'shifts': shifts(result),
+                'avg_corr_history': result[f'avg_corr_{WINDOWS[0]}'][-60:]}
+    except Exception as e:
+        print(f"❌ 計算相關性時發生錯誤: {e}")
+        return None
+
+if __name__ == "__main__":
+    import scanner
+    import structure
+    parser = argparse.ArgumentParser(description="滾動相關性 (20 / 60 / 120 日) & 市場狀態")
+    parser.add_argument('--universe-file', default=None, help="Ticker 清單檔 (每行一個)，預設 structure.py 的觀察清單")
+    parser.add_argument('--window', type=int, choices=WINDOWS, default=MATRIX_WINDOW)
+    parser.add_argument('--matrix', action='store_true', help="印出相關矩陣")
+    parser.add_argument('--full', action='store_true', help="忽略已存狀態，全量重算")
+    parser.add_argument('--no-refresh', action='store_true', help="不更新行情，只讀本地行情庫")
+    parser.add_argument('--days', type=int, default=10)
+    args = parser.parse_args()
+
+    tickers = scanner.read_universe(args.universe_file) if args.universe_file else structure.all_tickers
+    if not args.no_refresh: market_store.refresh(list(dict.fromkeys([*tickers, config.BREADTH_CALENDAR])))
+    result = update(tickers, full=args.full)
+    if len(result['dates']) == 0:
+        print("❌ 歷史不足以計算相關性")
+    else:
+        print(f"{'Date':<12}" + "".join(f"{'AvgCorr' + str(w):>12}" for w in WINDOWS) + f"{'SPY/TLT ' + str(args.window):>14}")
+        for i in range(-min(args.days, len(result['dates'])), 0):
+            r = latest(result, i)
+            print(f"{r['date']:<12}" + "".join(f"{r[f'avg_corr_{w}']:>12.2f}" for w in WINDOWS) + f"{r[f'stock_bond_{args.window}']:>14.2f}")
+        state = regime(latest(result))
+        print(f"\n📌 {state['title']} | {state['trend']} | {state['bond']}")
+        print("🔀 相關性變化最大 (20日 vs 120日):")
+        for a, b, s, l in shifts(result):
+            print(f"   {a:<10} {b:<10} {l:+.2f} → {s:+.2f}")
+        if args.matrix:
+            corr = result['stats'][args.window].corr()
+            print(f"\n{'':<10}" + "".join(f"{t[:7]:>8}" for t in result['tickers']))
+            for t, row in zip(result['tickers'], corr):
+                print(f"{t[:10]:<10}" + "".join(f"{v:>8.2f}" for v in row))
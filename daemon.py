@@ -0,0 +1,141 @@
+# ==========================================
+# 🔁 DASHBOARD DAEMON (常駐儀表板)
+# ==========================================
+# main.py / structure.py 每次都是冷啟動：載入模組、下載、全部重算、寫 HTML 後結束。
+# daemon 常駐同一個行程，一天可以更新很多次：
+#   - 每輪只做一次增量下載 (market_store.refresh，delta-only)
+#   - 以每個 Ticker 的「K 棒數 + 最後日期 + 最後一根 OHLCV」判斷數據是否改變 (盤中最後一根會持續變動)
+#   - 訊號卡片 / 圖表 / 結構表只重算、重畫有變動的部分；其餘沿用記憶體中上一輪的結果
+#   - index.html / structure.html 以原子寫入 (fsutil.atomic_write) 更新，讀取端不會看到寫一半的檔案
+#
+# 用法: python daemon.py [--interval 300] [--no-charts] [--once]
+import time
+import argparse
+import datetime
+import config
+import market_store
+import fsutil
+import metrics
+import main as dashboard
+import structure
+import breadth
+import correlation
+import signal_history
+
+class Dashboard:
+    def __init__(self, charts=True, chart_workers=None, with_breadth=True):
+        self.charts = charts
+        self.chart_workers = chart_workers
+        self.with_breadth = with_breadth
+        self.breadth_tickers = breadth.default_universe() if with_breadth else []
+        self.universe = list(dict.fromkeys([*dashboard.target_tickers, *structure.all_tickers,
+                                            *self.breadth_tickers, config.BREADTH_CALENDAR]))
+        self.fingerprints = {}
+        self.results = {}       # ticker → calculate_data 結果
+        self.cards = {}         # ticker → 卡片 HTML
+        self.breadth_stats = None
+        self.corr_stats = None
+        self.renders = 0
+
+    def changed(self):
+        # 與上一輪比較，回傳數據有變動的 Ticker
+        changed = []
+        for t in self.universe:
+            fp = market_store.fingerprint(t)
+            if fp != self.fingerprints.get(t):
+                self.fingerprints[t] = fp
+                changed.append(t)
+        return changed
+
+    def update_signals(self, tickers):
+        for t in tickers:
+            res = dashboard.calculate_data(t)
+            if res:
+                self.results[t] = res
+            else:
+                self.results.pop(t, None)
+                self.cards.pop(t, None)
+
+        fresh = [t for t in tickers if t in self.results]
+        images, data = {}, {}
+        if self.charts and fresh:
+            jobs = {t: self.results[t]['chart_args'] for t in fresh}
+            if config.CHART_OUTPUT == 'data':
+                import chart_data
+                data = chart_data.write_chart_data(jobs)
+            else:
+                import charts
+                images = charts.render_charts(jobs, workers=self.chart_workers)
+        for t in fresh:
+            self.cards[t] = dashboard.build_card(self.results[t], images.get(t), data.get(t))
+
+        results = [self.results[t] for t in dashboard.target_tickers if t in self.results]
+        signal_history.record([self.results[t] for t in fresh])  # 盤中每次變動都追加一筆，查詢時取當天最後一筆
+        history = signal_history.dashboard_html([res['ticker'] for res in results])
+        scripts = dashboard.CHART_SCRIPT if self.charts and config.CHART_OUTPUT == 'data' else ""
+        with metrics.stage('html_write', file="index.html") as m:
+            html = dashboard.build_html(results, self.cards, announce=self.renders == 0, scripts=scripts, history=history)
+            m['bytes'] = len(html.encode('utf-8'))
+            fsutil.atomic_write("index.html", html)
+
+    def update_structure(self, update_breadth, update_corr=True):
+        table = structure.get_data(refresh=False)
+        if update_breadth: self.breadth_stats = breadth.get_breadth(self.breadth_tickers, refresh=False)
+        if update_corr: self.corr_stats = correlation.get_correlation(refresh=False)
+        with metrics.stage('html_write', file="structure.html") as m:
+            html = structure.build_html(table, self.breadth_stats, self.corr_stats)
+            m['bytes'] = len(html.encode('utf-8'))
+            fsutil.atomic_write("structure.html", html)
+
+    def cycle(self, refresh=True):
+        t0 = time.perf_counter()
+        metrics.start_run('daemon')
+        try:
+            return self._cycle(refresh, t0)
+        finally:
+            metrics.flush()
+
+    def _cycle(self, refresh, t0):
+        if refresh: market_store.refresh(self.universe, force=True)
+        changed = set(self.changed())
+        first = self.renders == 0
+
+        signal_changed = [t for t in dashboard.target_tickers if t in changed]
+        if signal_changed or first:
+            self.update_signals(signal_changed)
+        structure_changed = first or any(t in changed for t in structure.all_tickers)
+        breadth_changed = self.with_breadth and (first or any(t in changed for t in self.breadth_tickers)
+                                                 or config.BREADTH_CALENDAR in changed)
+        if structure_changed or breadth_changed:
+            self.update_structure(breadth_changed, structure_changed)
+
+        self.renders += 1
+        now = datetime.datetime.now().strftime('%H:%M:%S')
+        print(f"🔁 [{now}] 變動 {len(changed)} 檔 | 訊號重算 {len(signal_changed)} 檔"
+              f"{' | 結構表更新' if structure_changed or breadth_changed else ''} ({time.perf_counter() - t0:.1f}s)")
+        return changed
+
+    def run(self, interval=300, refresh=True):
+        while True:
+            try:
+                self.cycle(refresh)
+            except Exception as e:
+                print(f"❌ 更新失敗: {e}")
+            time.sleep(interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="常駐儀表板：定時增量更新，只重算有變動的 Ticker")
+    parser.add_argument('--interval', type=int, default=300, help="輪詢間隔秒數")
+    parser.add_argument('--no-charts', action='store_true', help="略過圖表渲染")
+    parser.add_argument('--chart-workers', type=int, default=None)
+    parser.add_argument('--no-breadth', action='store_true', help="不計算成分股市場廣度")
+    parser.add_argument('--no-refresh', action='store_true', help="不下載，只監看本地行情庫 (由其他行程更新)")
+    parser.add_argument('--once', action='store_true', help="只跑一輪 (測試用)")
+    args = parser.parse_args()
+
+    daemon = Dashboard(charts=not args.no_charts, chart_workers=args.chart_workers, with_breadth=not args.no_breadth)
+    try:
+        if args.once: daemon.cycle(refresh=not args.no_refresh)
+        else: daemon.run(args.interval, refresh=not args.no_refresh)
+    except KeyboardInterrupt:
+        print("👋 daemon 已停止")
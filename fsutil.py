@@ -0,0 +1,17 @@
+# ==========================================
+# 📁 FILE UTILITIES (原子寫入)
+# ==========================================
+# 先寫同目錄的暫存檔，再以 os.replace 一次換上：
+# 讀取端 (瀏覽器 / GitHub Pages / daemon 的另一次渲染) 永遠只會看到完整的舊檔或新檔。
+import os
+
+def atomic_write(path, data, encoding="utf-8"):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    binary = isinstance(data, (bytes, bytearray))
+    with open(tmp, 'wb' if binary else 'w', encoding=None if binary else encoding) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
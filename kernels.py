@@ -0,0 +1,166 @@
+# ==========================================
+# ⚡ COMPILED KERNELS (Numba 編譯版的指標核心)
+# ==========================================
+# signal_engine 的熱點：SMA / ATR / RSI 的滾動平均、止盈止損的滾動最高收盤、價值區擴張。
+# NumPy 版每一步都會產生 (paths, bars) 大小的暫存陣列；這裡改成逐列的編譯迴圈，不配置暫存。
+#   - 有安裝 numba 且 config.USE_JIT = True 時，signal_engine 自動改用這裡的版本
+#   - 沒有 numba 時 signal_engine 沿用原本的 NumPy 實作 (即 fallback)，結果逐位元相同：
+#     滾動平均同樣依序相加每個視窗、NaN 的比較 / 傳遞規則與 NumPy 一致
+# 載入 numba 本身就要約 2 秒：只有工作量 ≥ MIN_WORK (元素數 × 視窗) 時才載入並編譯 (cache=True 存到 __pycache__)，
+# main.py / signals-only 只算尾段 K 棒，不會觸發；載入後所有呼叫都走編譯版。
+# 環境變數 SIGNAL_ENGINE_JIT=0 可強制停用。
+import os
+import importlib.util
+import numpy as np
+import config
+
+MIN_WORK = 2_000_000
+
+_kernels = None
+_available = None
+
+def enabled(work):
+    global _available
+    if _available is None:
+        _available = (config.USE_JIT and os.environ.get('SIGNAL_ENGINE_JIT') != '0'
+                      and importlib.util.find_spec('numba') is not None)
+    return _available and (_kernels is not None or work >= MIN_WORK)
+
+# ==========================================
+# 1. 逐列迴圈 (x: (rows, n) float64)
+# ==========================================
+def _rolling_mean_rows(x, window, out):
+    rows, n = x.shape
+    for r in range(rows):
+        for j in range(n - window + 1):
+            s = x[r, j]
+            for k in range(1, window):
+                s += x[r, j + k]
+            out[r, j + window - 1] = s / window
+
+def _rolling_extreme_rows(x, window, is_max, out):
+    # 視窗內有 NaN 時結果為 NaN (同 ndarray.max / min)
+    rows, n = x.shape
+    for r in range(rows):
+        for j in range(n - window + 1):
+            m = x[r, j]
+            for k in range(1, window):
+                if np.isnan(m): break
+                v = x[r, j + k]
+                if np.isnan(v) or (v > m if is_max else v < m): m = v
+            out[r, j + window - 1] = m
+
+def _fmax(a, b):
+    if np.isnan(a): return b
+    if np.isnan(b): return a
+    return a if a >= b else b
+
+def _true_range_rows(high, low, close, out):
+    rows, n = close.shape
+    for r in range(rows):
+        out[r, 0] = high[r, 0] - low[r, 0]  # 第一根沒有前一日收盤 (fmax 略過 NaN)
+        for i in range(1, n):
+            pc = close[r, i - 1]
+            out[r, i] = _fmax(high[r, i] - low[r, i], _fmax(abs(high[r, i] - pc), abs(low[r, i] - pc)))
+
+def _rsi_rows(close, window, out):
+    # gain / loss 與 NumPy 版相同 (含 -0.0)，再依序加總每個視窗
+    rows, n = close.shape
+    gain = np.empty(n)
+    loss = np.empty(n)
+    for r in range(rows):
+        gain[0] = 0.0
+        loss[0] = -0.0
+        for i in range(1, n):
+            d = close[r, i] - close[r, i - 1]
+            gain[i] = d if d > 0 else 0.0
+            loss[i] = -(d if d < 0 else 0.0)
+        for j in range(n - window + 1):
+            g = gain[j]
+            l = loss[j]
+            for k in range(1, window):
+                g += gain[j + k]
+                l += loss[j + k]
+            rs = (g / window) / (l / window)  # error_model='numpy'：除以 0 得 inf / NaN，同 NumPy
+            out[r, j + window - 1] = 100 - (100 / (1 + rs))
+
+def _expand_value_area_rows(vol_bin, target_v, poc_idx, low, up):
+    rows, bins = vol_bin.shape
+    for r in range(rows):
+        p = 0
+        for b in range(1, bins):
+            if np.isnan(vol_bin[r, p]): break  # 同 np.argmax：第一個 NaN
+            if np.isnan(vol_bin[r, b]) or vol_bin[r, b] > vol_bin[r, p]: p = b
+        poc_idx[r] = p
+        lo, hi = p, p
+        curr_v = vol_bin[r, p]
+        for _ in range(bins - 1):
+            if not curr_v < target_v[r]: break
+            v_u = vol_bin[r, hi + 1] if hi < bins - 1 else 0.0
+            v_d = vol_bin[r, lo - 1] if lo > 0 else 0.0
+            if v_u == 0 and v_d == 0: break
+            if v_u > v_d:
+                hi += 1
+                curr_v += v_u
+            else:
+                lo -= 1
+                curr_v += v_d
+        low[r] = lo
+        up[r] = hi
+
+def _compile():
+    global _kernels
+    if _kernels is None:
+        import numba
+        jit = numba.njit(cache=True, nogil=True, error_model='numpy')
+        global _fmax
+        _fmax = jit(_fmax)  # 被其他核心呼叫，需先編譯
+        _kernels = {f.__name__: jit(f) for f in (_rolling_mean_rows, _rolling_extreme_rows, _true_range_rows,
+                                                  _rsi_rows, _expand_value_area_rows)}
+    return _kernels
+
+# ==========================================
+# 2. 與 signal_engine 相同的介面 (沿最後一個軸，任意前置維度)
+# ==========================================
+def _rows(x):
+    x = np.asarray(x, dtype=np.float64)
+    return np.ascontiguousarray(x.reshape(int(np.prod(x.shape[:-1])), x.shape[-1])), x.shape  # 不用 -1：長度 0 時無法推算
+
+def rolling_mean(x, window):
+    x2, shape = _rows(x)
+    out = np.full(x2.shape, np.nan)
+    _compile()['_rolling_mean_rows'](x2, window, out)
+    return out.reshape(shape)
+
+def rolling_max(x, window):
+    x2, shape = _rows(x)
+    out = np.full(x2.shape, np.nan)
+    _compile()['_rolling_extreme_rows'](x2, window, True, out)
+    return out.reshape(shape)
+
+def rolling_min(x, window):
+    x2, shape = _rows(x)
+    out = np.full(x2.shape, np.nan)
+    _compile()['_rolling_extreme_rows'](x2, window, False, out)
+    return out.reshape(shape)
+
+def true_range(high, low, close):
+    (h, shape), (l, _), (c, _) = _rows(high), _rows(low), _rows(close)
+    out = np.empty(c.shape)
+    if c.shape[-1]: _compile()['_true_range_rows'](h, l, c, out)
+    return out.reshape(shape)
+
+def rsi(close, window):
+    c, shape = _rows(close)
+    out = np.full(c.shape, np.nan)
+    _compile()['_rsi_rows'](c, window, out)
+    return out.reshape(shape)
+
+def expand_value_area(vol_bin, va_pct):
+    # 目標成交量沿用 NumPy 的 sum (與 fallback 相同的加總順序)
+    vol_bin = np.ascontiguousarray(vol_bin, dtype=np.float64)
+    target_v = vol_bin.sum(axis=1) * va_pct
+    rows = vol_bin.shape[0]
+    poc_idx, low, up = (np.empty(rows, dtype=np.intp) for _ in range(3))
+    _compile()['_expand_value_area_rows'](vol_bin, target_v, poc_idx, low, up)
+    return poc_idx, low, up
@@ -1,23 +1,14 @@
-import yfinance as yf
-import pandas as pd
-import numpy as np
 import datetime
 from zoneinfo import ZoneInfo
 import os
-import matplotlib
-matplotlib.use('Agg') # 設定後端為非互動模式
-import matplotlib.pyplot as plt
-import mplfinance as mpf
-import io
-import base64
+import re
+import json
+import argparse
 import config  # <--- 引入配置檔
-
-# ==========================================
-# 0. 系統設定
-# ==========================================
-plt.rcParams['axes.unicode_minus'] = False 
-plt.style.use('dark_background')
-mpf_style = mpf.make_mpf_style(base_mpf_style='nightclouds', rc={'axes.grid': False})
+import market_store  # 本地行情庫 (增量更新)
+import signal_engine as se  # 指標 & 決策樹數值 (純 NumPy)
+import fsutil  # 原子寫入 (不會留下寫一半的 HTML)
+import metrics  # 分段計時 & 資源紀錄
 
 # ==========================================
 # 1. 讀取策略參數 (從 config.py)
@@ -88,6 +79,11 @@ html_template = """
         .m-alert {{ color: #ff7b72; border: 1px solid #ff7b72; padding: 10px; border-radius: 6px; background-color: rgba(255, 123, 114, 0.1); font-weight: bold; }}
         .m-warning {{ color: #d29922; border: 1px solid #d29922; padding: 10px; border-radius: 6px; background-color: rgba(210, 153, 34, 0.1); font-weight: bold; }}
         .m-normal {{ color: #8b949e; border: 1px dashed #30363d; padding: 10px; border-radius: 6px; }}
+
+        .history-title {{ font-size: 1.2em; font-weight: bold; margin: 30px 0 15px; color: #58a6ff; }}
+        table.history {{ width: 100%; border-collapse: collapse; margin-bottom: 10px; font-size: 0.9em; }}
+        table.history th {{ color: #8b949e; font-weight: normal; text-align: left; border-bottom: 1px solid #30363d; padding: 4px; }}
+        table.history td {{ border-bottom: 1px solid #21262d; padding: 4px; }}
     </style>
 </head>
 <body>
@@ -108,124 +104,36 @@ html_template = """
             {m_msg}
         </div>
     </div>
-</body>
+{scripts}</body>
 </html>
 """
 
-# ==========================================
-# 3. 輔助函數
-# ==========================================
-def calculate_rsi(data, window=14):
-    delta = data.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def generate_chart(df_daily, lookback_slice, sma200_val, poc_price, val_price, vah_price, price_bins, vol_by_bin, stop_price, sniper_stop):
-    fig = plt.figure(figsize=(10, 6), facecolor='#161b22')
-    gs = fig.add_gridspec(1, 2,  width_ratios=(3, 1), left=0.05, right=0.95, wspace=0.05)
-    ax1 = fig.add_subplot(gs[0])
-    ax2 = fig.add_subplot(gs[1], sharey=ax1)
-
-    mpf.plot(lookback_slice, type='candle', style=mpf_style, ax=ax1, show_nontrading=False, datetime_format='%Y-%m-%d')
-    
-    if not np.isnan(sma200_val):
-         ax1.axhline(y=sma200_val, color='gray', linestyle='--', linewidth=1, label='SMA200', alpha=0.7)
-
-    # 繪製標準 ATR 止盈線 (紅色)
-    if stop_price > 0:
-        ax1.axhline(y=stop_price, color=COLOR_ATR_STOP, linewidth=1.5, linestyle='-', label=f'ATR Stop ({atr_mult}x)', alpha=0.9)
-    
-    # 繪製狙擊手止損線 (亮粉色)
-    if sniper_stop > 0:
-        ax1.axhline(y=sniper_stop, color=COLOR_SNIPER_STOP, linewidth=1.5, linestyle=':', label=f'Sniper Stop ({atr_mult}x)', alpha=0.9)
-
-    ax1.axhline(y=poc_price, color='#d29922', linewidth=1.5, linestyle=':', label='POC (Entry Only)', alpha=0.8)
-    ax1.axhline(y=val_price, color='#3fb950', linewidth=1, linestyle='--', label='VAL (Entry Only)', alpha=0.8)
-    
-    current_price = lookback_slice['Close'].iloc[-1]
-    ax1.axhline(y=current_price, color='white', linewidth=0.8, linestyle=':')
-    ax1.text(len(lookback_slice) + 1, current_price, f'{current_price:.2f}', color='white', va='center', fontsize=9)
-
-    ax1.set_ylabel("Price")
-    ax1.legend(fontsize='small', facecolor='#161b22', edgecolor='#30363d')
-
-    colors = []
-    for p in price_bins:
-        if val_price <= p <= vah_price: colors.append('#58a6ff') 
-        else: colors.append('#30363d') 
-            
-    poc_idx = np.argmax(vol_by_bin)
-    colors[poc_idx] = '#d29922' 
-
-    ax2.barh(price_bins, vol_by_bin, height=(price_bins[1]-price_bins[0])*0.8, align='center', color=colors, alpha=0.8)
-    ax2.axis('off') 
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', dpi=100, facecolor=fig.get_facecolor())
-    buf.seek(0)
-    img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close(fig)
-    return img_base64
-
-# ==========================================
-# 4. 核心運算
+# 3. 核心運算
 # ==========================================
 def calculate_data(ticker):
+    # 指標 / 成交量分佈 / 止盈止損由 signal_engine 計算 (純 NumPy，讀本地行情庫的 memmap)
     try:
-        df_daily = yf.download(ticker, period="3y", interval="1d", progress=False)
-        if isinstance(df_daily.columns, pd.MultiIndex): df_daily.columns = df_daily.columns.get_level_values(0)
-        
-        if len(df_daily) < 200: return None
-        sma200 = df_daily['Close'].rolling(window=200).mean().iloc[-1]
-        
-        # 計算 ATR & Panic
-        prev_close = df_daily['Close'].shift(1)
-        tr = pd.concat([df_daily['High']-df_daily['Low'], (df_daily['High']-prev_close).abs(), (df_daily['Low']-prev_close).abs()], axis=1).max(axis=1)
-        atr = tr.rolling(window=14).mean().iloc[-1]
-        is_panic = (df_daily['High'].iloc[-1] - df_daily['Low'].iloc[-1]) > (panic_mult * atr)
-        
-        # 計算 RSI & Bias
-        rsi_series = calculate_rsi(df_daily['Close'])
-        rsi = rsi_series.iloc[-1]
-        bias = (df_daily['Close'].iloc[-1] - sma200) / sma200
-        
-        current_price = df_daily['Close'].iloc[-1]
+        arrays = market_store.load_arrays(ticker)
+        if arrays is None or len(arrays[0]) < 200: return None
+        dates, ohlcv = arrays
+        tail = ohlcv[-se.tail_size():]
+        high, low, close, volume = tail[:, 1], tail[:, 2], tail[:, 3], tail[:, 4]
+        with metrics.stage('volume_profile', ticker, rows=len(close)):
+            profile = se.rolling_profile(high, low, close, volume, lookback_days, bins_count, tail=1)
+        with metrics.stage('indicators', ticker, rows=len(close)):
+            bar = se.last_bar(high, low, close, volume, profile=profile)
+        if bar is None: return None
+
+        sma200, atr, rsi, bias = bar['sma200'], bar['atr'], bar['rsi'], bar['bias']
+        is_panic = bar['day_range'] > (panic_mult * atr)
+
+        current_price = close[-1]
         is_bull_market = current_price > sma200
         is_sniper_zone = (rsi < sniper_rsi_threshold) and (bias < sniper_bias_threshold)
-        
-        # 切割數據
-        df_slice = df_daily.iloc[-lookback_days:].copy()
-        p_slice = (df_slice['High'] + df_slice['Low'] + df_slice['Close']) / 3
-        v_slice = df_slice['Volume']
-        
-        range_min = df_slice['Low'].min()
-        range_max = df_slice['High'].max()
-        vol_bin, bin_edges = np.histogram(p_slice, bins=bins_count, range=(range_min, range_max), weights=v_slice)
-        poc_idx = np.argmax(vol_bin)
-        bin_mids = (bin_edges[:-1] + bin_edges[1:]) / 2
-        poc_price = bin_mids[poc_idx]
-        
-        target_v = vol_bin.sum() * va_pct
-        curr_v = vol_bin[poc_idx]
-        up, low = poc_idx, poc_idx
-        while curr_v < target_v:
-            v_u = vol_bin[up+1] if up < bins_count-1 else 0
-            v_d = vol_bin[low-1] if low > 0 else 0
-            if v_u == 0 and v_d == 0: break
-            if v_u > v_d: up += 1; curr_v += v_u
-            else: low -= 1; curr_v += v_d
-                
-        val_price = bin_mids[low]
-        vah_price = bin_mids[up]
-        
-        # 止盈線計算
-        recent_highest_close = df_slice['Close'].max()
-        stop_price = recent_highest_close - (atr_mult * atr)
-        
-        short_term_high = df_daily['Close'].iloc[-sniper_stop_lookback:].max()
-        sniper_stop = short_term_high - (atr_mult * atr)
+
+        poc_price, val_price, vah_price = bar['poc'], bar['val'], bar['vah']
+        bin_mids, vol_bin = bar['bin_mids'], bar['vol_bin']
+        stop_price, sniper_stop = bar['stop_price'], bar['sniper_stop']
         
         signal_code = 0
         action_html, status_html, color_class = "", "", ""
@@ -252,7 +160,7 @@ def calculate_data(ticker):
             signal_code = 0
             color_class = "yellow"
             action_html = "⚠️ 恐慌觀望 (High Volatility)"
-            status_html = f"今日震幅 ({df_daily['High'].iloc[-1]-df_daily['Low'].iloc[-1]:.2f}) > {panic_mult}x ATR。"
+            status_html = f"今日震幅 ({bar['day_range']:.2f}) > {panic_mult}x ATR。"
         else:
             if current_price < val_price:
                 signal_code = 1
@@ -276,31 +184,69 @@ def calculate_data(ticker):
                 action_html = "⚠️ 觀察 (Wait)"
                 status_html = f"位於震盪區間 (VAL < P < POC)。"
 
-        chart_base64 = generate_chart(df_daily, df_slice, sma200, poc_price, val_price, vah_price, bin_mids, vol_bin, stop_price, sniper_stop)
+        # 圖表參數 (由 charts.render_charts 統一快取 / 平行渲染)
+        chart_args = (dates[-lookback_days:], ohlcv[-lookback_days:], sma200, poc_price, val_price, vah_price, bin_mids, vol_bin, stop_price, sniper_stop)
 
         return {
-            'name': ticker_names[ticker], 'ticker': ticker, 'price': current_price,
-            'poc': poc_price, 'val': val_price, 'sma200': sma200, 'stop_price': stop_price, 'sniper_stop': sniper_stop,
+            'name': ticker_names.get(ticker, ticker), 'ticker': ticker, 'date': str(dates[-1]), 'price': float(current_price),
+            'poc': poc_price, 'val': val_price, 'vah': vah_price, 'sma200': sma200, 'stop_price': stop_price, 'sniper_stop': sniper_stop,
             'status_html': status_html, 'action_html': action_html, 'color_class': color_class,
-            'signal_code': signal_code, 'chart_base64': chart_base64
+            'signal_code': signal_code, 'chart_args': chart_args
         }
     except Exception as e:
         print(f"Error processing {ticker}: {e}")
+        metrics.error('calculate_data', ticker, e)
         return None
 
 # ==========================================
-# 5. 生成 HTML & 維護檢查
+# 4. 生成 HTML & 維護檢查
 # ==========================================
-cards_html = ""
-market_signals = {}
-
-for ticker in target_tickers:
-    res = calculate_data(ticker)
-    if res:
-        market_signals[ticker] = res['signal_code']
-        header = f'<div class="header {res["color_class"]}"><span>{res["name"]}</span><span class="tag {res["color_class"]}" style="border-color: currentColor;">{res["ticker"]}</span></div>'
-        
-        cards_html += f"""
+def market_verdict(market_signals):
+    # 總結以 QQQ 的訊號為準
+    s_qqq = market_signals.get('QQQ', 0)
+    if s_qqq == 3: v_title, v_cls, v_msg = "🔫 狙擊時刻 (Sniper Mode)", "orange", "市場極度恐慌，執行 50% 資金抄底。"
+    elif s_qqq == -3: v_title, v_cls, v_msg = "🛡️ 狙擊防守 (Hold)", "orange", "熊市反彈中，狙擊單請設好短期止損續抱。"
+    elif s_qqq == -1: v_title, v_cls, v_msg = "🚨 熊市警報", "red", "跌破年線，全數清倉。"
+    elif s_qqq == -2: v_title, v_cls, v_msg = "💰 獲利了結", "red", "跌破 ATR 止盈線，波段結束。"
+    elif s_qqq == 1: v_title, v_cls, v_msg = "🎯 絕佳買點", "green", "回測 VAL 支撐，進場抄底。"
+    elif s_qqq == 2: v_title, v_cls, v_msg = "🚀 趨勢續抱 (1x Leverage)", "purple", "建議持有 QQQ (1x)。"
+    else: v_title, v_cls, v_msg = "⚖️ 震盪觀察", "yellow", "區間震盪，等待方向。"
+    return v_title, v_cls, v_msg
+
+SIGNAL_FIELDS = ['name', 'ticker', 'date', 'price', 'poc', 'val', 'vah', 'sma200', 'stop_price', 'sniper_stop', 'signal_code', 'color_class']
+
+def _plain(html):
+    return re.sub(r'<[^>]+>', ' ', html).strip()
+
+def get_signals(tickers=None, refresh=True):
+    # 輕量入口：只算訊號，不畫圖、不寫 HTML；refresh=False 時只讀本地行情庫 (不載入 pandas / yfinance)
+    tickers = tickers or target_tickers
+    if refresh: market_store.refresh(tickers)
+    signals = {}
+    for ticker in tickers:
+        res = calculate_data(ticker)
+        if res:
+            signals[ticker] = {k: res[k] for k in SIGNAL_FIELDS}
+            signals[ticker].update(action=_plain(res['action_html']), status=_plain(res['status_html']))
+    v_title, v_cls, v_msg = market_verdict({t: s['signal_code'] for t, s in signals.items()})
+    return {
+        'update_time': datetime.datetime.now(ZoneInfo("America/New_York")).strftime('%Y-%m-%d %H:%M'),
+        'signals': signals,
+        'verdict': {'title': v_title, 'color_class': v_cls, 'message': v_msg},
+    }
+
+CHART_SCRIPT = '<script src="assets/charts.js" defer></script>\n'
+
+def build_card(res, chart_b64=None, chart_src=None):
+    # chart_b64: 內嵌 PNG；chart_src: 圖表 JSON 路徑 (--output data，由 assets/charts.js 在瀏覽器繪製)
+    chart_html = ""
+    if chart_b64:
+        chart_html = f'<div class="chart-container"><img class="chart-img" src="data:image/png;base64,{chart_b64}"></div>'
+    elif chart_src:
+        chart_html = f'<div class="chart-container"><canvas class="chart-img" style="width:100%" data-chart="{chart_src}"></canvas></div>'
+    header = f'<div class="header {res["color_class"]}"><span>{res["name"]}</span><span class="tag {res["color_class"]}" style="border-color: currentColor;">{res["ticker"]}</span></div>'
+
+    return f"""
         <div class="card">
             {header}
             <div class="row"><span>現價:</span> <span>{res['price']:.2f}</span></div>
@@ -312,58 +258,111 @@ for ticker in target_tickers:
             <hr style="border: 0; border-top: 1px dashed #30363d;">
             <div class="row"><span>狀態:</span> <span class="{res['color_class']}">{res['status_html']}</span></div>
             <div class="row"><span>指令:</span> <span class="{res['color_class']} bold" style="font-size:1.2em">{res['action_html']}</span></div>
-            <div class="chart-container"><img class="chart-img" src="data:image/png;base64,{res['chart_base64']}"></div>
+            {chart_html}
         </div>
         """
 
-s_qqq = market_signals.get('QQQ', 0)
-if s_qqq == 3: v_title, v_cls, v_msg = "🔫 狙擊時刻 (Sniper Mode)", "orange", "市場極度恐慌，執行 50% 資金抄底。"
-elif s_qqq == -3: v_title, v_cls, v_msg = "🛡️ 狙擊防守 (Hold)", "orange", "熊市反彈中，狙擊單請設好短期止損續抱。"
-elif s_qqq == -1: v_title, v_cls, v_msg = "🚨 熊市警報", "red", "跌破年線，全數清倉。"
-elif s_qqq == -2: v_title, v_cls, v_msg = "💰 獲利了結", "red", "跌破 ATR 止盈線，波段結束。"
-elif s_qqq == 1: v_title, v_cls, v_msg = "🎯 絕佳買點", "green", "回測 VAL 支撐，進場抄底。"
-elif s_qqq == 2: v_title, v_cls, v_msg = "🚀 趨勢續抱 (1x Leverage)", "purple", "建議持有 QQQ (1x)。"
-else: v_title, v_cls, v_msg = "⚖️ 震盪觀察", "yellow", "區間震盪，等待方向。"
-
-# ⏰ 智能維護鬧鐘 (整合年度與季度)
-now = datetime.datetime.now()
-maintenance_months = [1, 4, 7, 10]
-is_quarterly_time = (now.month in maintenance_months) and (now.day <= 7)
-is_annual_time = (now.month == 12) 
-
-m_class = "m-normal"
-m_msg = "✅ 系統狀態正常。"
-
-if is_annual_time:
-    m_class = "m-alert"
-    m_msg = "🎯 <b>年度靶場校準警報！</b> 現在是 12 月，請務必執行 <code>monitor_market_structure.py</code> 檢查瞄準鏡是否失準。"
-    print("\n" + "!"*60)
-    print(f"🚨 系統維護警報 (Annual Calibration) 🚨")
-    print(f"   現在是 12 月，請檢查市場結構！")
-    print("   👉 python monitor_market_structure.py")
-    print("!"*60 + "\n")
-elif is_quarterly_time:
-    m_class = "m-warning"
-    m_msg = f"🔧 <b>季度健檢提醒：</b> 現在是 {now.month} 月初，請執行 <code>scan_5d_quarterly.py</code> 確認核心參數。"
-    print("\n" + "!"*60)
-    print(f"🔧 系統維護提醒 (Quarterly Maintenance)")
-    print("   👉 python scan_5d_quarterly.py")
-    print("!"*60 + "\n")
-else:
-    next_q = [m for m in maintenance_months if m > now.month]
-    next_check = next_q[0] if next_q else 1
-    m_msg = f"✅ 系統狀態正常。<br>下季健檢：{next_check} 月 | 年度校準：12 月。"
-
-final_html = html_template.format(
-    lookback=lookback_days, bins=bins_count, va=va_pct, atr=atr_mult, panic=panic_mult,
-    rsi=sniper_rsi_threshold, bias=sniper_bias_threshold*100,
-    update_time=datetime.datetime.now(ZoneInfo("America/New_York")).strftime('%Y-%m-%d %H:%M'), 
-    content=f"{cards_html}<div class='verdict'><div class='verdict-title {v_cls}'>{v_title}</div><div style='margin-left: 20px;'>{v_msg}</div></div>",
-    m_class=m_class,
-    m_msg=m_msg
-)
-
-with open("index.html", "w", encoding="utf-8") as f:
-    f.write(final_html)
-
-print("✅ Main Dashboard Updated (Config Integrated & Logic Preserved).")
\ No newline at end of file
+def maintenance_status(announce=True):
+    # ⏰ 智能維護鬧鐘 (整合年度與季度)；announce=False 時不在終端機印出警報 (daemon 重複渲染用)
+    now = datetime.datetime.now()
+    maintenance_months = [1, 4, 7, 10]
+    is_quarterly_time = (now.month in maintenance_months) and (now.day <= 7)
+    is_annual_time = (now.month == 12) 
+
+    m_class = "m-normal"
+    m_msg = "✅ 系統狀態正常。"
+
+    if is_annual_time:
+        m_class = "m-alert"
+        m_msg = "🎯 <b>年度靶場校準警報！</b> 現在是 12 月，請務必執行 <code>monitor_market_structure.py</code> 檢查瞄準鏡是否失準。"
+        if announce:
+            print("\n" + "!"*60)
+            print(f"🚨 系統維護警報 (Annual Calibration) 🚨")
+            print(f"   現在是 12 月，請檢查市場結構！")
+            print("   👉 python monitor_market_structure.py")
+            print("!"*60 + "\n")
+    elif is_quarterly_time:
+        m_class = "m-warning"
+        m_msg = f"🔧 <b>季度健檢提醒：</b> 現在是 {now.month} 月初，請執行 <code>scan_5d_quarterly.py</code> 確認核心參數。"
+        if announce:
+            print("\n" + "!"*60)
+            print(f"🔧 系統維護提醒 (Quarterly Maintenance)")
+            print("   👉 python scan_5d_quarterly.py")
+            print("!"*60 + "\n")
+    else:
+        next_q = [m for m in maintenance_months if m > now.month]
+        next_check = next_q[0] if next_q else 1
+        m_msg = f"✅ 系統狀態正常。<br>下季健檢：{next_check} 月 | 年度校準：12 月。"
+    return m_class, m_msg
+
+def build_html(results, cards, announce=True, scripts="", history=""):
+    # results: calculate_data 的結果 (依顯示順序)；cards: {ticker: 卡片 HTML}；history: signal_history.dashboard_html
+    cards_html = "".join(cards[res['ticker']] for res in results)
+    v_title, v_cls, v_msg = market_verdict({res['ticker']: res['signal_code'] for res in results})
+    m_class, m_msg = maintenance_status(announce)
+
+    return html_template.format(
+        lookback=lookback_days, bins=bins_count, va=va_pct, atr=atr_mult, panic=panic_mult,
+        rsi=sniper_rsi_threshold, bias=sniper_bias_threshold*100,
+        update_time=datetime.datetime.now(ZoneInfo("America/New_York")).strftime('%Y-%m-%d %H:%M'), 
+        content=f"{cards_html}<div class='verdict'><div class='verdict-title {v_cls}'>{v_title}</div><div style='margin-left: 20px;'>{v_msg}</div></div>"
+                + (f"<div class='history-title'>📜 訊號歷史 & 命中率</div>{history}" if history else ""),
+        m_class=m_class,
+        m_msg=m_msg,
+        scripts=scripts
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Final Gold (Sniper Edition) 策略訊號儀表板")
+    parser.add_argument('--no-charts', action='store_true', help="略過圖表渲染 (最快)")
+    parser.add_argument('--chart-workers', type=int, default=None, help="圖表渲染行程數 (預設 = CPU 核心數，1 = 不開 process pool)")
+    parser.add_argument('--signals-only', action='store_true', help="只輸出訊號 JSON (不畫圖、不寫 index.html)")
+    parser.add_argument('--no-refresh', action='store_true', help="不更新行情，只讀本地行情庫 (離線 / 最快冷啟動)")
+    parser.add_argument('--output', choices=['png', 'data'], default=config.CHART_OUTPUT,
+                        help="png = 圖表內嵌於 index.html；data = 每檔輸出 JSON，由瀏覽器繪圖 (不需要 matplotlib)")
+    parser.add_argument('--metrics-file', default=None, help="執行指標 JSON Lines，預設 config.METRICS_FILE")
+    parser.add_argument('--prom-file', default=None, help="另輸出 Prometheus textfile (預設 config.METRICS_PROM_FILE)")
+    parser.add_argument('--no-history', action='store_true', help="不寫入 / 不顯示訊號歷史 (signal_history.py)")
+    args = parser.parse_args(argv)
+
+    if args.signals_only:
+        print(json.dumps(get_signals(refresh=not args.no_refresh), ensure_ascii=False, indent=2))
+        return
+
+    metrics.start_run('main')
+    if not args.no_refresh: market_store.refresh(target_tickers)  # 只下載最後儲存日之後的 K 棒
+    with metrics.stage('signals', tickers=len(target_tickers)) as m:
+        results = [res for res in (calculate_data(ticker) for ticker in target_tickers) if res]
+        m['rows'] = len(results)
+
+    # 訊號歷史：追加這次的結果 (缺少的交易日自動回補)，儀表板再從資料庫查詢轉換 & 命中率
+    history_html = ""
+    if not args.no_history:
+        import signal_history
+        signal_history.record(results)
+        history_html = signal_history.dashboard_html([res['ticker'] for res in results])
+
+    # 圖表：內容沒變就讀快取，其餘交給 process pool 平行渲染 (--no-charts 可略過)
+    # --output data：只寫每檔的圖表 JSON，由瀏覽器繪製
+    chart_images, chart_data = {}, {}
+    jobs = {res['ticker']: res['chart_args'] for res in results}
+    if args.no_charts:
+        pass
+    elif args.output == 'data':
+        import chart_data as cd
+        chart_data = cd.write_chart_data(jobs)
+    else:
+        import charts  # 延遲載入：只有畫圖時才需要 matplotlib / mplfinance
+        chart_images = charts.render_charts(jobs, workers=args.chart_workers)
+
+    cards = {res['ticker']: build_card(res, chart_images.get(res['ticker']), chart_data.get(res['ticker'])) for res in results}
+    with metrics.stage('html_write', file="index.html") as m:
+        html = build_html(results, cards, scripts=CHART_SCRIPT if chart_data else "", history=history_html)
+        m['bytes'] = len(html.encode('utf-8'))
+        fsutil.atomic_write("index.html", html)
+
+    print("✅ Main Dashboard Updated (Config Integrated & Logic Preserved).")
+    metrics.flush(args.metrics_file, args.prom_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# ==========================================
+# 💾 LOCAL OHLCV STORE (本地行情庫)
+# ==========================================
+# 每個 Ticker 存成兩個 .npy 檔 (日期 + OHLCV 矩陣)，讀取時以 memmap 開啟，不需整份載入。
+# 每日更新只向數據源 (providers.py) 要「最後儲存日之後」的 K 棒 (delta-only)，
+# 歷史一路保留到 config.START_DATE，供 main.py / structure.py / 回測共用。
+# load_arrays 只需要 NumPy；pandas 只在 load() / 下載時才載入。
+import os
+import datetime
+import numpy as np
+import config
+import providers
+import metrics
+
+FIELDS = providers.FIELDS
+
+# 重疊比對的容忍度：除權息 / 拆股後 yfinance 會回溯調整整段歷史，此時必須全量重抓
+ADJUST_TOLERANCE = 1e-4
+
+# 本行程內已更新過的 (ticker, data_dir)，避免 main / structure 在同一行程重複下載
+_refreshed = set()
+
+def _paths(ticker, data_dir=None):
+    data_dir = data_dir or config.DATA_DIR
+    name = ticker.replace('/', '_').replace(os.sep, '_')
+    return os.path.join(data_dir, f"{name}.dates.npy"), os.path.join(data_dir, f"{name}.ohlcv.npy")
+
+def _to_arrays(df):
+    if df is None or len(df) == 0:
+        return np.empty(0, dtype='datetime64[D]'), np.empty((0, len(FIELDS)), dtype=np.float64)
+    import pandas as pd
+    df = df.dropna(subset=['Close'])
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None: index = index.tz_localize(None)
+    return index.values.astype('datetime64[D]'), df[FIELDS].to_numpy(dtype=np.float64)
+
+def _save(ticker, dates, ohlcv, data_dir=None):
+    dates_path, ohlcv_path = _paths(ticker, data_dir)
+    os.makedirs(os.path.dirname(dates_path) or '.', exist_ok=True)
+    # 先寫暫存檔再 os.replace，避免中途失敗留下半份數據
+    for path, arr in ((dates_path, dates), (ohlcv_path, ohlcv)):
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, np.ascontiguousarray(arr))
+        os.replace(tmp, path)
+
+def load_arrays(ticker, data_dir=None):
+    # 回傳 (dates: datetime64[D], ohlcv: float64 (n, 5))，皆為唯讀 memmap；無資料時回傳 None
+    dates_path, ohlcv_path = _paths(ticker, data_dir)
+    if not (os.path.exists(dates_path) and os.path.exists(ohlcv_path)):
+        return None
+    return np.load(dates_path, mmap_mode='r'), np.load(ohlcv_path, mmap_mode='r')
+
+def last_date(ticker, data_dir=None):
+    arrays = load_arrays(ticker, data_dir)
+    if arrays is None or len(arrays[0]) == 0:
+        return None
+    return arrays[0][-1]
+
+def fingerprint(ticker, data_dir=None):
+    # 判斷數據是否改變：K 棒數 + 最後日期 + 最後一根 OHLCV (盤中最後一根會持續變動)；無資料時回傳 None
+    arrays = load_arrays(ticker, data_dir)
+    if arrays is None or len(arrays[0]) == 0: return None
+    dates, ohlcv = arrays
+    return len(dates), str(dates[-1]), np.asarray(ohlcv[-1]).tobytes()
+
+def load(ticker, start=None, data_dir=None):
+    # 以 memmap 為底的 DataFrame (不複製數據)；start 可用來只取最近一段
+    import pandas as pd
+    arrays = load_arrays(ticker, data_dir)
+    if arrays is None:
+        return pd.DataFrame(columns=FIELDS, index=pd.DatetimeIndex([], name='Date'), dtype=np.float64)
+    dates, ohlcv = arrays
+    if start is not None:
+        i = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start).date(), 'D')))
+        dates, ohlcv = dates[i:], ohlcv[i:]
+    index = pd.DatetimeIndex(np.asarray(dates).astype('datetime64[ns]'), name='Date')
+    return pd.DataFrame(ohlcv, index=index, columns=FIELDS, copy=False)
+
+def load_panel(tickers, calendar=None, start=None, data_dir=None, fields=FIELDS):
+    # 多個 Ticker 對齊成 (ticker × date) 面板：{field: (len(tickers), len(dates)) float64}，缺值為 NaN
+    # calendar: 以某個 Ticker 的交易日為準 (例如 'SPY')；預設為所有 Ticker 日期的聯集
+    # fields: 只需要部分欄位時 (例如只要 'Close') 可省下記憶體
+    loaded = {t: load_arrays(t, data_dir) for t in tickers}
+    loaded = {t: a for t, a in loaded.items() if a is not None and len(a[0])}
+    cal = loaded.get(calendar) or (load_arrays(calendar, data_dir) if calendar is not None else None)
+    if cal is not None and len(cal[0]):
+        dates = np.asarray(cal[0])  # 日曆 Ticker 不必在面板內 (例如以 SPY 為準對齊板塊 ETF)
+    elif loaded:
+        dates = np.unique(np.concatenate([np.asarray(a[0]) for a in loaded.values()]))
+    else:
+        dates = np.empty(0, dtype='datetime64[D]')
+    if start is not None:
+        dates = dates[dates >= np.datetime64(str(start)[:10], 'D')]
+
+    panel = {f: np.full((len(tickers), len(dates)), np.nan) for f in fields}
+    for i, t in enumerate(tickers):
+        if t not in loaded: continue
+        t_dates, ohlcv = loaded[t]
+        lo = int(np.searchsorted(t_dates, dates[0])) if len(dates) else len(t_dates)
+        t_dates, ohlcv = t_dates[lo:], ohlcv[lo:]  # memmap：只讀取面板期間內的部分
+        pos = np.searchsorted(dates, t_dates)
+        hit = pos < len(dates)
+        hit[hit] = dates[pos[hit]] == t_dates[hit]
+        for f in fields:
+            panel[f][i, pos[hit]] = ohlcv[hit, FIELDS.index(f)]
+    return dates, panel
+
+def _measure(m, frames):
+    # 下載量：K 棒數 + 解析後的數據量 (yfinance 不提供實際傳輸的 bytes)
+    m['rows'] = sum(len(df) for df in frames.values())
+    m['bytes'] = int(sum(df.memory_usage(index=True).sum() for df in frames.values()))
+
+def refresh(tickers, data_dir=None, provider=None, force=False):
+    # 增量更新：從倒數第二根 K 棒開始抓 (最後一根可能是未收盤數據，一併覆寫)，
+    # 以重疊的那一根比對收盤價；若不一致 (歷史被回溯調整) 則從 START_DATE 全量重抓。
+    # 起點 (倒數第二根) 相同的 Ticker 合併成一次批次請求 (停牌 / 已下市的 Ticker 自成一批，不拖累其他 Ticker)；
+    # 新 Ticker / 需重抓者另成一批。重疊的 K 棒沒變時不重寫檔案。
+    # 同一行程內已成功更新 (或確認沒有新數據) 的 Ticker 直接略過；下載失敗者下次呼叫會重試。
+    provider = provider or providers.get_provider()
+    if isinstance(tickers, str): tickers = [tickers]
+    tickers = [t for t in dict.fromkeys(tickers) if force or (t, data_dir) not in _refreshed]
+    updated, done = {}, set()
+
+    groups, full_reload = {}, []
+    for ticker in tickers:
+        arrays = load_arrays(ticker, data_dir)
+        if arrays is None or len(arrays[0]) < 2: full_reload.append(ticker)
+        else: groups.setdefault(arrays[0][-2], {})[ticker] = arrays
+
+    for anchor, existing in sorted(groups.items()):
+        try:
+            with metrics.stage('download', mode='delta', tickers=len(existing), provider=provider.name) as m:
+                frames = provider.download(list(existing), start=str(anchor))
+                _measure(m, frames)
+        except Exception as e:
+            print(f"❌ 下載增量數據時發生錯誤: {e}")
+            frames = {}
+        for ticker, (old_dates, old_ohlcv) in existing.items():
+            try:
+                new_dates, new_ohlcv = _to_arrays(frames.get(ticker))
+                i = int(np.searchsorted(new_dates, anchor))
+                new_dates, new_ohlcv = new_dates[i:], new_ohlcv[i:]
+                if len(new_dates) == 0:
+                    print(f"⚠️ 警告: 找不到 {ticker} 的新數據，沿用本地資料")
+                    continue
+                if new_dates[0] != anchor or \
+                        abs(new_ohlcv[0, 3] - old_ohlcv[-2, 3]) > ADJUST_TOLERANCE * abs(old_ohlcv[-2, 3]):
+                    print(f"🔄 {ticker}: 歷史價格已調整 (除權息/拆股)，重新下載完整歷史")
+                    full_reload.append(ticker)
+                    continue
+                done.add(ticker)
+                if np.array_equal(new_dates, old_dates[-2:]) and np.array_equal(new_ohlcv, old_ohlcv[-2:], equal_nan=True):
+                    continue  # 沒有新數據：不重寫 (檔案 mtime / 下游快取不變)
+                _save(ticker, np.concatenate([old_dates[:-2], new_dates]), np.concatenate([old_ohlcv[:-2], new_ohlcv]), data_dir)
+                updated[ticker] = 'delta'
+                metrics.record('download', ticker, mode='delta', rows=len(new_dates), bytes=int(new_ohlcv.nbytes))
+            except Exception as e:
+                print(f"❌ 更新 {ticker} 本地數據時發生錯誤: {e}")
+                metrics.error('download', ticker, e)
+
+    if full_reload:
+        try:
+            with metrics.stage('download', mode='full', tickers=len(full_reload), provider=provider.name) as m:
+                frames = provider.download(full_reload, start=config.START_DATE)
+                _measure(m, frames)
+        except Exception as e:
+            print(f"❌ 下載完整歷史時發生錯誤: {e}")
+            frames = {}
+        for ticker in full_reload:
+            dates, ohlcv = _to_arrays(frames.get(ticker))
+            if len(dates) == 0:
+                print(f"⚠️ 警告: 找不到 {ticker} 的數據")
+                metrics.record('download', ticker, mode='full', rows=0, error="找不到數據")
+                continue
+            _save(ticker, dates, ohlcv, data_dir)
+            updated[ticker] = 'full'
+            done.add(ticker)
+            metrics.record('download', ticker, mode='full', rows=len(dates), bytes=int(ohlcv.nbytes))
+
+    _refreshed.update((t, data_dir) for t in done)
+    return updated
+
+def get(ticker, start=None, data_dir=None):
+    # 便捷入口：先增量更新，再讀取
+    refresh([ticker], data_dir)
+    return load(ticker, start, data_dir)
+
+if __name__ == "__main__":
+    import sys
+    targets = sys.argv[1:] or [config.TICKER]
+    t0 = datetime.datetime.now()
+    result = refresh(targets)
+    for t, mode in result.items():
+        print(f"✅ {t}: {mode} ({len(load(t))} bars, 最後日期 {last_date(t)})")
+    print(f"⏱️ {(datetime.datetime.now() - t0).total_seconds():.2f}s")
@@ -0,0 +1,142 @@
+# ==========================================
+# 📏 RUN METRICS (每次執行的分段計時 & 資源紀錄)
+# ==========================================
+# 每個階段 (download / indicators / volume_profile / chart / html_write ...) 記錄：
+#   牆鐘時間、抓到的 K 棒數、數據量、當下的 peak RSS、錯誤訊息；可整批 (ticker=None) 或逐 Ticker。
+# 執行結束時 flush()：
+#   - 追加到 JSON Lines (config.METRICS_FILE)，每筆紀錄一行，最後一行是整次執行的摘要 (stage = 'run')
+#   - 另可輸出 Prometheus textfile (config.METRICS_PROM_FILE)，交給 node_exporter 收集後設定延遲 / 錯誤警報
+# 沒有呼叫 start_run() 時 stage() 不做任何紀錄 (回測 / 掃描等大量呼叫不受影響)。
+import os
+import json
+import time
+import datetime
+from contextlib import contextmanager
+import config
+import fsutil
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_run = None
+
+def peak_rss_bytes():
+    # 本行程 + 已結束的子行程 (圖表 process pool) 中最大的 RSS；Linux 單位為 KB，macOS 為 bytes
+    if resource is None: return None
+    scale = 1 if os.uname().sysname == 'Darwin' else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+
+def start_run(name):
+    global _run
+    now = datetime.datetime.now()
+    _run = {'run': name, 'run_id': now.strftime('%Y%m%d_%H%M%S'), 'started': now.isoformat(timespec='seconds'),
+            't0': time.perf_counter(), 'records': []}
+    return _run
+
+def active():
+    return _run is not None
+
+def record(stage, ticker=None, **fields):
+    # 直接加一筆紀錄 (例如逐 Ticker 的 K 棒數，或計時在子行程完成的圖表)
+    if _run is None: return None
+    rec = {'stage': stage, 'ticker': ticker, **fields}
+    _run['records'].append(rec)
+    return rec
+
+def error(stage, ticker, exc):
+    # 被吞掉的例外 (calculate_data / get_data 會繼續處理其他 Ticker) 也要留下紀錄
+    return record(stage, ticker, error=f"{type(exc).__name__}: {exc}")
+
+@contextmanager
+def stage(name, ticker=None, **fields):
+    # with metrics.stage('download') as m: ... m['rows'] = n
+    if _run is None:
+        yield {}
+        return
+    rec = {'stage': name, 'ticker': ticker, **fields}
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    except Exception as e:
+        rec['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        rec['wall_s'] = round(time.perf_counter() - t0, 6)
+        rec['peak_rss'] = peak_rss_bytes()
+        _run['records'].append(rec)
+
+# ==========================================
+# 輸出
+# ==========================================
+def summary():
+    records = _run['records']
+    return {'stage': 'run', 'ticker': None, 'wall_s': round(time.perf_counter() - _run['t0'], 6),
+            'peak_rss': peak_rss_bytes(), 'errors': sum(1 for r in records if r.get('error')),
+            'records': len(records)}
+
+def _prom_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+def prometheus_text(run, records, total):
+    # 整批紀錄 (ticker=None) → 各階段總計；逐 Ticker 的紀錄 → 附 ticker 標籤
+    name = _prom_label(run['run'])
+    metrics = {
+        'dashboard_stage_seconds': ('gauge', '各階段牆鐘時間 (秒)'),
+        'dashboard_stage_rows': ('gauge', '各階段處理 / 下載的 K 棒數'),
+        'dashboard_stage_bytes': ('gauge', '各階段的數據量 (bytes)'),
+        'dashboard_stage_errors': ('gauge', '各階段的錯誤數'),
+        'dashboard_ticker_seconds': ('gauge', '逐 Ticker 的階段時間 (秒)'),
+        'dashboard_ticker_rows': ('gauge', '逐 Ticker 的 K 棒數'),
+        'dashboard_run_seconds': ('gauge', '整次執行的牆鐘時間 (秒)'),
+        'dashboard_run_peak_rss_bytes': ('gauge', '整次執行的 peak RSS'),
+        'dashboard_run_errors': ('gauge', '整次執行的錯誤數'),
+        'dashboard_run_timestamp_seconds': ('gauge', '最後一次執行完成的時間'),
+    }
+    values = {k: {} for k in metrics}
+    for r in records:
+        stage_label = f'run="{name}",stage="{_prom_label(r["stage"])}"'
+        if r.get('ticker') is None:
+            for key, field in (('dashboard_stage_seconds', 'wall_s'), ('dashboard_stage_rows', 'rows'), ('dashboard_stage_bytes', 'bytes')):
+                if r.get(field) is not None: values[key][stage_label] = values[key].get(stage_label, 0) + r[field]
+        else:
+            labels = f'{stage_label},ticker="{_prom_label(r["ticker"])}"'
+            if r.get('wall_s') is not None: values['dashboard_ticker_seconds'][labels] = r['wall_s']
+            if r.get('rows') is not None: values['dashboard_ticker_rows'][labels] = r['rows']
+        if r.get('error'):
+            values['dashboard_stage_errors'][stage_label] = values['dashboard_stage_errors'].get(stage_label, 0) + 1
+    run_label = f'run="{name}"'
+    values['dashboard_run_seconds'][run_label] = total['wall_s']
+    if total['peak_rss'] is not None: values['dashboard_run_peak_rss_bytes'][run_label] = total['peak_rss']
+    values['dashboard_run_errors'][run_label] = total['errors']
+    values['dashboard_run_timestamp_seconds'][run_label] = round(time.time(), 3)
+
+    lines = []
+    for key, (kind, help_text) in metrics.items():
+        if not values[key]: continue
+        lines += [f"# HELP {key} {help_text}", f"# TYPE {key} {kind}"]
+        lines += [f"{key}{{{labels}}} {value}" for labels, value in values[key].items()]
+    return "\n".join(lines) + "\n"
+
+def flush(path=None, prom_path=None):
+    # 寫出本次執行的紀錄並結束；回傳摘要
+    global _run
+    if _run is None: return None
+    path = path or config.METRICS_FILE
+    prom_path = prom_path or os.environ.get('METRICS_PROM_FILE') or config.METRICS_PROM_FILE
+    total = summary()
+    base = {'run': _run['run'], 'run_id': _run['run_id'], 'started': _run['started']}
+    if path:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for r in [*_run['records'], total]:
+                f.write(json.dumps({**base, **r}, ensure_ascii=False) + '\n')
+    if prom_path:
+        fsutil.atomic_write(prom_path, prometheus_text(_run, _run['records'], total))
+    errors = f"，{total['errors']} 個錯誤" if total['errors'] else ""
+    rss = f"，peak RSS {total['peak_rss'] / 2**20:.0f} MB" if total['peak_rss'] else ""
+    print(f"📏 {_run['run']}: {total['wall_s']:.1f}s{rss}{errors} → {path}")
+    _run = None
+    return total
@@ -0,0 +1,172 @@
+# ==========================================
+# 🧱 PANEL STORE (float32 面板行情庫)
+# ==========================================
+# market_store.load_panel 每次都從各 Ticker 的 memmap 重新對齊出 float64 的 (ticker × date) 面板：
+# 幾百檔 × 20 年 × 5 欄位就是數百 MB，而且每次掃描都要整份重建。
+# 這裡把同一個 universe 的面板存成一份共用的精簡格式：
+#   - 一條共用的日期軸：int32 (1970-01-01 起的天數)
+#   - 每個欄位一個連續的 float32 (ticker × date) .npy，以 memmap 開啟；每個 Ticker 對應一個 slot (列)
+#     (成交量維持 float64：float32 只能精確表示到 2^24 ≈ 1680 萬，SPY / QQQ 的日成交量常超過)
+#   - window() / row() 回傳的是切片 view，不複製數據；signal_engine 只會把需要的尾段轉成 float64
+#   - 更新時只重讀行情庫內容有變的 Ticker；日曆只是往後延伸時沿用舊的欄位
+#   - 每次更新寫到新的一代目錄，最後才原子替換 current.json，讀取端不會看到寫一半的面板
+# float32 約 7 位有效數字 (價格的相對誤差 < 1e-7)，用於掃描 / 廣度統計；單檔訊號仍用 market_store 的 float64。
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import config
+import market_store
+import fsutil
+import metrics
+
+FIELDS = market_store.FIELDS
+DTYPE = np.float32
+DTYPES = {f: np.float64 if f == 'Volume' else DTYPE for f in FIELDS}
+
+def panel_dir(tickers, calendar=None, data_dir=None):
+    key = hashlib.sha256('|'.join([str(calendar), *tickers]).encode()).hexdigest()[:16]
+    return os.path.join(data_dir or config.DATA_DIR, 'panel', key)
+
+class Panel:
+    # tickers[i] ↔ slot i；dates: int32 天數；fields: {欄位: (tickers, dates) memmap (DTYPES)}
+    def __init__(self, tickers, dates, fields):
+        self.tickers = list(tickers)
+        self.slots = {t: i for i, t in enumerate(self.tickers)}
+        self.dates = dates
+        self.fields = fields
+
+    @property
+    def dates64(self):
+        return np.asarray(self.dates).astype('datetime64[D]')
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    def nbytes(self):
+        return self.dates.nbytes + sum(a.nbytes for a in self.fields.values())
+
+    def row(self, ticker, field='Close', start=None):
+        # 單一 Ticker 的 view；start: 只取該日 (含) 之後
+        lo = 0 if start is None else self.index(start)
+        return self.fields[field][self.slots[ticker], lo:]
+
+    def index(self, date):
+        return int(np.searchsorted(self.dates, np.datetime64(str(date)[:10], 'D').astype(np.int32)))
+
+    def window(self, n=None, start=None, fields=None):
+        # 最後 n 根 (或 start 之後) 的 {欄位: (tickers, m) view}
+        lo = self.index(start) if start is not None else max(len(self.dates) - (n or len(self.dates)), 0)
+        return {f: self.fields[f][:, lo:] for f in (fields or self.fields)}
+
+# ==========================================
+# 1. 對齊 (行情庫 memmap → 面板的一列)
+# ==========================================
+def _fill_row(panel, i, arrays, dates64):
+    # 把 Ticker 在面板期間內的數據寫進 panel[f][i]；沒有數據的日期維持 NaN
+    t_dates, ohlcv = arrays
+    if len(dates64) == 0: return
+    first = int(np.searchsorted(t_dates, dates64[0]))
+    t_dates, ohlcv = t_dates[first:], ohlcv[first:]  # memmap：只讀取需要的部分
+    pos = np.searchsorted(dates64, t_dates)
+    hit = pos < len(dates64)
+    hit[hit] = dates64[pos[hit]] == t_dates[hit]
+    for j, f in enumerate(FIELDS):
+        panel[f][i, pos[hit]] = ohlcv[hit, j]
+
+def _calendar_dates(tickers, calendar, data_dir):
+    if calendar is not None:
+        cal = market_store.load_arrays(calendar, data_dir)
+        if cal is not None and len(cal[0]): return np.asarray(cal[0])
+    arrays = [market_store.load_arrays(t, data_dir) for t in tickers]
+    arrays = [np.asarray(a[0]) for a in arrays if a is not None and len(a[0])]
+    return np.unique(np.concatenate(arrays)) if arrays else np.empty(0, dtype='datetime64[D]')
+
+# ==========================================
+# 2. 讀取 / 增量更新
+# ==========================================
+def _read_current(path):
+    try:
+        with open(os.path.join(path, 'current.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _open(path, meta):
+    gen = os.path.join(path, meta['generation'])
+    dates = np.load(os.path.join(gen, 'dates.npy'), mmap_mode='r')
+    fields = {f: np.load(os.path.join(gen, f"{f}.npy"), mmap_mode='r') for f in FIELDS}
+    return Panel(meta['tickers'], dates, fields)
+
+def _fingerprints(tickers, calendar, data_dir):
+    # 依內容判斷 (不看 mtime)：K 棒數 + 最後日期 + 第一根 / 最後兩根 OHLCV (同 market_store.fingerprint 的做法)。
+    # 增量更新只會改寫最後兩根；全量重抓 (回溯調整) 會改到第一根。memmap 只讀這三列
+    keys = [*tickers, *([calendar] if calendar is not None else [])]
+    prints = {}
+    for t in dict.fromkeys(keys):
+        arrays = market_store.load_arrays(t, data_dir)
+        if arrays is None or len(arrays[0]) == 0:
+            prints[t] = None
+            continue
+        dates, ohlcv = arrays
+        rows = np.concatenate([ohlcv[:1], ohlcv[-2:]])
+        prints[t] = [len(dates), str(dates[-1]), hashlib.sha256(rows.tobytes()).hexdigest()]
+    return prints
+
+def load(tickers, calendar=None, data_dir=None, full=False):
+    # (tickers, calendar) 的面板；行情庫有變動時先增量更新 → Panel
+    tickers = list(dict.fromkeys(tickers))
+    path = panel_dir(tickers, calendar, data_dir)
+    current = _read_current(path)
+    meta = None if full else current
+    prints = _fingerprints(tickers, calendar, data_dir)
+    if meta is not None and meta['fingerprints'] == prints:
+        return _open(path, meta)
+
+    with metrics.stage('panel', tickers=len(tickers)) as m:
+        dates64 = _calendar_dates(tickers, calendar, data_dir)
+        old = None
+        if meta is not None:
+            try:
+                old = _open(path, meta)
+            except OSError:
+                meta = None  # 目錄被手動刪掉 → 全量重建
+        if old is not None:
+            # 日曆被改寫 (不只是往後延伸) → 全量重建
+            n_old = len(old.dates)
+            if n_old > len(dates64) or not np.array_equal(old.dates, dates64[:n_old].astype(np.int32)):
+                old = None
+
+        panel = {f: np.full((len(tickers), len(dates64)), np.nan, dtype=DTYPES[f]) for f in FIELDS}
+        if old is not None:
+            for f in FIELDS: panel[f][:, :len(old.dates)] = old.fields[f]
+            changed = [t for t in tickers if meta['fingerprints'].get(t) != prints[t]]
+        else:
+            changed = tickers
+        slots = {t: i for i, t in enumerate(tickers)}  # 目錄鍵含 Ticker 順序，slot 不會變
+        for t in changed:
+            for f in FIELDS: panel[f][slots[t]] = np.nan
+            arrays = market_store.load_arrays(t, data_dir)
+            if arrays is not None and len(arrays[0]): _fill_row(panel, slots[t], arrays, dates64)
+
+        generation = f"g{int(current['generation'][1:]) + 1 if current else 1}"
+        gen = os.path.join(path, generation)
+        shutil.rmtree(gen, ignore_errors=True)
+        os.makedirs(gen)
+        np.save(os.path.join(gen, 'dates.npy'), dates64.astype(np.int32))
+        for f in FIELDS:
+            np.save(os.path.join(gen, f"{f}.npy"), panel[f])
+        new_meta = {'tickers': tickers, 'calendar': calendar, 'generation': generation, 'fingerprints': prints}
+        fsutil.atomic_write(os.path.join(path, 'current.json'), json.dumps(new_meta))
+        # 舊的一代：已開啟的 memmap 仍可讀 (POSIX)，刪掉不影響正在讀的行程
+        for name in os.listdir(path):
+            if name != generation and name.startswith('g'):
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+        result = _open(path, new_meta)
+        m['rows'] = len(changed)
+        m['bytes'] = result.nbytes()
+    print(f"🧱 面板: {len(tickers)} 檔 × {len(dates64)} 日，{'增量' if old is not None else '全量'}更新 {len(changed)} 檔"
+          f" ({result.nbytes() / 2**20:.0f} MB)")
+    return result
@@ -0,0 +1,247 @@
+# ==========================================
+# 🧩 PIPELINE (main.py + structure.py 的依賴圖執行器)
+# ==========================================
+# 原本 main.py 與 structure.py 各自下載 (SPY 等重疊的 Ticker 抓兩次)，所有階段依序執行。
+# 這裡把整個每日更新拆成依賴圖 (DAG)：
+#
+#   fetch ─┬─ signal:SPY / signal:QQQ / signal:IWM ─┬─ charts ──┬─ index.html
+#          │                                        └─ history ─┘
+#          ├─ structure_table ─┬─ structure.html
+#          ├─ breadth ─────────┤
+#          └─ correlation ─────┘
+#
+#   - fetch 只做一次：所有頁面需要的 Ticker 合併成一次增量下載 (market_store.refresh)
+#   - 依賴都完成的節點丟進 thread pool 同時執行 (NumPy / SQLite / 圖表 process pool 都會釋放 GIL)，
+#     總時間取決於最慢的那條分支，而不是所有階段相加
+#   - 每個節點以「輸入指紋」(行情庫指紋 / 策略參數 / 程式碼 / 上游節點的指紋) 為鍵：
+#     和上次相同就跳過，直接讀上次的輸出 (config.PIPELINE_STATE_DIR)；寫檔節點在檔案存在時才跳過
+#   - 節點失敗時只略過它的下游，其他分支照常完成
+#
+# 用法: python pipeline.py [--workers 4] [--force] [--no-refresh] [--no-charts] [--no-breadth] [--no-correlation] [--output png|data]
+import os
+import json
+import glob
+import time
+import pickle
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import config
+import market_store
+import fsutil
+import metrics
+import main as dashboard
+import structure
+import breadth
+import correlation
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class Node:
+    # fn(*deps 的輸出)；inputs() 回傳額外的輸入 (None = 每次都執行)；after 只控制順序 (不影響指紋)
+    # output: 節點寫出的檔案，檔案不在時不跳過
+    def __init__(self, name, fn, deps=(), after=(), inputs=None, output=None):
+        self.name, self.fn, self.deps, self.after = name, fn, list(deps), list(after)
+        self.inputs, self.output = inputs, output
+
+# ==========================================
+# 1. 指紋 & 狀態
+# ==========================================
+def code_key():
+    # 程式碼 / 設定改了就全部重算 (*.py + 前端繪圖腳本)
+    h = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(BASE_DIR, '*.py')) + [os.path.join(BASE_DIR, 'assets', 'charts.js')]):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                h.update(os.path.basename(path).encode() + f.read())
+    return h.hexdigest()
+
+def data_key(tickers):
+    return [(t, market_store.fingerprint(t)) for t in tickers]
+
+def _hash(value):
+    return hashlib.sha256(repr(value).encode('utf-8')).hexdigest()
+
+def _paths(state_dir, name):
+    safe = name.replace(':', '_').replace('/', '_')
+    return os.path.join(state_dir, 'state.json'), os.path.join(state_dir, f"{safe}.pkl")
+
+def load_state(state_dir):
+    path = _paths(state_dir, '')[0]
+    if not os.path.exists(path): return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# ==========================================
+# 2. 執行器
+# ==========================================
+def run(nodes, workers=None, state_dir=None, force=False):
+    # → {name: {'status': 'ran' / 'skipped' / 'failed' / 'blocked', 'seconds': ...}}, {name: 輸出}
+    state_dir = state_dir or config.PIPELINE_STATE_DIR
+    os.makedirs(state_dir, exist_ok=True)
+    state = load_state(state_dir)
+    nodes = {n.name: n for n in nodes}
+    keys, outputs, report = {}, {}, {}
+
+    def execute(node):
+        t0 = time.perf_counter()
+        key = None
+        if node.inputs is not None:
+            key = _hash((node.name, node.inputs(), [keys[d] for d in node.deps]))
+        pkl = _paths(state_dir, node.name)[1]
+        fresh = node.output is None or os.path.exists(node.output)
+        if not force and key is not None and state.get(node.name) == key and fresh and os.path.exists(pkl):
+            with open(pkl, 'rb') as f:
+                out = pickle.load(f)
+            return key, out, 'skipped', time.perf_counter() - t0
+        with metrics.stage(node.name):
+            out = node.fn(*(outputs[d] for d in node.deps))
+        if key is not None:
+            fsutil.atomic_write(pkl, pickle.dumps(out, protocol=pickle.HIGHEST_PROTOCOL))
+        return key, out, 'ran', time.perf_counter() - t0
+
+    pending, running = dict(nodes), {}
+    with ThreadPoolExecutor(max_workers=workers or config.PIPELINE_WORKERS or min(8, (os.cpu_count() or 1) + 2)) as pool:
+        while pending or running:
+            for name, node in list(pending.items()):
+                needs = node.deps + node.after
+                if any(report.get(d, {}).get('status') in ('failed', 'blocked') for d in needs):
+                    report[name] = {'status': 'blocked', 'seconds': 0.0}
+                    state.pop(name, None)
+                    del pending[name]
+                elif all(d in report for d in needs):
+                    running[pool.submit(execute, node)] = name
+                    del pending[name]
+            if not running: continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    key, outputs[name], status, seconds = future.result()
+                    keys[name] = key
+                    if key is not None: state[name] = key
+                    report[name] = {'status': status, 'seconds': round(seconds, 3)}
+                except Exception as e:
+                    print(f"❌ {name} 失敗: {e}")
+                    metrics.error(name, None, e)
+                    state.pop(name, None)
+                    report[name] = {'status': 'failed', 'seconds': None, 'error': str(e)}
+
+    fsutil.atomic_write(_paths(state_dir, '')[0], json.dumps(state, indent=1, sort_keys=True))
+    return report, outputs
+
+# ==========================================
+# 3. 每日更新的依賴圖
+# ==========================================
+def write_index(results, charts_out, history_html, output):
+    results = [res for res in results if res]
+    images = charts_out if output == 'png' else {}
+    data = charts_out if output == 'data' else {}
+    cards = {res['ticker']: dashboard.build_card(res, images.get(res['ticker']), data.get(res['ticker'])) for res in results}
+    with metrics.stage('html_write', file="index.html") as m:
+        html = dashboard.build_html(results, cards, scripts=dashboard.CHART_SCRIPT if data else "", history=history_html)
+        m['bytes'] = len(html.encode('utf-8'))
+        fsutil.atomic_write("index.html", html)
+    print("✅ Main Dashboard Updated (pipeline).")
+
+def render_charts(results, output, chart_workers=None):
+    jobs = {res['ticker']: res['chart_args'] for res in results if res}
+    if output == 'data':
+        import chart_data
+        return chart_data.write_chart_data(jobs)
+    import charts
+    return charts.render_charts(jobs, workers=chart_workers)
+
+def update_history(results):
+    import signal_history
+    results = [res for res in results if res]
+    signal_history.record(results)
+    return signal_history.dashboard_html([res['ticker'] for res in results])
+
+def build_graph(refresh=True, charts=True, with_history=True, with_breadth=True, with_correlation=True, output=None,
+                chart_workers=None):
+    output = output or config.CHART_OUTPUT
+    code = code_key()
+    members = breadth.default_universe() if with_breadth else []
+    breadth_tickers = [*members, config.BREADTH_CALENDAR] if with_breadth else []
+    universe = list(dict.fromkeys([*dashboard.target_tickers, *structure.all_tickers, *breadth_tickers]))
+
+    nodes = [Node('fetch', lambda: market_store.refresh(universe) if refresh else None)]
+    signal_nodes = []
+    for t in dashboard.target_tickers:
+        name = f"signal:{t}"
+        nodes.append(Node(name, lambda t=t: dashboard.calculate_data(t), after=['fetch'],
+                          inputs=lambda t=t: (code, data_key([t]))))
+        signal_nodes.append(name)
+    collect = lambda *results: list(results)
+
+    index_deps = []
+    if charts:
+        nodes.append(Node('charts', lambda *results: render_charts(results, output, chart_workers),
+                          deps=signal_nodes, inputs=lambda: output))
+        index_deps.append('charts')
+    if with_history:
+        # 資料庫是追加寫入：同一份輸入重跑不會改變內容，可以跳過
+        nodes.append(Node('history', lambda *results: update_history(results), deps=signal_nodes,
+                          output=config.SIGNAL_HISTORY_DB, inputs=lambda: config.SIGNAL_HISTORY_DB))
+        index_deps.append('history')
+    nodes.append(Node('signals', collect, deps=signal_nodes, inputs=lambda: ()))
+
+    def index_fn(results, *rest):
+        out = dict(zip(index_deps, rest))
+        write_index(results, out.get('charts', {}), out.get('history', ""), output)
+    # 維護提醒隨日期變動，也算輸入
+    nodes.append(Node('index.html', index_fn, deps=['signals', *index_deps], output="index.html",
+                      inputs=lambda: dashboard.maintenance_status(announce=False)))
+
+    nodes.append(Node('structure_table', lambda: structure.get_data(refresh=False), after=['fetch'],
+                      inputs=lambda: (code, data_key(structure.all_tickers))))
+    structure_deps = []
+    if with_breadth:
+        nodes.append(Node('breadth', lambda: breadth.get_breadth(members, refresh=False), after=['fetch'],
+                          inputs=lambda: (code, data_key(breadth_tickers))))
+        structure_deps.append('breadth')
+    if with_correlation:
+        corr_tickers = [*structure.all_tickers, config.BREADTH_CALENDAR]
+        nodes.append(Node('correlation', lambda: correlation.get_correlation(refresh=False), after=['fetch'],
+                          inputs=lambda: (code, data_key(corr_tickers))))
+        structure_deps.append('correlation')
+
+    def structure_fn(table, *rest):
+        out = dict(zip(structure_deps, rest))
+        structure.generate_html(table, out.get('breadth'), out.get('correlation'))
+    nodes.append(Node('structure.html', structure_fn, deps=['structure_table', *structure_deps],
+                      output="structure.html", inputs=lambda: ()))
+    return nodes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="一次下載，依賴圖平行更新 index.html + structure.html；輸入沒變的節點直接跳過")
+    parser.add_argument('--workers', type=int, default=None, help="同時執行的節點數 (預設 config.PIPELINE_WORKERS)")
+    parser.add_argument('--force', action='store_true', help="忽略上次的指紋，全部重算")
+    parser.add_argument('--no-refresh', action='store_true', help="不更新行情，只讀本地行情庫")
+    parser.add_argument('--no-charts', action='store_true', help="略過圖表")
+    parser.add_argument('--no-history', action='store_true', help="不寫入 / 不顯示訊號歷史")
+    parser.add_argument('--no-breadth', action='store_true', help="不計算成分股市場廣度")
+    parser.add_argument('--no-correlation', action='store_true', help="不計算滾動相關性")
+    parser.add_argument('--output', choices=['png', 'data'], default=config.CHART_OUTPUT)
+    parser.add_argument('--chart-workers', type=int, default=None)
+    parser.add_argument('--metrics-file', default=None)
+    parser.add_argument('--prom-file', default=None)
+    args = parser.parse_args()
+
+    metrics.start_run('pipeline')
+    nodes = build_graph(refresh=not args.no_refresh, charts=not args.no_charts, with_history=not args.no_history,
+                        with_breadth=not args.no_breadth, with_correlation=not args.no_correlation,
+                        output=args.output, chart_workers=args.chart_workers)
+    t0 = time.perf_counter()
+    report, _ = run(nodes, workers=args.workers, force=args.force)
+    icons = {'ran': '✅', 'skipped': '⏭️', 'failed': '❌', 'blocked': '⛔'}
+    for name, r in report.items():
+        seconds = "" if r['seconds'] is None else f" ({r['seconds']:.2f}s)"
+        print(f"   {icons[r['status']]} {name:<16} {r['status']}{seconds}")
+    counts = {s: sum(r['status'] == s for r in report.values()) for s in icons}
+    print(f"🧩 pipeline: {time.perf_counter() - t0:.1f}s | 執行 {counts['ran']} / 跳過 {counts['skipped']} / 失敗 {counts['failed'] + counts['blocked']}")
+    metrics.flush(args.metrics_file, args.prom_file)
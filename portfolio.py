@@ -0,0 +1,175 @@
+# ==========================================
+# 💼 PORTFOLIO BACKTEST (多標的組合回測)
+# ==========================================
+# 儀表板的結論只看 QQQ；這裡把 target_tickers 全部放進同一個帳戶，從 INITIAL_CAPITAL / START_DATE 起回測：
+#   - 每檔的訊號 → 持倉比例沿用 se.positions_from_signals (1 / 2 → 1x，狙擊 → SNIPER_PARAMS['SIZE'])
+#   - 配置：fixed = 每檔固定一份資金 (沒持倉的那份留在現金)；active = 資金平均分給目前有持倉的標的
+#   - 再平衡 (所有標的一起拉回目標權重)：signal = 任一標的目標權重改變時；weekly / monthly = 另外每週 / 每月初拉回目標；daily = 每天
+#     兩次再平衡之間持股數不變 (權重隨漲跌漂移)，再平衡時的換手 = |目標權重 - 漂移後權重|，成本按成交金額比例扣除
+#   - 整段期間 × 所有標的以 (..., 標的, 日期) 陣列一次算完，沒有逐日迴圈；
+#     前面的維度可以是多組參數 / 多組訊號，放進最佳化迴圈時一次批次回測
+#
+# 用法: python portfolio.py [--tickers SPY QQQ IWM] [--rebalance signal|weekly|monthly|daily] [--allocation fixed|active] [--cost 0.0005]
+import time
+import argparse
+import numpy as np
+import config
+import market_store
+import signal_engine as se
+import timeframes
+
+REBALANCE = ['signal', 'weekly', 'monthly', 'daily']
+ALLOCATION = ['fixed', 'active']
+
+# ==========================================
+# 1. 數據 (收盤價 & 訊號面板)
+# ==========================================
+def load_signals(tickers, start=None, calendar=None, core=None, sniper=None):
+    # → dates, close (標的, 日期), codes (標的, 日期)
+    # 每檔用自己的完整歷史跑 se.run (暖機不受 start 影響) 再對齊；沒有 K 棒的日期 code = 0 (維持倉位)
+    dates, panel = market_store.load_panel(tickers, calendar=calendar, fields=['Close'])
+    close = panel['Close']
+    codes = np.zeros(close.shape, dtype=np.int8)
+    for i, t in enumerate(tickers):
+        arrays = market_store.load_arrays(t)
+        if arrays is None or len(arrays[0]) == 0: continue
+        t_dates, ohlcv = arrays
+        res = se.run(*(np.asarray(ohlcv[:, j], dtype=np.float64) for j in (1, 2, 3, 4)), core, sniper)
+        pos = np.searchsorted(dates, t_dates)
+        hit = pos < len(dates)
+        hit[hit] = dates[pos[hit]] == t_dates[hit]
+        codes[i, pos[hit]] = res['signal_code'][hit]
+    i0 = int(np.searchsorted(dates, np.datetime64(str(start or config.START_DATE)[:10], 'D')))
+    return dates[i0:], close[:, i0:], codes[:, i0:]
+
+def fill_close(close):
+    # 缺值 → 前一日收盤；上市前 → 第一筆收盤 (上市前目標權重為 0，只是避免 NaN 擴散)
+    close = np.array(close, dtype=np.float64)
+    idx = np.where(np.isnan(close), 0, np.arange(close.shape[-1]))
+    close = np.take_along_axis(close, np.maximum.accumulate(idx, axis=-1), axis=-1)
+    first = np.argmax(~np.isnan(close), axis=-1)
+    return np.where(np.isnan(close), np.take_along_axis(close, first[:, None], axis=-1), close)
+
+# ==========================================
+# 2. 目標權重 & 再平衡日
+# ==========================================
+def allocation_weights(tickers, weights=None):
+    weights = weights or config.PORTFOLIO_WEIGHTS or {t: 1.0 for t in tickers}
+    w = np.array([float(weights.get(t, 0.0)) for t in tickers])
+    return w / w.sum()
+
+def target_weights(codes, alloc, listed=None, allocation='fixed', sniper_size=None):
+    # codes: (..., 標的, 日期)；alloc: 每檔配置比例 (合計 1)；listed: 有收盤價的日期 (上市前不持倉)
+    exposure = se.positions_from_signals(codes, sniper_size)
+    if listed is not None: exposure = np.where(listed, exposure, 0.0)
+    target = exposure * alloc[:, None]
+    if allocation == 'active':
+        # 有持倉的標的按配置比例分掉全部資金 (狙擊倉仍只用該份的 SIZE)
+        active = np.sum(np.where(exposure > 0, alloc[:, None], 0.0), axis=-2, keepdims=True)
+        target = np.divide(target, active, out=np.zeros_like(target), where=active > 0)
+    return target
+
+def rebalance_days(dates, target, mode='signal'):
+    # → (..., 日期) bool；第一天一定建倉
+    changed = np.zeros(target.shape[:-2] + target.shape[-1:], dtype=bool)
+    changed[..., 0] = True
+    changed[..., 1:] = np.any(target[..., 1:] != target[..., :-1], axis=-2)
+    if mode == 'daily': return np.ones_like(changed)
+    if mode in ('weekly', 'monthly'):
+        keys = timeframes.period_keys(dates, '1wk' if mode == 'weekly' else '1mo')
+        changed[..., 1:] |= keys[1:] != keys[:-1]
+    return changed
+
+# ==========================================
+# 3. 模擬 (向量化)
+# ==========================================
+def simulate(close, target, rebalance, cost=0.0, capital=None):
+    # close: (標的, 日期)；target: (..., 標的, 日期) 收盤時的目標權重；rebalance: (..., 日期)
+    # 第 t 根的漲跌由「上一次再平衡 r(t) (≤ t-1)」建立的持股承擔：
+    #   G(t) = Σ W[r] × close[t] / close[r] + 現金[r]   (該段期間的淨值倍數)
+    #   再平衡日的淨值 = 上一次再平衡後的淨值 × G(t) × (1 - cost × 換手)，以 cumprod 串起來
+    capital = config.INITIAL_CAPITAL if capital is None else capital
+    close = np.asarray(close, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    n = close.shape[-1]
+    seg = np.maximum.accumulate(np.where(rebalance, np.arange(n), 0), axis=-1)
+    r = np.concatenate([seg[..., :1], seg[..., :-1]], axis=-1)
+    r_idx = np.broadcast_to(r[..., None, :], target.shape)
+
+    w_r = np.take_along_axis(target, r_idx, axis=-1)
+    grown = w_r * close / np.take_along_axis(np.broadcast_to(close, target.shape), r_idx, axis=-1)
+    growth = grown.sum(axis=-2) + 1 - w_r.sum(axis=-2)
+    drift = grown / growth[..., None, :]
+    drift[..., 0] = 0.0  # 第一天從全現金建倉
+    turnover = np.where(rebalance, np.abs(target - drift).sum(axis=-2), 0.0)
+
+    step = np.where(rebalance, growth * (1 - cost * turnover), 1.0)
+    post = np.cumprod(step, axis=-1)  # 再平衡日：扣完成本後的淨值 / capital
+    equity = capital * np.where(rebalance, post, np.take_along_axis(post, r, axis=-1) * growth)
+    pre = capital * np.take_along_axis(post, r, axis=-1) * growth
+    weights = np.where(rebalance[..., None, :], target, drift)
+
+    returns = np.empty(equity.shape)
+    returns[..., 0] = equity[..., 0] / capital - 1
+    returns[..., 1:] = equity[..., 1:] / equity[..., :-1] - 1
+    return {'equity': equity, 'returns': returns, 'weights': weights, 'turnover': turnover,
+            'costs': pre * cost * turnover, 'rebalances': rebalance.sum(axis=-1)}
+
+def backtest(tickers=None, start=None, rebalance=None, allocation=None, cost=None, weights=None,
+             capital=None, sniper_size=None, data=None):
+    # data: load_signals 的結果 (最佳化迴圈中重複使用，避免重讀行情庫)
+    import main as dashboard
+    tickers = list(tickers or dashboard.target_tickers)
+    rebalance = rebalance or config.PORTFOLIO_REBALANCE
+    allocation = allocation or config.PORTFOLIO_ALLOCATION
+    cost = config.PORTFOLIO_COST if cost is None else cost
+    dates, close, codes = data if data is not None else load_signals(tickers, start)
+    listed = ~np.isnan(close)
+    close = fill_close(close)
+    alloc = allocation_weights(tickers, weights)
+
+    t0 = time.perf_counter()
+    target = target_weights(codes, alloc, listed, allocation, sniper_size)
+    sim = simulate(close, target, rebalance_days(dates, target, rebalance), cost, capital)
+    # 基準：同樣配置比例的買進持有 (上市後才買，之後不再平衡)
+    hold_target = np.where(listed, 1.0, 0.0) * alloc[:, None]
+    hold = simulate(close, hold_target, rebalance_days(dates, hold_target, 'signal'), cost, capital)
+    elapsed = time.perf_counter() - t0
+
+    return {'tickers': tickers, 'dates': dates, 'rebalance': rebalance, 'allocation': allocation, 'cost': cost,
+            'alloc': alloc, 'sim': sim, 'hold': hold, 'seconds': elapsed,
+            'perf': {k: float(v) for k, v in se.performance(sim['returns']).items()},
+            'hold_perf': {k: float(v) for k, v in se.performance(hold['returns']).items()}}
+
+# ==========================================
+# 4. 報告
+# ==========================================
+def report(bt):
+    sim, perf, hold = bt['sim'], bt['perf'], bt['hold_perf']
+    dates = bt['dates']
+    print(f"\n💼 組合回測: {' / '.join(f'{t} {w * 100:.0f}%' for t, w in zip(bt['tickers'], bt['alloc']))}"
+          f" | {dates[0]} ~ {dates[-1]} | 再平衡 {bt['rebalance']} | 配置 {bt['allocation']} | 成本 {bt['cost'] * 1e4:.1f} bps")
+    line = lambda name, p: (f"   {name:<8} CAGR {p['cagr'] * 100:>6.2f}% | MDD {p['max_dd'] * 100:>7.2f}% | "
+                            f"Sharpe {p['sharpe']:>5.2f} | Calmar {p['calmar']:>5.2f} | 期末 {config.INITIAL_CAPITAL * (1 + p['total_return']):>12,.0f}")
+    print(line("策略", perf))
+    print(line("買進持有", hold))
+    exposure = sim['weights'].sum(axis=-2)
+    print(f"   再平衡 {int(sim['rebalances'])} 次 | 年化換手 {sim['turnover'].sum() / (len(dates) / 252):.2f}x | "
+          f"成本合計 {sim['costs'].sum():,.0f} | 平均持倉 {exposure.mean() * 100:.1f}%")
+    for i, t in enumerate(bt['tickers']):
+        print(f"   {t:<6} 平均權重 {sim['weights'][i].mean() * 100:>5.1f}% | 持倉天數 {np.count_nonzero(sim['weights'][i] > 0):>5}")
+    print(f"⏱️ 模擬 {len(bt['tickers'])} 檔 × {len(dates)} 日 (含買進持有基準): {bt['seconds'] * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    import main as dashboard
+    parser = argparse.ArgumentParser(description="多標的組合回測 (訊號倉位 + 資金配置 + 再平衡 + 交易成本)")
+    parser.add_argument('--tickers', nargs='+', default=dashboard.target_tickers)
+    parser.add_argument('--start', default=config.START_DATE)
+    parser.add_argument('--rebalance', choices=REBALANCE, default=config.PORTFOLIO_REBALANCE)
+    parser.add_argument('--allocation', choices=ALLOCATION, default=config.PORTFOLIO_ALLOCATION)
+    parser.add_argument('--cost', type=float, default=config.PORTFOLIO_COST, help="單邊交易成本 (例如 0.0005 = 5bps)")
+    parser.add_argument('--no-refresh', action='store_true', help="不更新行情，只讀本地行情庫")
+    args = parser.parse_args()
+
+    if not args.no_refresh: market_store.refresh(args.tickers)
+    report(backtest(args.tickers, args.start, args.rebalance, args.allocation, args.cost))
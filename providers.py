@@ -0,0 +1,110 @@
+# ==========================================
+# 🔌 MARKET DATA PROVIDERS (行情數據源)
+# ==========================================
+# main.py / structure.py / market_store.py 共用的數據源介面。
+# 一次批次請求多個 Ticker，在這裡統一處理 MultiIndex 欄位，回傳 {ticker: DataFrame}。
+#   - yfinance : 線上數據 (預設)
+#   - fixture  : 本地 CSV (每個 Ticker 一個檔)，無網路也能跑、可重現的 benchmark 用
+# 切換方式：config.DATA_PROVIDER，或環境變數 MARKET_DATA_PROVIDER / MARKET_DATA_FIXTURES。
+# pandas / yfinance 只在真正下載時才載入 (signals-only 模式只讀本地行情庫，不需要它們)。
+import os
+import config
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def _normalize(df):
+    # 統一成 DatetimeIndex (無時區) + OHLCV 欄位，並移除整列空值 (例如週末 / 休市日)
+    import pandas as pd
+    if df is None or len(df) == 0:
+        return pd.DataFrame(columns=FIELDS, dtype=float)
+    df = df[[c for c in FIELDS if c in df.columns]].dropna(how='all')
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None: index = index.tz_localize(None)
+    df.index = index.rename('Date')
+    return df.sort_index()
+
+class MarketDataProvider:
+    name = 'base'
+
+    def download(self, tickers, start=None, interval="1d"):
+        # 回傳 {ticker: DataFrame(OHLCV)}；抓不到的 Ticker 不會出現在結果中
+        raise NotImplementedError
+
+    def get(self, ticker, start=None, interval="1d"):
+        return self.download([ticker], start=start, interval=interval).get(ticker)
+
+class YahooProvider(MarketDataProvider):
+    name = 'yfinance'
+
+    def download(self, tickers, start=None, interval="1d"):
+        import pandas as pd
+        import yfinance as yf  # 延遲載入：離線模式不需要 yfinance
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers: return {}
+        kwargs = {'start': start} if start is not None else {'period': 'max'}
+        df_all = yf.download(tickers, interval=interval, group_by='ticker', progress=False, **kwargs)
+
+        frames = {}
+        if df_all is None or len(df_all) == 0: return frames
+        if isinstance(df_all.columns, pd.MultiIndex):
+            # group_by='ticker' → 第一層是 Ticker，第二層是 OHLCV
+            available = set(df_all.columns.get_level_values(0))
+            for t in tickers:
+                if t in available:
+                    frame = _normalize(df_all[t])
+                    if len(frame): frames[t] = frame
+        else:
+            frame = _normalize(df_all)
+            if len(frame): frames[tickers[0]] = frame
+        return frames
+
+class CsvProvider(MarketDataProvider):
+    name = 'fixture'
+
+    def __init__(self, fixture_dir=None):
+        self.fixture_dir = fixture_dir or os.environ.get('MARKET_DATA_FIXTURES') or config.FIXTURE_DIR
+
+    def path(self, ticker, interval="1d"):
+        # 日線: <ticker>.csv；其他週期 (例如 1h): <ticker>_<interval>.csv
+        suffix = "" if interval == "1d" else f"_{interval}"
+        return os.path.join(self.fixture_dir, f"{ticker.replace('/', '_')}{suffix}.csv")
+
+    def download(self, tickers, start=None, interval="1d"):
+        import pandas as pd
+        frames = {}
+        for t in dict.fromkeys(tickers):
+            path = self.path(t, interval)
+            if not os.path.exists(path): continue
+            df = _normalize(pd.read_csv(path, index_col=0, parse_dates=True))
+            if start is not None: df = df.loc[pd.Timestamp(start):]
+            if len(df): frames[t] = df
+        return frames
+
+    def save(self, ticker, df, interval="1d"):
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        _normalize(df).to_csv(self.path(ticker, interval))
+
+PROVIDERS = {
+    YahooProvider.name: YahooProvider,
+    CsvProvider.name: CsvProvider,
+}
+
+def get_provider(name=None):
+    name = name or os.environ.get('MARKET_DATA_PROVIDER') or config.DATA_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"未知的數據源: {name} (可用: {', '.join(PROVIDERS)})")
+    return PROVIDERS[name]()
+
+if __name__ == "__main__":
+    # 將本地行情庫匯出成 fixture CSV：python providers.py <fixture_dir> SPY QQQ ...
+    import sys
+    import market_store
+    out_dir, targets = sys.argv[1], sys.argv[2:] or [config.TICKER]
+    fixture = CsvProvider(out_dir)
+    for t in targets:
+        df = market_store.load(t)
+        if len(df):
+            fixture.save(t, df)
+            print(f"✅ {t}: {len(df)} bars → {fixture.path(t)}")
+        else:
+            print(f"⚠️ 警告: 本地行情庫沒有 {t} 的數據")
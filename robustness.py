@@ -0,0 +1,198 @@
+# ==========================================
+# 🎲 ROBUSTNESS TEST (Bootstrap / Monte Carlo 穩健度測試)
+# ==========================================
+# 單一條歷史淨值只是眾多可能路徑之一。這裡從 QQQ / SPY / IWM 的歷史重抽數千條價格路徑，
+# 在每條路徑上跑同一套 Final Gold 決策樹與倉位 (SNIPER_PARAMS['SIZE'])，得到 CAGR / 最大回撤的分佈與信賴區間。
+#   - block：區塊 bootstrap，隨機抽連續 BLOCK 天的 K 棒 (相對前一日收盤的 O/H/L/C 比例 + 成交量) 接成新路徑，保留短期波動叢聚
+#   - regime：先以實際的牛 / 熊 (收盤 vs SMA200) 區塊轉移機率模擬市場狀態序列，再從同一狀態的區塊中抽樣
+# 每批路徑是一個 (paths, bars) 陣列，se.run / positions_from_signals / performance 一次向量化算完；
+# 各批交給 process pool 平行處理 (每批的亂數種子由 SeedSequence 派生，結果可重現)。
+#
+# 用法: python robustness.py [--tickers QQQ SPY IWM] [--paths 2000] [--method block|regime] [--block 20] [--workers 8]
+import os
+import json
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import config
+import market_store
+import signal_engine as se
+
+TICKERS = ['QQQ', 'SPY', 'IWM']
+METHODS = ['block', 'regime']
+BLOCK = 20                     # 區塊長度 (交易日)
+MAX_CHUNK_CELLS = 8_000_000    # 每批 paths × bars × LOOKBACK 上限 (成交量分佈會展開每個視窗，控制記憶體)
+PERCENTILES = [5, 25, 50, 75, 95]
+OUT_DIR = "scan_results"
+
+# ==========================================
+# 1. 歷史 → 相對 K 棒
+# ==========================================
+def relative_bars(ohlcv):
+    # 以前一日收盤為基準的 O/H/L/C 比例 (第一根無前收，略過) + 成交量：(bars - 1, 5)
+    prev = ohlcv[:-1, 3:4]
+    return np.column_stack([ohlcv[1:, :4] / prev, ohlcv[1:, 4]])
+
+def block_regimes(ohlcv, block):
+    # 每個區塊起點的市場狀態：1 = 收盤在 SMA200 之上 (牛)，0 = 之下 (熊)；SMA200 未暖機的視為牛
+    close = ohlcv[:, 3]
+    with np.errstate(invalid='ignore'):
+        bull = ~(close < se.rolling_mean(close, se.SMA_WINDOW))
+    return bull[1:len(close) - block + 1].astype(np.int8)
+
+def transition_matrix(regimes, block):
+    # 相隔 block 天的狀態轉移機率 (2 × 2)
+    a, b = regimes[:-block], regimes[block:]
+    counts = np.ones((2, 2))  # 加一平滑，避免某狀態沒有樣本
+    np.add.at(counts, (a, b), 1)
+    return counts / counts.sum(axis=1, keepdims=True)
+
+# ==========================================
+# 2. 產生路徑 (一批)
+# ==========================================
+def block_starts(rng, n_paths, n_blocks, n_rel, block, method, regimes=None, trans=None):
+    # 回傳 (paths, n_blocks) 的區塊起點
+    last = n_rel - block + 1
+    if method == 'block':
+        return rng.integers(0, last, (n_paths, n_blocks))
+    pools = [np.flatnonzero(regimes[:last] == s) for s in (0, 1)]
+    states = np.empty((n_paths, n_blocks), dtype=np.int8)
+    states[:, 0] = regimes[rng.integers(0, last, n_paths)]
+    u = rng.random((n_paths, n_blocks))
+    for j in range(1, n_blocks):
+        states[:, j] = u[:, j] < trans[states[:, j - 1], 1]
+    starts = np.empty((n_paths, n_blocks), dtype=np.int64)
+    for s, pool in enumerate(pools):
+        mask = states == s
+        if len(pool) == 0: pool = np.arange(last)  # 歷史上沒有此狀態時退回一般 bootstrap
+        starts[mask] = pool[rng.integers(0, len(pool), mask.sum())]
+    return starts
+
+def generate_paths(rel, first_close, n_paths, bars, block, rng, method='block', regimes=None, trans=None):
+    # 接起重抽的相對 K 棒 → (paths, bars) 的 High / Low / Close / Volume
+    n_blocks = -(-bars // block)
+    starts = block_starts(rng, n_paths, n_blocks, len(rel), block, method, regimes, trans)
+    idx = (starts[:, :, None] + np.arange(block)).reshape(n_paths, -1)[:, :bars]
+    r = rel[idx]                                       # (paths, bars, 5)
+    close = first_close * np.cumprod(r[..., 3], axis=1)
+    prev = np.concatenate([np.full((n_paths, 1), first_close), close[:, :-1]], axis=1)
+    return prev * r[..., 1], prev * r[..., 2], close, r[..., 4]
+
+# ==========================================
+# 3. Worker：一批路徑 → 每條路徑的績效
+# ==========================================
+def run_chunk(job):
+    rel, first_close, n_paths, bars, block, method, regimes, trans, seed, start, cost = job
+    rng = np.random.default_rng(seed)
+    high, low, close, volume = generate_paths(rel, first_close, n_paths, bars, block, rng, method, regimes, trans)
+    codes = se.run(high, low, close, volume)['signal_code']
+    positions = se.positions_from_signals(codes[:, start:])
+    returns = se.strategy_returns(close[:, start:], positions, cost)
+    hold = se.strategy_returns(close[:, start:], np.ones(positions.shape))
+    strat, bh = se.performance(returns), se.performance(hold)
+    return {**{k: v.astype(np.float32) for k, v in strat.items()},
+            **{f'hold_{k}': v.astype(np.float32) for k, v in bh.items()},
+            'exposure': positions.mean(axis=1).astype(np.float32)}
+
+def historical(ohlcv, start, cost):
+    # 實際歷史的同一組數字 (作為分佈中的參考點)
+    codes = se.run(*(ohlcv[:, j] for j in (1, 2, 3, 4)))['signal_code']
+    positions = se.positions_from_signals(codes[start:])
+    perf = se.performance(se.strategy_returns(ohlcv[start:, 3], positions, cost))
+    return {k: float(v) for k, v in perf.items()}
+
+def simulate(ticker, n_paths=2000, method='block', block=BLOCK, bars=None, workers=None, seed=0, cost=0.0):
+    arrays = market_store.load_arrays(ticker)
+    if arrays is None or len(arrays[0]) == 0:
+        print(f"❌ 找不到 {ticker} 的數據")
+        return None
+    dates, ohlcv = arrays
+    i0 = int(np.searchsorted(dates, np.datetime64(config.START_DATE, 'D')))
+    ohlcv = np.asarray(ohlcv[i0:], dtype=np.float64)
+    rel = relative_bars(ohlcv)
+    bars = bars or len(ohlcv)
+    start = se.warmup(config.CORE_PARAMS['LOOKBACK'])
+    if bars <= start + 1 or len(rel) < block:
+        print(f"❌ {ticker} 的歷史太短 ({len(ohlcv)} 根)")
+        return None
+    regimes = block_regimes(ohlcv, block) if method == 'regime' else None
+    trans = transition_matrix(regimes, block) if method == 'regime' else None
+
+    chunk = max(1, MAX_CHUNK_CELLS // (bars * config.CORE_PARAMS['LOOKBACK']))
+    sizes = [min(chunk, n_paths - i) for i in range(0, n_paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(rel, ohlcv[0, 3], n, bars, block, method, regimes, trans, s, start, cost) for n, s in zip(sizes, seeds)]
+    print(f"⏳ {ticker}: {n_paths} 條路徑 × {bars} 根 ({method}，區塊 {block} 天)，{len(jobs)} 批 × ≤{chunk} 條")
+
+    t0 = time.perf_counter()
+    if workers == 1 or len(jobs) == 1:
+        parts = [run_chunk(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(run_chunk, jobs))
+    results = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    print(f"   完成 ({time.perf_counter() - t0:.1f}s)")
+    return {'ticker': ticker, 'method': method, 'block': block, 'paths': n_paths, 'bars': bars, 'seed': seed,
+            'cost': cost, 'historical': historical(ohlcv, start, cost), 'results': results}
+
+# ==========================================
+# 4. 報告
+# ==========================================
+def distribution(values):
+    return {f'p{q}': float(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+def summarize(sim):
+    r, hist = sim['results'], sim['historical']
+    years = (sim['bars'] - se.warmup(config.CORE_PARAMS['LOOKBACK'])) / 252
+    final = config.INITIAL_CAPITAL * (1 + r['total_return'])
+    return {
+        'cagr': distribution(r['cagr']), 'max_dd': distribution(r['max_dd']),
+        'calmar': distribution(r['calmar']), 'sharpe': distribution(r['sharpe']),
+        'hold_cagr': distribution(r['hold_cagr']), 'hold_max_dd': distribution(r['hold_max_dd']),
+        'final_equity': distribution(final), 'exposure': distribution(r['exposure']),
+        'p_loss': float((r['cagr'] < 0).mean()),
+        'p_beat_hold': float((r['calmar'] > r['hold_calmar']).mean()),
+        'historical_cagr_rank': float((r['cagr'] < hist['cagr']).mean()),
+        'historical_max_dd_rank': float((r['max_dd'] < hist['max_dd']).mean()),
+        'years': years,
+    }
+
+def report(sim, summary):
+    hist = sim['historical']
+    pct = lambda d: " / ".join(f"{d[f'p{q}'] * 100:>6.1f}%" for q in PERCENTILES)
+    print(f"\n🎲 {sim['ticker']} ({sim['paths']} 條 {sim['method']} 路徑，每條 {summary['years']:.1f} 年)  百分位 {' / '.join(f'P{q}' for q in PERCENTILES)}")
+    print(f"   策略 CAGR     {pct(summary['cagr'])}   (歷史 {hist['cagr'] * 100:.1f}%，位於 P{summary['historical_cagr_rank'] * 100:.0f})")
+    print(f"   策略 MDD      {pct(summary['max_dd'])}   (歷史 {hist['max_dd'] * 100:.1f}%，位於 P{summary['historical_max_dd_rank'] * 100:.0f})")
+    print(f"   持有 CAGR     {pct(summary['hold_cagr'])}")
+    print(f"   持有 MDD      {pct(summary['hold_max_dd'])}")
+    print(f"   平均持倉      {pct(summary['exposure'])}")
+    fe = summary['final_equity']
+    print(f"   期末淨值 (起始 {config.INITIAL_CAPITAL:,}): P5 {fe['p5']:,.0f} | P50 {fe['p50']:,.0f} | P95 {fe['p95']:,.0f}")
+    print(f"   虧損機率 {summary['p_loss'] * 100:.1f}% | Calmar 勝過買進持有 {summary['p_beat_hold'] * 100:.1f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Final Gold 策略的 bootstrap / regime 重抽穩健度測試")
+    parser.add_argument('--tickers', nargs='+', default=TICKERS)
+    parser.add_argument('--paths', type=int, default=2000)
+    parser.add_argument('--method', choices=METHODS, default='block')
+    parser.add_argument('--block', type=int, default=BLOCK, help="區塊長度 (交易日)")
+    parser.add_argument('--bars', type=int, default=None, help="每條路徑的 K 棒數 (預設 = 歷史長度)")
+    parser.add_argument('--workers', type=int, default=None, help="行程數 (預設 = CPU 核心數)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cost', type=float, default=0.0, help="單邊交易成本 (例如 0.0005 = 5bps)")
+    parser.add_argument('--no-refresh', action='store_true', help="不更新行情，只讀本地行情庫")
+    args = parser.parse_args()
+
+    if not args.no_refresh: market_store.refresh(args.tickers)
+    os.makedirs(OUT_DIR, exist_ok=True)
+    for ticker in args.tickers:
+        sim = simulate(ticker, args.paths, args.method, args.block, args.bars, args.workers, args.seed, args.cost)
+        if sim is None: continue
+        summary = summarize(sim)
+        report(sim, summary)
+        base = os.path.join(OUT_DIR, f"robustness_{ticker}_{args.method}")
+        np.savez_compressed(base + ".npz", **sim['results'])
+        with open(base + ".json", 'w', encoding='utf-8') as f:
+            json.dump({k: v for k, v in sim.items() if k != 'results'} | {'summary': summary}, f, ensure_ascii=False, indent=2)
+        print(f"✅ 結果已存到 {base}.json / .npz")
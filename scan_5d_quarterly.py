@@ -0,0 +1,226 @@
+# ==========================================
+# 🔧 QUARTERLY 5-D PARAMETER SCAN (季度健檢)
+# ==========================================
+# 重新掃描 CORE_PARAMS (LOOKBACK / BINS / VA_PCT / ATR_MULT / PANIC_MULT) 及狙擊手門檻 (RSI / Bias)。
+#   - 價格陣列與共用指標 (ATR / RSI / SMA200) 只算一次，放進 shared memory，所有 worker 唯讀共用
+#   - 每個任務 = 一組 (LOOKBACK, BINS)：成交量分佈只算一次，再展開其餘參數
+#   - 結果逐任務寫入 JSON Lines，中斷後重跑會自動略過已完成的任務 (可續跑)
+#     檔案第一行記錄掃描鍵 (OHLCV 雜湊 + 成本 + 評估起點 + 網格)；數據或設定改變 → 舊結果作廢、從頭掃描
+#
+# 用法: python scan_5d_quarterly.py [--ticker QQQ] [--workers 8] [--metric calmar] [--out scan_results/...]
+import os
+import json
+import time
+import argparse
+import hashlib
+import itertools
+import numpy as np
+from multiprocessing import Pool, shared_memory
+import config
+import market_store
+import signal_engine as se
+
+# ==========================================
+# 1. 掃描網格
+# ==========================================
+GRID = {
+    'LOOKBACK': [56, 70, 84, 98, 112, 126, 140, 154, 168, 182, 196],
+    'BINS': [5, 6, 7, 8, 9, 10, 12],
+    'VA_PCT': [0.60, 0.65, 0.70, 0.75, 0.80, 0.85],
+    'ATR_MULT': [2.0, 2.3, 2.5, 2.7, 3.0, 3.3, 3.6],
+    'PANIC_MULT': [1.5, 2.0, 2.5, 3.0],
+}
+SNIPER_GRID = {
+    'RSI_THRESHOLD': [25, 30, 35],
+    'BIAS_THRESHOLD': [-0.08, -0.11, -0.14],
+}
+METRICS = ['calmar', 'cagr', 'sharpe', 'max_dd', 'total_return']
+
+def param_key(params):
+    return tuple(params[k] for k in (*GRID, *SNIPER_GRID))
+
+def task_key(lookback, bins):
+    return f"{lookback}-{bins}"
+
+def combos_per_task(grid=None, sniper_grid=None):
+    grid, sniper_grid = grid or GRID, sniper_grid or SNIPER_GRID
+    inner = [grid['VA_PCT'], grid['ATR_MULT'], grid['PANIC_MULT'], *sniper_grid.values()]
+    return int(np.prod([len(v) for v in inner]))
+
+# ==========================================
+# 2. Shared memory (價格 + 共用指標，唯讀)
+# ==========================================
+SHARED_FIELDS = ['high', 'low', 'close', 'volume', 'sma200', 'atr', 'rsi', 'bias', 'day_range']
+_shared = {}
+
+def _create_shared(arrays):
+    matrix = np.stack([np.asarray(arrays[k], dtype=np.float64) for k in SHARED_FIELDS])
+    shm = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+    np.ndarray(matrix.shape, dtype=np.float64, buffer=shm.buf)[:] = matrix
+    return shm, matrix.shape
+
+def _attach_shared(name, shape, settings):
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)  # worker 與主行程共用 resource tracker，由主行程 unlink
+    matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    matrix.flags.writeable = False
+    _shared.clear()
+    _shared.update({k: matrix[i] for i, k in enumerate(SHARED_FIELDS)})
+    _shared['_shm'] = shm
+    _shared['_settings'] = settings
+
+# ==========================================
+# 3. Worker：一組 (LOOKBACK, BINS) 展開所有其餘參數
+# ==========================================
+def run_task(task):
+    lookback, bins = task
+    s = _shared
+    settings = s['_settings']
+    start, cost, sniper_size = settings['start'], settings['cost'], settings['sniper_size']
+    ind = {k: s[k] for k in ('sma200', 'atr', 'rsi', 'bias', 'day_range')}
+    close = s['close']
+    asset_ret = np.zeros(close.shape)
+    asset_ret[1:] = close[1:] / close[:-1] - 1
+
+    profile = se.rolling_profile(s['high'], s['low'], close, s['volume'], lookback, bins)
+    highest_close = se.rolling_max(close, lookback)
+    short_high = se.rolling_max(close, settings['stop_lookback'])
+    rows = []
+    for va_pct in GRID['VA_PCT']:
+        levels = se.value_area(None, None, close, None, lookback, bins, va_pct, profile=profile)
+        for atr_mult in GRID['ATR_MULT']:
+            stop_price = highest_close - atr_mult * ind['atr']
+            sniper_stop = short_high - atr_mult * ind['atr']
+            for panic_mult, rsi_th, bias_th in itertools.product(GRID['PANIC_MULT'], *SNIPER_GRID.values()):
+                codes = se.decide(close, ind, levels, stop_price, sniper_stop, panic_mult, rsi_th, bias_th)
+                positions = se.positions_from_signals(codes[start:], sniper_size)
+                held = np.concatenate([[0.0], positions[:-1]])
+                returns = held * asset_ret[start:] - cost * np.abs(np.diff(positions, prepend=0.0))
+                perf = se.performance(returns)
+                rows.append({
+                    'task': task_key(lookback, bins),
+                    'LOOKBACK': lookback, 'BINS': bins, 'VA_PCT': va_pct, 'ATR_MULT': atr_mult, 'PANIC_MULT': panic_mult,
+                    'RSI_THRESHOLD': rsi_th, 'BIAS_THRESHOLD': bias_th,
+                    **{k: round(float(v), 6) for k, v in perf.items()},
+                    'trades': int(np.count_nonzero(np.diff(positions))),
+                })
+    return rows
+
+# ==========================================
+# 4. 續跑 & 主流程
+# ==========================================
+def scan_key(ohlcv, dates, settings):
+    # 結果只取決於數據、評估起點、回測設定與網格
+    h = hashlib.sha256()
+    for part in (np.ascontiguousarray(ohlcv, dtype=np.float64).tobytes(), np.asarray(dates, dtype='datetime64[D]').tobytes(),
+                 json.dumps(settings, sort_keys=True), json.dumps(GRID), json.dumps(SNIPER_GRID)):
+        h.update(part if isinstance(part, bytes) else part.encode())
+    return h.hexdigest()
+
+def load_results(path, key=None):
+    # → {參數: 結果}；檔頭的掃描鍵與 key 不符 (或沒有檔頭) → None (舊結果作廢)
+    results = {}
+    if not os.path.exists(path): return results
+    with open(path, encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 中斷時可能留下半行
+            if i == 0 and key is not None and row.get('key') != key: return None
+            if 'task' in row: results[param_key(row)] = row
+    return results
+
+def trim_partial(path):
+    # 中斷時最後一行可能只寫了一半：截到最後一個換行，續跑追加的第一行才不會接在殘行後面
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = pos = f.tell()
+        while pos > 0:
+            step = min(pos, 1 << 16)
+            f.seek(pos - step)
+            cut = f.read(step).rfind(b'\n')
+            if cut >= 0:
+                pos = pos - step + cut + 1
+                break
+            pos -= step
+        if pos < size: f.truncate(pos)
+
+def completed_tasks(results):
+    counts = {}
+    for row in results.values():
+        counts[row['task']] = counts.get(row['task'], 0) + 1
+    return {t for t, c in counts.items() if c >= combos_per_task()}
+
+def scan(ticker, out_path, workers=None, cost=0.0):
+    df = market_store.get(ticker, start=config.START_DATE)
+    if len(df) == 0:
+        print(f"❌ 找不到 {ticker} 的數據")
+        return {}
+    high, low, close, volume = (df[c].to_numpy(dtype=np.float64) for c in ('High', 'Low', 'Close', 'Volume'))
+    arrays = {'high': high, 'low': low, 'close': close, 'volume': volume, **se.base_indicators(high, low, close)}
+    # 所有組合用同一段評估期間：從最大 LOOKBACK 暖機完成後開始
+    start = se.warmup(max(GRID['LOOKBACK']), config.SNIPER_PARAMS['STOP_LOOKBACK'])
+    settings = {'start': start, 'cost': cost, 'sniper_size': config.SNIPER_PARAMS['SIZE'],
+                'stop_lookback': config.SNIPER_PARAMS['STOP_LOOKBACK']}
+
+    key = scan_key(df[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(), df.index.values, settings)
+    results = load_results(out_path, key)
+    if results is None:
+        print(f"🔄 {out_path} 的數據或設定已改變，舊結果作廢")
+    if not results:
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        with open(out_path, 'w', encoding='utf-8') as out:
+            out.write(json.dumps({'key': key, 'ticker': ticker, 'cost': cost, 'start': str(df.index[start].date())}) + '\n')
+        results = {}
+    else:
+        trim_partial(out_path)
+    done = completed_tasks(results)
+    tasks = [(lb, b) for lb in GRID['LOOKBACK'] for b in GRID['BINS'] if task_key(lb, b) not in done]
+    total = len(GRID['LOOKBACK']) * len(GRID['BINS'])
+    print(f"⏳ {ticker}: {len(df)} bars ({df.index[start].date()} ~ {df.index[-1].date()})，"
+          f"{total * combos_per_task()} 組參數，剩餘 {len(tasks)}/{total} 個任務")
+
+    shm, shape = _create_shared(arrays)
+    t0 = time.perf_counter()
+    try:
+        with Pool(workers, initializer=_attach_shared, initargs=(shm.name, shape, settings)) as pool, \
+                open(out_path, 'a', encoding='utf-8') as out:
+            for i, rows in enumerate(pool.imap_unordered(run_task, tasks), 1):
+                out.write(''.join(json.dumps(r) + '\n' for r in rows))
+                out.flush()
+                for r in rows: results[param_key(r)] = r
+                print(f"   [{i}/{len(tasks)}] LB {rows[0]['LOOKBACK']} / BINS {rows[0]['BINS']} 完成 ({time.perf_counter() - t0:.1f}s)")
+    finally:
+        shm.close()
+        shm.unlink()
+    return results
+
+def report(results, metric='calmar', top=10):
+    ranked = sorted(results.values(), key=lambda r: r[metric], reverse=True)[:top]
+    print(f"\n🏆 Top {len(ranked)} (依 {metric} 排序):")
+    for r in ranked:
+        print(f"   LB {r['LOOKBACK']:>3} | BINS {r['BINS']:>2} | VA {r['VA_PCT']:.2f} | ATR {r['ATR_MULT']:.1f}x | PANIC {r['PANIC_MULT']:.1f}x"
+              f" | RSI<{r['RSI_THRESHOLD']} Bias<{r['BIAS_THRESHOLD'] * 100:.0f}%"
+              f" → CAGR {r['cagr'] * 100:.1f}% / MDD {r['max_dd'] * 100:.1f}% / Calmar {r['calmar']:.2f} / Sharpe {r['sharpe']:.2f}")
+    if ranked:
+        best = ranked[0]
+        print("\n👉 建議更新 config.py:")
+        print("CORE_PARAMS = {" + ", ".join(f"'{k}': {best[k]}" for k in GRID) + "}")
+        print("SNIPER_PARAMS 門檻: " + ", ".join(f"'{k}': {best[k]}" for k in SNIPER_GRID))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="季度健檢：CORE_PARAMS / SNIPER_PARAMS 多核心參數掃描")
+    parser.add_argument('--ticker', default=config.TICKER)
+    parser.add_argument('--workers', type=int, default=None, help="行程數 (預設 = CPU 核心數)")
+    parser.add_argument('--metric', default='calmar', choices=METRICS)
+    parser.add_argument('--cost', type=float, default=0.0, help="單邊交易成本 (例如 0.0005 = 5bps)")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--out', default=None, help="結果檔 (JSON Lines)，預設 scan_results/scan_5d_<ticker>.jsonl")
+    args = parser.parse_args()
+
+    out_path = args.out or os.path.join('scan_results', f"scan_5d_{args.ticker}.jsonl")
+    results = scan(args.ticker, out_path, args.workers, args.cost)
+    report(results, args.metric, args.top)
@@ -0,0 +1,111 @@
+# ==========================================
+# 🔭 UNIVERSE SCANNER (全市場掃描)
+# ==========================================
+# 把整個 universe (例如 S&P 500 / Nasdaq-100 成分股) 對齊成一個 (ticker × date) NumPy 面板，
+# 一次向量化算出每個 Ticker 的 SMA200 / ATR / RSI / 乖離 / 成交量分佈 / signal_code (Final Gold 決策樹)，
+# 再輸出排行榜，例如「目前在狙擊區」或「跌破 VAL」的標的。
+#
+# 用法: python scanner.py [--universe-file sp500.txt] [--only sniper|below-val|buy|all] [--csv out.csv]
+#   universe 檔：每行一個 Ticker (也可用逗號分隔，# 之後為註解)；未指定時掃描儀表板的觀察清單
+import csv
+import time
+import argparse
+import numpy as np
+import config
+import market_store
+import panel_store
+import signal_engine as se
+
+# 排行優先順序：進場訊號在前
+SIGNAL_PRIORITY = {se.SIGNAL_SNIPER_BUY: 0, se.SIGNAL_DIP_BUY: 1, se.SIGNAL_LET_RUN: 2, se.SIGNAL_WAIT: 3,
+                   se.SIGNAL_SNIPER_HOLD: 4, se.SIGNAL_TAKE_PROFIT: 5, se.SIGNAL_BEAR: 6}
+
+FILTERS = {
+    'all': lambda r: True,
+    'sniper': lambda r: r['signal_code'] == se.SIGNAL_SNIPER_BUY,
+    'below-val': lambda r: r['price'] < r['val'],
+    'buy': lambda r: r['signal_code'] in (se.SIGNAL_SNIPER_BUY, se.SIGNAL_DIP_BUY),
+}
+
+def read_universe(path):
+    tickers = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            tickers.extend(t.strip().upper() for t in line.replace(',', ' ').split() if t.strip())
+    return list(dict.fromkeys(tickers))
+
+def default_universe():
+    import main
+    import structure
+    return list(dict.fromkeys(main.target_tickers + structure.all_tickers))
+
+def scan_panel(dates, panel, tickers, core=None, sniper=None):
+    # 面板向量化：只取足夠暖機的尾段，所有 Ticker 一起跑 signal_engine (成交量分佈只算最後一個視窗)
+    # panel: {欄位: (tickers, dates)} 或 panel_store.Panel (float32 memmap，切片不複製)
+    core = {**config.CORE_PARAMS, **(core or {})}
+    sniper = {**config.SNIPER_PARAMS, **(sniper or {})}
+    n = se.warmup(core['LOOKBACK'], sniper['STOP_LOOKBACK']) + 2
+    high, low, close, volume = (panel[f][:, -n:] for f in ('High', 'Low', 'Close', 'Volume'))
+    result = se.run(high, low, close, volume, core, sniper, tail=1)
+    last = {k: np.asarray(v)[:, -1] for k, v in result.items()}
+
+    rows = []
+    for i, t in enumerate(tickers):
+        if not last['ready'][i] or np.isnan(last['sma200'][i]) or np.isnan(last['poc'][i]):
+            continue  # 歷史不足或尾段有缺值 (停牌 / 新上市)
+        price = float(close[i, -1])
+        rows.append({
+            'ticker': t, 'date': str(dates[-1]), 'price': price,
+            'signal_code': int(last['signal_code'][i]), 'signal': se.SIGNAL_LABELS[int(last['signal_code'][i])],
+            'rsi': last['rsi'][i], 'bias': last['bias'][i], 'sma200': last['sma200'][i],
+            'poc': last['poc'][i], 'val': last['val'][i], 'vah': last['vah'][i],
+            'stop_price': last['stop_price'][i], 'sniper_stop': last['sniper_stop'][i],
+            'to_val': price / last['val'][i] - 1,
+        })
+    return rows
+
+def rank(rows, only='all'):
+    rows = [r for r in rows if FILTERS[only](r)]
+    return sorted(rows, key=lambda r: (SIGNAL_PRIORITY[r['signal_code']], r['bias']))
+
+def print_table(rows, limit=50):
+    print(f"{'Ticker':<10}{'Signal':<18}{'Price':>10}{'RSI':>7}{'Bias':>8}{'vs VAL':>8}{'POC':>10}{'VAL':>10}{'ATR Stop':>10}")
+    for r in rows[:limit]:
+        print(f"{r['ticker']:<10}{r['signal']:<18}{r['price']:>10.2f}{r['rsi']:>7.1f}{r['bias'] * 100:>7.1f}%"
+              f"{r['to_val'] * 100:>7.1f}%{r['poc']:>10.2f}{r['val']:>10.2f}{r['stop_price']:>10.2f}")
+    if len(rows) > limit: print(f"... 另有 {len(rows) - limit} 檔")
+
+def write_csv(rows, path):
+    if not rows: return
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Final Gold 全市場掃描")
+    parser.add_argument('--universe-file', default=None, help="Ticker 清單檔 (每行一個)")
+    parser.add_argument('--calendar', default='SPY', help="對齊用的交易日曆 (以該 Ticker 的交易日為準)")
+    parser.add_argument('--only', default='all', choices=list(FILTERS))
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--csv', default=None, help="另存完整排行為 CSV")
+    parser.add_argument('--no-refresh', action='store_true', help="不更新行情，只讀本地行情庫")
+    args = parser.parse_args()
+
+    tickers = read_universe(args.universe_file) if args.universe_file else default_universe()
+    if not args.no_refresh: market_store.refresh(list(dict.fromkeys(tickers + [args.calendar])))
+
+    t0 = time.perf_counter()
+    panel = panel_store.load(tickers, calendar=args.calendar)  # float32 memmap 面板，只有尾段會轉成 float64
+    dates = panel.dates64
+    t1 = time.perf_counter()
+    rows = scan_panel(dates, panel, panel.tickers)
+    t2 = time.perf_counter()
+    ranked = rank(rows, args.only)
+    print(f"🔭 {len(tickers)} 檔 × {len(dates)} 日 ({panel.nbytes() / 2**20:.0f} MB) | 有效 {len(rows)} 檔 | 篩選 '{args.only}' → {len(ranked)} 檔 "
+          f"(載入 {(t1 - t0) * 1000:.0f} ms / 計算 {(t2 - t1) * 1000:.0f} ms)")
+    print_table(ranked, args.limit)
+    if args.csv:
+        write_csv(ranked, args.csv)
+        print(f"✅ 已輸出 {args.csv}")
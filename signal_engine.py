@@ -0,0 +1,334 @@
+# ==========================================
+# ⚙️ VECTORIZED SIGNAL ENGINE (全歷史訊號引擎)
+# ==========================================
+# main.calculate_data 只在最後一根 K 棒 (iloc[-1]) 上跑決策樹；
+# 這裡用 NumPy 一次算出「每一根」K 棒的 signal_code / POC / VAL / VAH / 止盈線 / 狙擊止損，
+# main.calculate_data 本身也是呼叫這裡 (只取最後一根)，兩者的數字完全一致。
+# 只依賴 NumPy (不載入 pandas)，signals-only 模式可以快速冷啟動。
+#
+# 所有函數都沿最後一個軸 (時間軸) 運算：輸入可為 (n,) 單一路徑，或 (paths, n) 多條路徑 (回測 / 掃描用)。
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import config
+import kernels  # 選用的 Numba 編譯核心 (沒有 numba 時用下面的 NumPy 實作)
+
+SMA_WINDOW = 200
+ATR_WINDOW = 14
+RSI_WINDOW = 14
+
+# signal_code 對照 (與 main.py 決策樹相同)
+SIGNAL_SNIPER_BUY = 3    # 🔫 狙擊手進場
+SIGNAL_LET_RUN = 2       # ▲ 續抱/追勢
+SIGNAL_DIP_BUY = 1       # ★ 強力抄底
+SIGNAL_WAIT = 0          # ⚠️ 觀察 / 恐慌觀望
+SIGNAL_BEAR = -1         # ▼ 清倉離場
+SIGNAL_TAKE_PROFIT = -2  # ▼ 獲利了結
+SIGNAL_SNIPER_HOLD = -3  # 🛡️ 狙擊單續抱
+
+SIGNAL_LABELS = {
+    SIGNAL_SNIPER_BUY: '🔫 Sniper Buy',
+    SIGNAL_LET_RUN: '▲ Let Run',
+    SIGNAL_DIP_BUY: '★ Dip Buy',
+    SIGNAL_WAIT: '⚠️ Wait',
+    SIGNAL_BEAR: '▼ Bear Market',
+    SIGNAL_TAKE_PROFIT: '▼ Take Profit',
+    SIGNAL_SNIPER_HOLD: '🛡️ Sniper Hold',
+}
+
+# ==========================================
+# 1. 基礎指標 (與參數無關，可在掃描中重用)
+# ==========================================
+def rolling_mean(x, window):
+    # 同 .rolling(window).mean() (前 window-1 個為 NaN)；每個視窗依序相加，
+    # 結果只取決於視窗內的數據 (與從哪裡開始算無關)，只算尾段也會得到相同的最後一根
+    if kernels.enabled(np.size(x) * window): return kernels.rolling_mean(x, window)
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    m = x.shape[-1] - window + 1
+    if m <= 0: return out
+    acc = x[..., :m].copy()
+    for k in range(1, window):
+        acc += x[..., k:k + m]
+    out[..., window - 1:] = acc / window
+    return out
+
+def rolling_max(x, window):
+    if kernels.enabled(np.size(x) * window): return kernels.rolling_max(x, window)
+    out = np.full(np.shape(x), np.nan)
+    out[..., window - 1:] = sliding_window_view(x, window, axis=-1).max(axis=-1)
+    return out
+
+def rolling_min(x, window):
+    if kernels.enabled(np.size(x) * window): return kernels.rolling_min(x, window)
+    out = np.full(np.shape(x), np.nan)
+    out[..., window - 1:] = sliding_window_view(x, window, axis=-1).min(axis=-1)
+    return out
+
+def _shift(x):
+    out = np.empty(np.shape(x))
+    out[..., 0] = np.nan
+    out[..., 1:] = x[..., :-1]
+    return out
+
+def true_range(high, low, close):
+    if kernels.enabled(np.size(close)): return kernels.true_range(high, low, close)
+    prev_close = _shift(close)
+    # fmax 會略過 NaN，與 pd.concat(...).max(axis=1) 相同 (第一根只有 High-Low)
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+def rsi(close, window=RSI_WINDOW):
+    if kernels.enabled(np.size(close) * window): return kernels.rsi(close, window)
+    delta = close - _shift(close)
+    gain = rolling_mean(np.where(delta > 0, delta, 0), window)
+    loss = rolling_mean(-np.where(delta < 0, delta, 0), window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+def base_indicators(high, low, close):
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    sma200 = rolling_mean(close, SMA_WINDOW)
+    atr = rolling_mean(true_range(high, low, close), ATR_WINDOW)
+    return {
+        'sma200': sma200,
+        'atr': atr,
+        'rsi': rsi(close),
+        'bias': (close - sma200) / sma200,
+        'day_range': high - low,
+    }
+
+# ==========================================
+# 2. 成交量分佈 (Volume Profile) & 價值區
+# ==========================================
+def histogram_bins(values, first_edge, last_edge, bins):
+    # 逐列複製 np.histogram(range=(first, last)) 的等寬分箱規則 (含最後一箱包含右邊界、±1 ULP 修正)
+    # values: (rows, L)；first_edge / last_edge: (rows,)；回傳 (bin_index, keep, bin_edges)
+    first_edge = np.asarray(first_edge, dtype=np.float64).copy()
+    last_edge = np.asarray(last_edge, dtype=np.float64).copy()
+    flat = first_edge == last_edge
+    first_edge[flat] -= 0.5
+    last_edge[flat] += 0.5
+    bin_edges = np.linspace(first_edge, last_edge, bins + 1, axis=-1)
+
+    keep = (values >= first_edge[:, None]) & (values <= last_edge[:, None])
+    with np.errstate(invalid='ignore'):
+        f_indices = ((values - first_edge[:, None]) / (last_edge - first_edge)[:, None]) * bins
+    indices = np.where(keep, f_indices, 0).astype(np.intp)
+    indices[indices == bins] -= 1
+    # 以攤平後的一維索引查邊界 (比二維 fancy indexing 快)
+    flat_edges = bin_edges.ravel()
+    base = (np.arange(values.shape[0]) * (bins + 1))[:, None]
+    indices -= values < flat_edges.take(base + indices)
+    indices += (values >= flat_edges.take(base + indices + 1)) & (indices != bins - 1)
+    return indices, keep, bin_edges
+
+def volume_profile(prices, volumes, first_edge, last_edge, bins):
+    # 多個視窗一起算 np.histogram(prices, bins, range, weights=volumes)；prices / volumes: (rows, L)
+    indices, keep, bin_edges = histogram_bins(prices, first_edge, last_edge, bins)
+    rows = prices.shape[0]
+    flat = (np.arange(rows)[:, None] * bins + indices)[keep]
+    vol_bin = np.bincount(flat, weights=volumes[keep], minlength=rows * bins).reshape(rows, bins)
+    return vol_bin, bin_edges
+
+def expand_value_area(vol_bin, va_pct):
+    # 向量化版的價值區擴張 (與 main.py 的 while 迴圈逐步相同)：每步比較上下相鄰箱，較大者納入
+    if kernels.enabled(np.size(vol_bin) * vol_bin.shape[-1]): return kernels.expand_value_area(vol_bin, va_pct)
+    rows, bins = vol_bin.shape
+    r = np.arange(rows)
+    poc_idx = np.argmax(vol_bin, axis=1)
+    target_v = vol_bin.sum(axis=1) * va_pct
+    curr_v = vol_bin[r, poc_idx]
+    up, low = poc_idx.copy(), poc_idx.copy()
+    active = curr_v < target_v
+    for _ in range(bins - 1):
+        if not active.any(): break
+        v_u = np.where(up < bins - 1, vol_bin[r, np.minimum(up + 1, bins - 1)], 0)
+        v_d = np.where(low > 0, vol_bin[r, np.maximum(low - 1, 0)], 0)
+        active &= ~((v_u == 0) & (v_d == 0))
+        go_up = active & (v_u > v_d)
+        go_down = active & ~(v_u > v_d)
+        up += go_up
+        low -= go_down
+        curr_v = curr_v + np.where(go_up, v_u, 0) + np.where(go_down, v_d, 0)
+        active &= curr_v < target_v
+    return poc_idx, low, up
+
+def rolling_profile(high, low, close, volume, lookback, bins, tail=None):
+    # 每個 lookback 視窗的成交量分佈 (與 VA_PCT 無關，可在掃描中重用)；資料不足時回傳 None
+    # tail: 只算最後 tail 根 K 棒的視窗 (例如掃描只需要最後一根)
+    high, low, close, volume = (np.asarray(a, dtype=np.float64) for a in (high, low, close, volume))
+    n = close.shape[-1]
+    if n < lookback: return None
+    if tail is not None and tail < n - lookback + 1:
+        keep = lookback + tail - 1
+        high, low, close, volume = (a[..., -keep:] for a in (high, low, close, volume))
+    typical = (high + low + close) / 3
+    p_win = sliding_window_view(typical, lookback, axis=-1).reshape(-1, lookback)
+    v_win = sliding_window_view(volume, lookback, axis=-1).reshape(-1, lookback)
+    range_min = sliding_window_view(low, lookback, axis=-1).min(axis=-1).reshape(-1)
+    range_max = sliding_window_view(high, lookback, axis=-1).max(axis=-1).reshape(-1)
+    vol_bin, bin_edges = volume_profile(p_win, v_win, range_min, range_max, bins)
+    return {'vol_bin': vol_bin, 'bin_mids': (bin_edges[:, :-1] + bin_edges[:, 1:]) / 2,
+            'windows': close.shape[-1] - lookback + 1}
+
+def value_area(high, low, close, volume, lookback, bins, va_pct, profile=None, tail=None):
+    # 每根 K 棒的 POC / VAL / VAH (以最近 lookback 根 K 棒的典型價格加權成交量)；沒有完整視窗的為 NaN
+    profile = profile or rolling_profile(high, low, close, volume, lookback, bins, tail)
+    shape = np.shape(close)
+    out = {k: np.full(shape, np.nan) for k in ('poc', 'val', 'vah')}
+    if profile is None: return out
+
+    poc_idx, low_idx, up_idx = expand_value_area(profile['vol_bin'], va_pct)
+    r = np.arange(len(poc_idx))
+    m = profile['windows']
+    for key, idx in (('poc', poc_idx), ('val', low_idx), ('vah', up_idx)):
+        out[key][..., shape[-1] - m:] = profile['bin_mids'][r, idx].reshape(shape[:-1] + (m,))
+    return out
+
+def trailing_stops(close, atr, lookback, atr_mult, stop_lookback):
+    # ATR 止盈 (lookback 內最高收盤 - N*ATR) 與狙擊止損 (stop_lookback 內最高收盤 - N*ATR)
+    close = np.asarray(close, dtype=np.float64)
+    return (rolling_max(close, lookback) - atr_mult * atr,
+            rolling_max(close, stop_lookback) - atr_mult * atr)
+
+# ==========================================
+# 3. 決策樹 (Final Gold, Sniper Edition)
+# ==========================================
+def decide(close, ind, levels, stop_price, sniper_stop, panic_mult, rsi_threshold, bias_threshold):
+    # 與 main.py 的 if/elif 順序完全相同；np.select 取第一個成立的條件
+    close = np.asarray(close, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        is_bull_market = close > ind['sma200']
+        is_sniper_zone = (ind['rsi'] < rsi_threshold) & (ind['bias'] < bias_threshold)
+        is_panic = ind['day_range'] > (panic_mult * ind['atr'])
+        conditions = [
+            is_sniper_zone,
+            ~is_bull_market & (close > sniper_stop),
+            ~is_bull_market,
+            is_panic,
+            close < levels['val'],
+            (close > levels['poc']) & (close < stop_price),
+            close > levels['poc'],
+        ]
+    choices = [SIGNAL_SNIPER_BUY, SIGNAL_SNIPER_HOLD, SIGNAL_BEAR, SIGNAL_WAIT,
+               SIGNAL_DIP_BUY, SIGNAL_TAKE_PROFIT, SIGNAL_LET_RUN]
+    return np.select(conditions, choices, default=SIGNAL_WAIT).astype(np.int8)
+
+def decide_one(close, ind, levels, stop_price, sniper_stop, panic_mult, rsi_threshold, bias_threshold):
+    # 單根 K 棒的純量版 (串流逐筆更新用，省去 np.select 的開銷)；NaN 比較一律為 False，與 decide 相同
+    if ind['rsi'] < rsi_threshold and ind['bias'] < bias_threshold: return SIGNAL_SNIPER_BUY
+    if not close > ind['sma200']:
+        return SIGNAL_SNIPER_HOLD if close > sniper_stop else SIGNAL_BEAR
+    if ind['day_range'] > panic_mult * ind['atr']: return SIGNAL_WAIT
+    if close < levels['val']: return SIGNAL_DIP_BUY
+    if close > levels['poc']:
+        return SIGNAL_TAKE_PROFIT if close < stop_price else SIGNAL_LET_RUN
+    return SIGNAL_WAIT
+
+def warmup(lookback, stop_lookback=None):
+    # main.calculate_data 需要至少 200 根 K 棒；全歷史視窗還需滿 lookback / stop_lookback 根
+    stop_lookback = stop_lookback or config.SNIPER_PARAMS['STOP_LOOKBACK']
+    return max(SMA_WINDOW, lookback, stop_lookback) - 1
+
+def run(high, low, close, volume, core=None, sniper=None, indicators=None, tail=None, profile=None):
+    # 一次算完全歷史；indicators 可傳入預先算好的 base_indicators 以便參數掃描重用
+    # tail: 成交量分佈只算最後 tail 根 (其餘的 POC / VAL / VAH 為 NaN，訊號不可用)
+    core = {**config.CORE_PARAMS, **(core or {})}
+    sniper = {**config.SNIPER_PARAMS, **(sniper or {})}
+    close = np.asarray(close, dtype=np.float64)
+    ind = indicators or base_indicators(high, low, close)
+    levels = value_area(high, low, close, volume, core['LOOKBACK'], core['BINS'], core['VA_PCT'], profile=profile, tail=tail)
+    stop_price, sniper_stop = trailing_stops(close, ind['atr'], core['LOOKBACK'], core['ATR_MULT'], sniper['STOP_LOOKBACK'])
+    signal_code = decide(close, ind, levels, stop_price, sniper_stop,
+                         core['PANIC_MULT'], sniper['RSI_THRESHOLD'], sniper['BIAS_THRESHOLD'])
+
+    # 暖機期 (資料不足 main.py 會回傳 None) 的訊號設為 0、價位設為 NaN
+    ready = np.arange(close.shape[-1]) >= warmup(core['LOOKBACK'], sniper['STOP_LOOKBACK'])
+    if tail is not None: ready &= np.arange(close.shape[-1]) >= close.shape[-1] - tail
+    signal_code = np.where(ready, signal_code, SIGNAL_WAIT).astype(np.int8)
+    result = {'signal_code': signal_code, 'stop_price': stop_price, 'sniper_stop': sniper_stop, **levels,
+              'sma200': ind['sma200'], 'atr': ind['atr'], 'rsi': ind['rsi'], 'bias': ind['bias']}
+    for key, arr in result.items():
+        if key != 'signal_code': result[key] = np.where(ready, arr, np.nan)
+    result['ready'] = np.broadcast_to(ready, close.shape)
+    return result
+
+def tail_size(core=None, sniper=None):
+    # 算最後一根所需的 K 棒數 (+1 讓 True Range 有前一日收盤)
+    core = {**config.CORE_PARAMS, **(core or {})}
+    sniper = {**config.SNIPER_PARAMS, **(sniper or {})}
+    return warmup(core['LOOKBACK'], sniper['STOP_LOOKBACK']) + 2
+
+def last_bar(high, low, close, volume, core=None, sniper=None, profile=None):
+    # 只算最後一根 (main.calculate_data 用)：取足夠暖機的尾段即可，結果與全歷史計算的最後一根相同
+    # 資料不足時回傳 None；另附上最後一個視窗的成交量分佈供繪圖 (profile 可傳入預先算好的 rolling_profile(tail=1))
+    core = {**config.CORE_PARAMS, **(core or {})}
+    sniper = {**config.SNIPER_PARAMS, **(sniper or {})}
+    n = tail_size(core, sniper)
+    if len(close) < n - 1: return None
+    high, low, close, volume = (np.asarray(a[-n:], dtype=np.float64) for a in (high, low, close, volume))
+    profile = profile or rolling_profile(high, low, close, volume, core['LOOKBACK'], core['BINS'], tail=1)
+    result = run(high, low, close, volume, core, sniper, tail=1, profile=profile)
+    out = {k: v[-1] for k, v in result.items()}
+    out['signal_code'] = int(out['signal_code'])
+    out['day_range'] = high[-1] - low[-1]
+    out['vol_bin'], out['bin_mids'] = profile['vol_bin'][0], profile['bin_mids'][0]
+    return out
+
+def compute_signals(df, core=None, sniper=None):
+    # DataFrame 介面：輸入 OHLCV (例如 market_store.load)，回傳每根 K 棒的訊號與價位
+    result = run(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), df['Volume'].to_numpy(), core, sniper)
+    columns = ['signal_code', 'poc', 'val', 'vah', 'stop_price', 'sniper_stop', 'sma200', 'atr', 'rsi', 'bias', 'ready']
+    import pandas as pd
+    return pd.DataFrame({k: result[k] for k in columns}, index=df.index)
+
+# ==========================================
+# 4. 倉位 & 績效 (回測 / 掃描共用)
+# ==========================================
+def positions_from_signals(signal_code, sniper_size=None):
+    # 訊號 → 持倉比例 (收盤決策，持有到下一根)：
+    #   1 / 2 → 1x；-1 / -2 → 清倉；3 → 空手時建 SIZE 狙擊倉 (已滿倉則不變)；0 / -3 → 維持原倉位
+    # 以「最後一次明確訊號」與「其後是否出現狙擊訊號」向量化，無需逐根迴圈，(paths, n) 同樣適用
+    sniper_size = config.SNIPER_PARAMS['SIZE'] if sniper_size is None else sniper_size
+    codes = np.asarray(signal_code)
+    idx = np.arange(codes.shape[-1])
+    definitive = np.isin(codes, (SIGNAL_LET_RUN, SIGNAL_DIP_BUY, SIGNAL_BEAR, SIGNAL_TAKE_PROFIT))
+    last_def = np.maximum.accumulate(np.where(definitive, idx, -1), axis=-1)
+    last_sniper = np.maximum.accumulate(np.where(codes == SIGNAL_SNIPER_BUY, idx, -1), axis=-1)
+    is_long = np.take_along_axis(codes > 0, np.maximum(last_def, 0), axis=-1) & (last_def >= 0)
+    return np.where(is_long, 1.0, np.where(last_sniper > last_def, sniper_size, 0.0))
+
+def strategy_returns(close, positions, cost=0.0):
+    # 日報酬 = 前一日持倉 × 當日漲跌 - 換倉成本 (cost 以成交金額比例計，例如 0.0005 = 5bps)
+    close = np.asarray(close, dtype=np.float64)
+    asset_ret = np.zeros(close.shape)
+    asset_ret[..., 1:] = close[..., 1:] / close[..., :-1] - 1
+    held = np.zeros(close.shape)
+    held[..., 1:] = positions[..., :-1]
+    turnover = np.abs(np.diff(positions, axis=-1, prepend=0.0))
+    return held * asset_ret - cost * turnover
+
+def performance(returns, periods_per_year=252):
+    # 沿時間軸計算 CAGR / 最大回撤 / Sharpe / Calmar / 總報酬
+    returns = np.asarray(returns, dtype=np.float64)
+    equity = np.cumprod(1 + returns, axis=-1)
+    years = returns.shape[-1] / periods_per_year
+    final = equity[..., -1]
+    cagr = np.where(final > 0, np.power(np.maximum(final, 1e-12), 1 / years) - 1, -1.0)
+    max_dd = (equity / np.maximum.accumulate(equity, axis=-1) - 1).min(axis=-1)
+    std = returns.std(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, returns.mean(axis=-1) / std * np.sqrt(periods_per_year), 0.0)
+        calmar = np.where(max_dd < 0, cagr / -max_dd, 0.0)
+    return {'cagr': cagr, 'max_dd': max_dd, 'sharpe': sharpe, 'calmar': calmar, 'total_return': final - 1}
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import market_store
+    ticker = sys.argv[1] if len(sys.argv) > 1 else config.TICKER
+    df = market_store.get(ticker)
+    t0 = time.perf_counter()
+    signals = compute_signals(df)
+    print(f"⚙️ {ticker}: {len(df)} bars in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    print(signals.tail(10).to_string())
@@ -0,0 +1,257 @@
+# ==========================================
+# 🗃️ SIGNAL HISTORY (訊號歷史資料庫)
+# ==========================================
+# 每次執行 main.py / daemon 算出的訊號 (價格 / POC / VAL / VAH / SMA200 / 止盈止損 / signal_code)
+# 追加寫入本地 SQLite (config.SIGNAL_HISTORY_DB)，不再隨 index.html 覆寫而消失：
+#   - 只追加不修改：同一天重跑 (盤中) 會多一筆，查詢時取該日最後一筆
+#   - 以 (ticker, params, date) 建索引：params 是策略參數的雜湊，改參數後的訊號不會和舊的混在一起；
+#     寫入時順便存前一個交易日的訊號 (prev_code)：訊號轉換走部分索引，命中率只讀覆蓋索引，不必全表掃描
+#   - 缺少的交易日 (第一次執行 / 中間沒跑) 由 signal_engine 從本地行情庫回補，只算缺少的尾段
+# 儀表板的「訊號歷史」(最近的訊號轉換 + 各訊號的命中率) 直接查這個資料庫。
+#
+# 用法: python signal_history.py [SPY QQQ IWM] [--backfill] [--limit 15]
+import os
+import json
+import sqlite3
+import hashlib
+import argparse
+import datetime
+import numpy as np
+import config
+import market_store
+import signal_engine as se
+import metrics
+
+HIT_HORIZONS = [5, 20]   # 命中率：訊號出現後 N 個交易日的報酬方向
+BULLISH = (se.SIGNAL_SNIPER_BUY, se.SIGNAL_LET_RUN, se.SIGNAL_DIP_BUY)
+BEARISH = (se.SIGNAL_BEAR, se.SIGNAL_TAKE_PROFIT)
+CODE_COLORS = {3: 'orange', 2: 'cyan', 1: 'green', 0: 'yellow', -1: 'red', -2: 'red', -3: 'orange'}
+FIELDS = ['price', 'poc', 'val', 'vah', 'sma200', 'stop_price', 'sniper_stop']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    params TEXT NOT NULL,
+    date TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    source TEXT NOT NULL,
+    price REAL, poc REAL, val REAL, vah REAL, sma200 REAL, stop_price REAL, sniper_stop REAL,
+    signal_code INTEGER NOT NULL,
+    prev_code INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_signals_key ON signals (ticker, params, date, id, signal_code, price);
+CREATE INDEX IF NOT EXISTS idx_signals_transitions ON signals (ticker, params, date)
+    WHERE prev_code IS NOT NULL AND signal_code != prev_code;
+"""
+COLUMNS = ['ticker', 'params', 'date', 'recorded_at', 'source', *FIELDS, 'signal_code', 'prev_code']
+INSERT = f"INSERT INTO signals ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+def params_key(core=None, sniper=None):
+    core = {**config.CORE_PARAMS, **(core or {})}
+    sniper = {**config.SNIPER_PARAMS, **(sniper or {})}
+    text = json.dumps({'core': core, 'sniper': sniper}, sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+
+def connect(path=None):
+    path = path or config.SIGNAL_HISTORY_DB
+    if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")  # daemon 寫入時，其他行程仍可讀
+    conn.executescript(SCHEMA)
+    return conn
+
+def _num(x):
+    x = float(x)
+    return None if np.isnan(x) else x
+
+# ==========================================
+# 1. 寫入 (追加 + 回補)
+# ==========================================
+def _before(conn, ticker, params, date):
+    # date 之前最後一個交易日的 (日期, 訊號)；prev_code 寫入時就存好，轉換查詢只需讀部分索引
+    row = conn.execute("SELECT date, signal_code FROM signals WHERE ticker = ? AND params = ? AND date < ? "
+                       "ORDER BY date DESC, id DESC LIMIT 1", (ticker, params, date)).fetchone()
+    return (None, None) if row is None else tuple(row)
+
+def backfill(conn, ticker, until=None, params=None):
+    # 回補資料庫最後一天之後、until (不含) 之前的交易日；until=None 補到行情庫最後一根
+    params = params or params_key()
+    arrays = market_store.load_arrays(ticker)
+    if arrays is None or len(arrays[0]) == 0: return 0
+    dates, ohlcv = arrays
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    last, prev = _before(conn, ticker, params, '9999-12-31')
+    lo = int(np.searchsorted(dates, np.datetime64(last), side='right')) if last else 0
+    hi = len(dates) if until is None else int(np.searchsorted(dates, np.datetime64(until), side='left'))
+    if hi <= lo: return 0
+
+    # 只算缺少的尾段 (往前多取暖機所需的 K 棒)
+    start = max(0, lo - se.tail_size())
+    bars = np.asarray(ohlcv[start:hi], dtype=np.float64)
+    result = se.run(bars[:, 1], bars[:, 2], bars[:, 3], bars[:, 4], tail=hi - lo)
+    now = datetime.datetime.now().isoformat(timespec='seconds')
+    rows = []
+    for j in np.flatnonzero(result['ready']):  # tail=hi-lo：ready 只涵蓋缺少的交易日
+        code = int(result['signal_code'][j])
+        rows.append((ticker, params, str(dates[start + j]), now, 'backfill', float(bars[j, 3]),
+                     *(_num(result[k][j]) for k in FIELDS[1:]), code, prev))
+        prev = code
+    with conn:
+        conn.executemany(INSERT, rows)
+    return len(rows)
+
+def record(results, path=None, source='run'):
+    # results: main.calculate_data 的結果；先回補缺少的交易日，再追加這次的訊號 (與當天上一筆相同就不重複寫)
+    if not results: return 0
+    params = params_key()
+    written = 0
+    with metrics.stage('history', tickers=len(results)) as m:
+        conn = connect(path)
+        try:
+            for res in results:
+                try:
+                    t, date = res['ticker'], res['date']
+                    written += backfill(conn, t, until=date, params=params)
+                    values = (*(_num(res[k]) for k in FIELDS), int(res['signal_code']))
+                    same_day = conn.execute(f"SELECT {', '.join(FIELDS)}, signal_code FROM signals "
+                                            "WHERE ticker = ? AND params = ? AND date = ? ORDER BY id DESC LIMIT 1",
+                                            (t, params, date)).fetchone()
+                    if same_day is not None and tuple(same_day) == values: continue
+                    with conn:
+                        conn.execute(INSERT, (t, params, date, datetime.datetime.now().isoformat(timespec='seconds'), source,
+                                              *values, _before(conn, t, params, date)[1]))
+                    written += 1
+                except Exception as e:
+                    print(f"Error recording history for {res['ticker']}: {e}")
+                    metrics.error('history', res['ticker'], e)
+        finally:
+            conn.close()
+        m['rows'] = written
+    return written
+
+# ==========================================
+# 2. 查詢 (每個交易日取最後一筆)
+# ==========================================
+KEY = "ticker = :ticker AND params = :params AND date >= :since"
+LAST_OF_DAY = "id = (SELECT max(id) FROM signals WHERE ticker = s.ticker AND params = s.params AND date = s.date)"
+
+def _args(ticker, since, params, **extra):
+    return {'ticker': ticker, 'params': params or params_key(), 'since': since or '', **extra}
+
+def history(conn, ticker, since=None, params=None):
+    # → [{'date', 'price', ..., 'signal_code'}] 依日期排序
+    sql = f"SELECT date, {', '.join(FIELDS)}, signal_code FROM signals s WHERE {KEY} AND {LAST_OF_DAY} ORDER BY date"
+    return [dict(r) for r in conn.execute(sql, _args(ticker, since, params))]
+
+def transitions(conn, ticker, limit=None, since=None, params=None):
+    # 訊號改變的日子 (新到舊)：prev_code = 前一個交易日的訊號 (走部分索引，只讀轉換那幾筆)
+    sql = (f"SELECT date, price, signal_code, prev_code FROM signals s INDEXED BY idx_signals_transitions "
+           f"WHERE {KEY} AND prev_code IS NOT NULL AND signal_code != prev_code AND {LAST_OF_DAY} "
+           "ORDER BY date DESC LIMIT :limit")
+    return [dict(r) for r in conn.execute(sql, _args(ticker, since, params, limit=limit or -1))]
+
+def hit_rates(conn, ticker, horizons=None, since=None, params=None):
+    # 每種訊號「出現當天」(由其他訊號轉入) 之後 N 個交易日的報酬：
+    # 偏多訊號 (1 / 2 / 3) 報酬 > 0、偏空訊號 (-1 / -2) 報酬 < 0 算命中；中性訊號 (0 / -3) 只列平均報酬
+    # 一次讀出 (日期, 訊號, 價格) (覆蓋索引，不回表)，前瞻報酬用 NumPy 算
+    horizons = horizons or HIT_HORIZONS
+    cur = conn.cursor()
+    cur.row_factory = None  # 數千筆只要 tuple，不建 sqlite3.Row
+    rows = cur.execute(f"SELECT date, signal_code, price FROM signals WHERE {KEY} ORDER BY date, id",
+                       _args(ticker, since, params)).fetchall()
+    if not rows: return []
+    dates = np.array([r[0] for r in rows])
+    last = np.r_[dates[1:] != dates[:-1], True]   # 同一天多筆時取最後一筆
+    codes = np.array([r[1] for r in rows])[last]
+    price = np.array([r[2] for r in rows], dtype=np.float64)[last]
+    entry = np.flatnonzero(codes[1:] != codes[:-1]) + 1   # 第一筆之前沒有訊號可比較，不算轉入
+
+    out = []
+    for code in sorted(set(codes[entry].tolist()), reverse=True):
+        idx = entry[codes[entry] == code]
+        stats = {'signal_code': code, 'entries': len(idx)}
+        for h in horizons:
+            idx_h = idx[idx + h < len(price)]
+            fwd = price[idx_h + h] / price[idx_h] - 1
+            stats[f'n_{h}'] = len(fwd)
+            stats[f'avg_{h}'] = float(fwd.mean()) if len(fwd) else None
+            hit = fwd > 0 if code in BULLISH else fwd < 0 if code in BEARISH else None
+            stats[f'hit_{h}'] = float(hit.mean()) if hit is not None and len(fwd) else None
+        out.append(stats)
+    return out
+
+# ==========================================
+# 3. 儀表板區塊
+# ==========================================
+def _pct(x, signed=True):
+    if x is None: return '<span class="gray">-</span>'
+    cls = "green" if x > 0 else "red" if x < 0 else "gray"
+    return f'<span class="{cls}">{x * 100:+.1f}%</span>' if signed else f'{x * 100:.0f}%'
+
+def ticker_html(conn, ticker, limit=8):
+    rows = transitions(conn, ticker, limit=limit)
+    stats = hit_rates(conn, ticker)
+    if not rows and not stats: return ""
+    trans_html = "".join(
+        f'<tr><td>{r["date"]}</td><td>{r["price"]:.2f}</td>'
+        f'<td class="{CODE_COLORS[r["prev_code"]]}">{se.SIGNAL_LABELS[r["prev_code"]]}</td>'
+        f'<td class="{CODE_COLORS[r["signal_code"]]} bold">{se.SIGNAL_LABELS[r["signal_code"]]}</td></tr>' for r in rows)
+    head = "".join(f'<th>{h}日命中</th><th>{h}日均報酬</th>' for h in HIT_HORIZONS)
+    stats_html = ""
+    for s in stats:
+        cells = ""
+        for h in HIT_HORIZONS:
+            hit = "-" if s[f'hit_{h}'] is None else _pct(s[f'hit_{h}'], signed=False)
+            cells += f'<td>{hit}<span class="gray"> ({s[f"n_{h}"]})</span></td><td>{_pct(s[f"avg_{h}"])}</td>'
+        stats_html += (f'<tr><td class="{CODE_COLORS[s["signal_code"]]}">{se.SIGNAL_LABELS[s["signal_code"]]}</td>'
+                       f'<td>{s["entries"]}</td>{cells}</tr>')
+    return f"""
+        <div class="card">
+            <div class="header"><span>📜 訊號歷史</span><span class="tag gray" style="border-color: currentColor;">{ticker}</span></div>
+            <table class="history"><thead><tr><th>日期</th><th>價格</th><th>原訊號</th><th>新訊號</th></tr></thead>
+            <tbody>{trans_html}</tbody></table>
+            <table class="history"><thead><tr><th>訊號</th><th>次數</th>{head}</tr></thead>
+            <tbody>{stats_html}</tbody></table>
+        </div>
+        """
+
+def dashboard_html(tickers, path=None, limit=8):
+    # index.html 的「訊號歷史」區塊；資料庫還沒建立 / 查詢失敗時回傳空字串
+    path = path or config.SIGNAL_HISTORY_DB
+    if not os.path.exists(path): return ""
+    try:
+        conn = connect(path)
+        try:
+            return "".join(ticker_html(conn, t, limit) for t in tickers)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ 無法讀取訊號歷史: {e}")
+        return ""
+
+if __name__ == "__main__":
+    import main
+    parser = argparse.ArgumentParser(description="訊號歷史：回補 / 最近的訊號轉換 / 命中率")
+    parser.add_argument('tickers', nargs='*', default=main.target_tickers)
+    parser.add_argument('--backfill', action='store_true', help="先從本地行情庫回補到最後一根 K 棒")
+    parser.add_argument('--limit', type=int, default=15, help="列出最近幾次訊號轉換")
+    parser.add_argument('--db', default=None, help="資料庫路徑，預設 config.SIGNAL_HISTORY_DB")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    for t in args.tickers:
+        if args.backfill: print(f"📥 {t}: 回補 {backfill(conn, t)} 筆")
+        print(f"\n📜 {t} 最近的訊號轉換:")
+        for r in transitions(conn, t, limit=args.limit):
+            print(f"   {r['date']}  {r['price']:>9.2f}  {se.SIGNAL_LABELS[r['prev_code']]} → {se.SIGNAL_LABELS[r['signal_code']]}")
+        print(f"🎯 {t} 各訊號命中率 (出現後 {' / '.join(map(str, HIT_HORIZONS))} 個交易日):")
+        for s in hit_rates(conn, t):
+            parts = []
+            for h in HIT_HORIZONS:
+                hit, avg = s[f'hit_{h}'], s[f'avg_{h}']
+                parts.append(f"{h}日 命中 {'-' if hit is None else f'{hit * 100:.0f}%'} / 均報酬 "
+                             f"{'-' if avg is None else f'{avg * 100:+.2f}%'}")
+            print(f"   {se.SIGNAL_LABELS[s['signal_code']]:<20} {s['entries']:>4} 次 | " + " | ".join(parts))
+    conn.close()
@@ -0,0 +1,290 @@
+# ==========================================
+# 📡 STREAMING MODE (盤中串流訊號)
+# ==========================================
+# 每日 workflow 只在收盤後跑一次；這裡用 asyncio 消費盤中分鐘線，把當天的分鐘線累積成「正在形成的日 K」，
+# 每來一根分鐘線就更新一次訊號，signal_code 一改變就發佈事件 (盤中就能抓到狙擊區 / 跌破止盈線)。
+#   - 歷史日 K 的滾動加總 (SMA200 / ATR / RSI)、區間最高收盤、成交量分佈在每天開始時算好一次
+#   - 每根分鐘線只把「今天這根日 K」接上去：指標 O(1)，成交量分佈 O(BINS)
+#     (volume_profile.RollingVolumeProfile.preview；今天創視窗新高 / 新低撐大區間時才重新分箱，O(LOOKBACK))
+#   - 換日時收盤的日 K 以 RollingVolumeProfile.update 推入，成交量分佈不必從頭重建
+#   - 相加順序與 signal_engine 相同：盤中訊號 = 把當下的日 K 接到歷史後呼叫 se.last_bar 的結果
+# 數據源：
+#   - ReplayFeed  : 重播本地錄好的分鐘線 CSV (每個 Ticker 一個檔，格式同 fixture)，離線測試用
+#   - PollingFeed : 定時向數據源 (providers.py) 要今天的分鐘線
+#
+# 用法: python stream.py --record bars/          (先錄下最近的分鐘線)
+#       python stream.py --replay bars/ [--speed 60]
+#       python stream.py --poll 60
+import time
+import asyncio
+import argparse
+from collections import namedtuple
+import numpy as np
+import config
+import market_store
+import providers
+import signal_engine as se
+from volume_profile import RollingVolumeProfile
+
+# time: 交易所當地時間 (naive datetime64)
+Bar = namedtuple('Bar', 'ticker time open high low close volume')
+
+# ==========================================
+# 1. 盤中日 K (分鐘線 → 正在形成的日 K)
+# ==========================================
+class FormingBar:
+    # 同一分鐘重複送來 (數據源更新未收盤的分鐘線) 時取代該分鐘，不會重複累加成交量
+    def __init__(self, day):
+        self.day = day
+        self.minute = None
+        self._open = None
+        self._high = -np.inf
+        self._low = np.inf
+        self._volume = 0.0
+
+    def update(self, bar):
+        if self.minute is not None and bar.time > self.minute.time:
+            # 上一分鐘已收盤，併入當日累計
+            m = self.minute
+            if self._open is None: self._open = m.open
+            self._high = max(self._high, m.high)
+            self._low = min(self._low, m.low)
+            self._volume += m.volume
+        if self.minute is None or bar.time >= self.minute.time:
+            self.minute = bar
+
+    def ohlcv(self):
+        m = self.minute
+        return (m.open if self._open is None else self._open, max(self._high, m.high),
+                min(self._low, m.low), m.close, self._volume + m.volume)
+
+# ==========================================
+# 2. 單一 Ticker 的增量狀態
+# ==========================================
+def _seq_sum(x):
+    # 由左到右依序相加 (與 se.rolling_mean 的視窗加總順序相同，np.sum 的 pairwise 相加會有捨入差異)
+    return np.add.accumulate(np.asarray(x, dtype=np.float64))[-1] if len(x) else 0.0
+
+class TickerState:
+    def __init__(self, ticker, dates, ohlcv, core=None, sniper=None):
+        self.ticker = ticker
+        self.core = {**config.CORE_PARAMS, **(core or {})}
+        self.sniper = {**config.SNIPER_PARAMS, **(sniper or {})}
+        self.size = se.warmup(self.core['LOOKBACK'], self.sniper['STOP_LOOKBACK']) + 2
+        self.dates = np.asarray(dates[-self.size:], dtype='datetime64[D]')
+        self.ohlcv = np.array(ohlcv[-self.size:], dtype=np.float64)
+        self.forming = None
+        self.signal_code = None
+        # 成交量分佈：最近 LOOKBACK 根已收盤日 K (preview 時去掉最舊一根、加上今天)
+        self.profile = RollingVolumeProfile(self.core['LOOKBACK'], self.core['BINS'], self.core['VA_PCT'])
+        for _, h, l, c, v in self.ohlcv[-self.core['LOOKBACK']:]:
+            self.profile.update(h, l, c, v)
+        self._prepare()
+
+    @classmethod
+    def from_store(cls, ticker, before, data_dir=None, core=None, sniper=None):
+        # 只用 before (今天) 之前已收盤的日 K 當歷史
+        arrays = market_store.load_arrays(ticker, data_dir)
+        if arrays is None: return None
+        dates, ohlcv = arrays
+        n = int(np.searchsorted(dates, np.datetime64(before, 'D')))
+        return cls(ticker, dates[:n], ohlcv[:n], core, sniper)
+
+    def _prepare(self):
+        # 每天開始時算一次：已收盤 K 棒在各滾動視窗中的部分
+        _, high, low, close, volume = self.ohlcv.T
+        self.ready = len(close) >= self.size - 1
+        if not self.ready: return
+        lookback = self.core['LOOKBACK']
+        self.prev_close = close[-1]
+        self.sma_base = _seq_sum(close[-(se.SMA_WINDOW - 1):])
+        tr = se.true_range(high, low, close)
+        self.atr_base = _seq_sum(tr[-(se.ATR_WINDOW - 1):])
+        delta = np.diff(close[-se.RSI_WINDOW:])
+        self.gain_base = _seq_sum(np.where(delta > 0, delta, 0))
+        self.loss_base = _seq_sum(-np.where(delta < 0, delta, 0))
+        self.high_close = close[-(lookback - 1):].max()
+        self.short_high_close = close[-(self.sniper['STOP_LOOKBACK'] - 1):].max()
+
+    def roll(self):
+        # 換日：今天的日 K 收盤，併入歷史
+        o, h, l, c, v = self.forming.ohlcv()
+        self.dates = np.append(self.dates, self.forming.day)[-self.size:]
+        self.ohlcv = np.vstack([self.ohlcv, [o, h, l, c, v]])[-self.size:]
+        self.profile.update(h, l, c, v)
+        self.forming = None
+        self._prepare()
+
+    def on_bar(self, bar):
+        # 推入一根分鐘線，回傳當下的訊號 (歷史不足時回傳 None)
+        day = np.datetime64(bar.time, 'D')
+        if self.forming is not None and day > self.forming.day: self.roll()
+        if self.forming is None: self.forming = FormingBar(day)
+        self.forming.update(bar)
+        return self.evaluate() if self.ready else None
+
+    def evaluate(self):
+        core, sniper = self.core, self.sniper
+        _, h, l, c, v = self.forming.ohlcv()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sma200 = (self.sma_base + c) / se.SMA_WINDOW
+            pc = self.prev_close
+            tr = np.fmax(h - l, np.fmax(abs(h - pc), abs(l - pc)))
+            atr = (self.atr_base + tr) / se.ATR_WINDOW
+            delta = c - pc
+            gain = (self.gain_base + (delta if delta > 0 else 0.0)) / se.RSI_WINDOW
+            loss = (self.loss_base + (-delta if delta < 0 else 0.0)) / se.RSI_WINDOW
+            rsi = 100 - (100 / (1 + np.float64(gain) / np.float64(loss)))
+            bias = (c - sma200) / sma200
+
+        levels = self.profile.preview(h, l, c, v)
+
+        stop_price = max(self.high_close, c) - core['ATR_MULT'] * atr
+        sniper_stop = max(self.short_high_close, c) - core['ATR_MULT'] * atr
+        ind = {'sma200': sma200, 'atr': atr, 'rsi': rsi, 'bias': bias, 'day_range': h - l}
+        code = se.decide_one(c, ind, levels, stop_price, sniper_stop,
+                              core['PANIC_MULT'], sniper['RSI_THRESHOLD'], sniper['BIAS_THRESHOLD'])
+        return {'ticker': self.ticker, 'time': str(self.forming.minute.time), 'price': c, 'signal_code': code,
+                **levels, 'stop_price': stop_price, 'sniper_stop': sniper_stop,
+                'sma200': sma200, 'atr': atr, 'rsi': rsi, 'bias': bias}
+
+# ==========================================
+# 3. 數據源 (async iterator，依時間順序產生 Bar)
+# ==========================================
+def _frame_bars(ticker, df):
+    times = df.index.values.astype('datetime64[s]')
+    for t, (o, h, l, c, v) in zip(times, df[providers.FIELDS].to_numpy(dtype=np.float64)):
+        yield Bar(ticker, t, o, h, l, c, v)
+
+class ReplayFeed:
+    # speed: 0 = 盡快重播；60 = 1 秒重播 1 分鐘
+    def __init__(self, bar_dir, tickers, speed=0):
+        self.frames = providers.CsvProvider(bar_dir).download(tickers)
+        self.speed = speed
+
+    async def __aiter__(self):
+        bars = sorted((b for t, df in self.frames.items() for b in _frame_bars(t, df)), key=lambda b: b.time)
+        last = None
+        for bar in bars:
+            if self.speed and last is not None and bar.time > last:
+                await asyncio.sleep((bar.time - last) / np.timedelta64(1, 's') / self.speed)
+            else:
+                await asyncio.sleep(0)
+            last = bar.time
+            yield bar
+
+class PollingFeed:
+    # 每 interval 秒抓一次今天的分鐘線；最後一根 (未收盤) 每次都重送，由 FormingBar 取代
+    def __init__(self, tickers, interval=60, provider=None):
+        self.tickers = list(tickers)
+        self.interval = interval
+        self.provider = provider or providers.get_provider()
+
+    async def __aiter__(self):
+        seen = {}
+        while True:
+            start = np.datetime64('today', 'D') - np.timedelta64(1, 'D')
+            try:
+                frames = await asyncio.to_thread(self.provider.download, self.tickers, str(start), "1m")
+            except Exception as e:
+                print(f"❌ 抓取分鐘線時發生錯誤: {e}")
+                frames = {}
+            bars = sorted((b for t, df in frames.items() for b in _frame_bars(t, df)
+                           if b.time >= seen.get(t, b.time)), key=lambda b: b.time)
+            for bar in bars:
+                seen[bar.ticker] = bar.time
+                yield bar
+            await asyncio.sleep(self.interval)
+
+# ==========================================
+# 4. 串流主迴圈 & 發佈
+# ==========================================
+class SignalStream:
+    def __init__(self, tickers, feed, data_dir=None, core=None, sniper=None):
+        self.tickers = list(tickers)
+        self.feed = feed
+        self.data_dir = data_dir
+        self.core, self.sniper = core, sniper
+        self.states = {}
+        self.subscribers = []
+        self.bar_subscribers = []
+        self.bars = 0
+        self.elapsed = 0.0
+
+    def subscribe(self, maxsize=0, bars=False):
+        # 每個訂閱者一個 asyncio.Queue；收到 signal_code 改變的事件 (bars=True：收到每一根分鐘線，例如 alerts.py)
+        queue = asyncio.Queue(maxsize)
+        (self.bar_subscribers if bars else self.subscribers).append(queue)
+        return queue
+
+    def publish(self, event):
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def _state(self, bar):
+        if bar.ticker not in self.states:
+            self.states[bar.ticker] = TickerState.from_store(bar.ticker, np.datetime64(bar.time, 'D'),
+                                                             self.data_dir, self.core, self.sniper)
+        return self.states[bar.ticker]
+
+    def process(self, bar):
+        state = self._state(bar)
+        if state is None: return None
+        t0 = time.perf_counter()
+        result = state.on_bar(bar)
+        self.elapsed += time.perf_counter() - t0
+        self.bars += 1
+        if result is None or result['signal_code'] == state.signal_code: return None
+        event = {**result, 'prev_code': state.signal_code, 'signal': se.SIGNAL_LABELS[result['signal_code']]}
+        state.signal_code = result['signal_code']
+        self.publish(event)
+        return event
+
+    async def run(self):
+        async for bar in self.feed:
+            for queue in self.bar_subscribers:
+                queue.put_nowait(bar)
+            if bar.ticker in self.tickers: self.process(bar)
+        self.publish(None)  # 數據源結束
+        for queue in self.bar_subscribers:
+            queue.put_nowait(None)
+
+async def print_events(queue):
+    while (event := await queue.get()) is not None:
+        prev = '-' if event['prev_code'] is None else se.SIGNAL_LABELS[event['prev_code']]
+        print(f"📡 {event['time']} {event['ticker']:<6} {prev} → {event['signal']} | "
+              f"Price {event['price']:.2f} | POC {event['poc']:.2f} / VAL {event['val']:.2f} | "
+              f"ATR Stop {event['stop_price']:.2f} | RSI {event['rsi']:.1f} / Bias {event['bias'] * 100:.1f}%")
+
+def record(bar_dir, tickers, provider=None):
+    # 錄下最近的分鐘線 (yfinance 最多約 7 天) 供 ReplayFeed 重播
+    provider = provider or providers.get_provider()
+    fixture = providers.CsvProvider(bar_dir)
+    for t, df in provider.download(tickers, interval="1m").items():
+        fixture.save(t, df)
+        print(f"✅ {t}: {len(df)} 根分鐘線 → {fixture.path(t)}")
+
+async def main(args):
+    if args.replay: feed = ReplayFeed(args.replay, args.tickers, args.speed)
+    else: feed = PollingFeed(args.tickers, args.poll)
+    stream = SignalStream(args.tickers, feed)
+    printer = asyncio.create_task(print_events(stream.subscribe()))
+    await stream.run()
+    await printer
+    if stream.bars:
+        print(f"⏱️ {stream.bars} 根分鐘線，平均每根 {stream.elapsed / stream.bars * 1e6:.0f} µs")
+
+if __name__ == "__main__":
+    import main as dashboard
+    parser = argparse.ArgumentParser(description="盤中串流訊號 (分鐘線 → 日 K 增量更新)")
+    parser.add_argument('--tickers', nargs='+', default=dashboard.target_tickers)
+    parser.add_argument('--replay', default=None, help="重播分鐘線 CSV 目錄")
+    parser.add_argument('--speed', type=float, default=0, help="重播速度倍數 (0 = 盡快)")
+    parser.add_argument('--poll', type=int, default=60, help="輪詢間隔秒數 (未指定 --replay 時)")
+    parser.add_argument('--record', default=None, help="錄下最近的分鐘線到此目錄後結束")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.tickers)
+    else:
+        asyncio.run(main(args))
@@ -1,8 +1,12 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import datetime
 from zoneinfo import ZoneInfo
+import market_store  # 本地行情庫 (增量更新)
+import breadth       # 成分股市場廣度
+import correlation   # 滾動相關性 & 市場狀態
+import fsutil        # 原子寫入
+import metrics       # 分段計時 & 資源紀錄
 
 # ==========================================
 # 1. 結構觀察清單 (完整版)
@@ -38,122 +42,129 @@ tickers_config = {
 }
 
 all_tickers = []
-for category in tickers_config.values():
-    all_tickers.extend(category.keys())
+ticker_category = {}
+ticker_names = {}
+for category, tickers in tickers_config.items():
+    all_tickers.extend(tickers.keys())
+    for t, name in tickers.items():
+        ticker_category.setdefault(t, category)
+        ticker_names.setdefault(t, name)
 
 # ==========================================
-# 2. 數據抓取 (逐個處理，防崩潰)
+# 2. 數據抓取 & 向量化計算 (整個面板一次算完)
 # ==========================================
-def get_data():
-    print("⏳ 下載市場數據中 (強健模式)...")
-    
-    # 初始化字典
-    prices = {}
-    d_chg = {}
-    w_chg = {}
-    m_chg = {}
-    
-    try:
-        # 下載數據
-        df_all = yf.download(all_tickers, period="2y", interval="1d", progress=False)
-        
-        # 處理 MultiIndex (如果是多個 Ticker)
-        if isinstance(df_all.columns, pd.MultiIndex):
-            df_close = df_all['Close']
-        else:
-            # 如果只有一個 Ticker 或結構不同
-            df_close = df_all
-            
-        # 針對每一個 Ticker 獨立處理
-        for t in all_tickers:
-            try:
-                # 1. 取出該 Ticker 的數據並移除空值 (這步很關鍵，解決週末數據問題)
-                if t in df_close.columns:
-                    series = df_close[t].dropna()
-                else:
-                    print(f"⚠️ 警告: 找不到 {t} 的數據")
-                    continue
-                
-                if len(series) < 2: 
-                    continue
+# 各期間的回看根數 (以該 Ticker 自己的交易日計)
+HORIZONS = {'d_chg': 1, 'w_chg': 5, 'm_chg': 22, 'm3_chg': 63}
+HIGH_WINDOW = 252     # 52 週高點
+BENCHMARK = 'SPY'     # 相對強弱基準
+RS_COLUMN = 'm3_chg'  # 相對強弱 / 百分位排名所用的期間
+COLUMNS = ['category', 'name', 'price', *HORIZONS, 'ytd_chg', 'from_high', 'rs', 'pct_rank']
+
+def _right_align(values):
+    # 每列的有效值 (非 NaN) 依原順序推到最右邊：不同 Ticker 的休市日不同 (例如 BTC 週末也交易)，
+    # 對齊後「倒數第 k 根」就是該 Ticker 自己的第 k 個交易日前，等同逐個 dropna 再 iloc
+    order = np.argsort(~np.isnan(values), axis=1, kind='stable')
+    return np.take_along_axis(values, order, axis=1), order
 
-                # 2. 抓取現價
-                prices[t] = series.iloc[-1]
-                
-                # 3. 計算漲跌 (如果長度不夠，使用 0)
-                # 日漲跌
-                d_chg[t] = ((series.iloc[-1] - series.iloc[-2]) / series.iloc[-2]) * 100
-                
-                # 週漲跌 (5天)
-                if len(series) >= 6:
-                    w_chg[t] = ((series.iloc[-1] - series.iloc[-6]) / series.iloc[-6]) * 100
-                else:
-                    w_chg[t] = 0
-                    
-                # 月漲跌 (22天)
-                if len(series) >= 23:
-                    m_chg[t] = ((series.iloc[-1] - series.iloc[-23]) / series.iloc[-23]) * 100
-                else:
-                    m_chg[t] = 0
-                    
-            except Exception as e:
-                print(f"❌ 計算 {t} 時發生錯誤: {e}")
-                prices[t] = 0
-                d_chg[t] = 0
-                w_chg[t] = 0
-                m_chg[t] = 0
+def compute_table(dates, close, tickers):
+    # close: (len(tickers), len(dates)) 收盤價面板 → 每個 Ticker 一列的結構表 (百分比)
+    aligned, order = _right_align(close)
+    counts = (~np.isnan(close)).sum(axis=1)
+    n = aligned.shape[1]
+    last = aligned[:, -1] if n else np.full(len(tickers), np.nan)
 
+    table = pd.DataFrame(index=pd.Index(tickers, name='ticker'))
+    table['price'] = np.where(counts >= 2, last, np.nan)
+    for col, k in HORIZONS.items():
+        # 歷史不夠長時與原版相同給 0；只有 1 根 (或沒有) 的 Ticker 整列為 NaN
+        base = aligned[:, -1 - k] if n > k else np.full(len(tickers), np.nan)
+        table[col] = np.where(counts > k, (last / base - 1) * 100, 0.0)
+
+    # YTD：以去年最後一個交易日收盤為基準
+    if n:
+        year_start = dates[-1].astype('datetime64[Y]').astype('datetime64[D]')
+        before = ((dates < year_start)[None, :] & ~np.isnan(close)).sum(axis=1)
+        base_idx = np.clip(n - counts + before - 1, 0, n - 1)
+        base = aligned[np.arange(len(tickers)), base_idx]
+        table['ytd_chg'] = np.where(before > 0, (last / base - 1) * 100, np.nan)
+        high = np.fmax.reduce(aligned[:, -HIGH_WINDOW:], axis=1)
+        table['from_high'] = (last / high - 1) * 100
+    else:
+        table['ytd_chg'] = table['from_high'] = np.nan
+    table.loc[table['price'].isna(), [*HORIZONS, 'ytd_chg', 'from_high']] = np.nan
+
+    # 相對強弱：同期間 Ticker 報酬 vs 基準報酬 (> 0 代表跑贏大盤)
+    if BENCHMARK in table.index:
+        bench = table.at[BENCHMARK, RS_COLUMN] / 100
+        table['rs'] = ((1 + table[RS_COLUMN] / 100) / (1 + bench) - 1) * 100
+    else:
+        table['rs'] = np.nan
+    return table
+
+def get_data(refresh=True):
+    print("⏳ 下載市場數據中 (強健模式)...")
+    table = pd.DataFrame(index=pd.Index(all_tickers, name='ticker'), columns=COLUMNS[2:], dtype=float)
+
+    try:
+        # 增量更新本地行情庫，再讀取最近 2 年收盤價 (各 Ticker 日期聯集，缺值為 NaN)
+        if refresh: market_store.refresh(all_tickers)
+        start = pd.Timestamp.today().normalize() - pd.DateOffset(years=2)
+        with metrics.stage('structure_table', tickers=len(all_tickers)) as m:
+            dates, panel = market_store.load_panel(all_tickers, start=start.date())
+            table = compute_table(dates, panel['Close'], all_tickers)
+            m['rows'] = len(dates)
+        for t in table.index[table['price'].isna()]:
+            print(f"⚠️ 警告: 找不到 {t} 的數據")
+            metrics.record('structure_table', t, rows=0, error="找不到數據")
     except Exception as e:
         print(f"❌ 下載數據時發生嚴重錯誤: {e}")
+        metrics.error('structure_table', None, e)
 
-    return prices, d_chg, w_chg, m_chg
+    table.insert(0, 'category', [ticker_category[t] for t in table.index])
+    table.insert(1, 'name', [ticker_names[t] for t in table.index])
+    # 百分位排名：同一類別內依 RS_COLUMN 排序 (1.0 = 類別內最強)
+    table['pct_rank'] = table.groupby('category')[RS_COLUMN].rank(pct=True)
+    return table[COLUMNS]
 
 # ==========================================
 # 3. HTML 生成 (表格樣式)
 # ==========================================
-def generate_section_html(title, ticker_dict, prices, d_chg, w_chg, m_chg):
+def _pct_cell(value, is_risk, extra=""):
+    # 漲跌幅儲存格：風險指標 (VIX / 美債 / 美元) 上漲為紅色
+    if pd.isna(value): return f'<td class="gray {extra}">-</td>'
+    up = "red" if is_risk else "green"
+    down = "green" if is_risk else "red"
+    return f'<td class="{up if value > 0 else down} {extra}">{value:+.2f}%</td>'
+
+def generate_section_html(title, ticker_dict, table):
     rows_html = ""
+    section = table.loc[list(ticker_dict)]
     
     # 排序邏輯
-    sorted_tickers = list(ticker_dict.keys())
     if title == '2. 板塊輪動 (Sectors)':
         # 板塊依照日漲幅排序
-        sorted_tickers.sort(key=lambda x: d_chg.get(x, 0), reverse=True)
+        section = section.sort_values('d_chg', ascending=False, na_position='last')
 
-    for t in sorted_tickers:
+    for t, row in section.iterrows():
         name = ticker_dict[t]
+        is_risk = t in ['^VIX', '^TNX', 'DX-Y.NYB']
         
-        # 安全取值，如果沒有數據顯示 "-"
-        price = prices.get(t, 0)
-        d = d_chg.get(t, 0)
-        w = w_chg.get(t, 0)
-        m = m_chg.get(t, 0)
-        
-        if price == 0 and d == 0:
+        if pd.isna(row['price']):
             # 數據缺失時的顯示
-            price_str = "-"
-            d_str = "-"
-            w_str = "-"
-            m_str = "-"
-            color_d = "gray"
-            color_w = "gray"
-            color_m = "gray"
+            cells = '<td class="col-price">-</td><td class="gray">-</td>' + '<td class="gray mobile-hide">-</td>' * 7
         else:
-            price_str = f"{price:.2f}"
-            d_str = f"{d:+.2f}%"
-            w_str = f"{w:+.2f}%"
-            m_str = f"{m:+.2f}%"
-        
-            # 顏色邏輯
-            is_risk = t in ['^VIX', '^TNX', 'DX-Y.NYB']
-            if is_risk:
-                color_d = "red" if d > 0 else "green"
-                color_w = "red" if w > 0 else "green"
-                color_m = "red" if m > 0 else "green"
-            else:
-                color_d = "green" if d > 0 else "red"
-                color_w = "green" if w > 0 else "red"
-                color_m = "green" if m > 0 else "red"
+            high_cls = "gray" if pd.isna(row['from_high']) else ("green" if row['from_high'] > -5 else "red")
+            high_str = "-" if pd.isna(row['from_high']) else f"{row['from_high']:+.1f}%"
+            rank_str = "-" if pd.isna(row['pct_rank']) else f"P{row['pct_rank'] * 100:.0f}"
+            cells = (f'<td class="col-price">{row["price"]:.2f}</td>'
+                     + _pct_cell(row['d_chg'], is_risk)
+                     + _pct_cell(row['w_chg'], is_risk, "mobile-hide")
+                     + _pct_cell(row['m_chg'], is_risk, "mobile-hide")
+                     + _pct_cell(row['m3_chg'], is_risk, "mobile-hide")
+                     + _pct_cell(row['ytd_chg'], is_risk, "mobile-hide")
+                     + f'<td class="{high_cls} mobile-hide">{high_str}</td>'
+                     + _pct_cell(row['rs'], False, "mobile-hide")
+                     + f'<td class="gray mobile-hide">{rank_str}</td>')
 
         rows_html += f"""
         <tr>
@@ -161,10 +172,7 @@ def generate_section_html(title, ticker_dict, prices, d_chg, w_chg, m_chg):
                 <div style="font-weight:bold;">{name}</div>
                 <div class="ticker-code">{t}</div>
             </td>
-            <td class="col-price">{price_str}</td>
-            <td class="{color_d}">{d_str}</td>
-            <td class="{color_w} mobile-hide">{w_str}</td>
-            <td class="{color_m} mobile-hide">{m_str}</td>
+            {cells}
         </tr>
         """
         
@@ -179,6 +187,11 @@ def generate_section_html(title, ticker_dict, prices, d_chg, w_chg, m_chg):
                     <th>1日 %</th>
                     <th class="mobile-hide">1週 %</th>
                     <th class="mobile-hide">1月 %</th>
+                    <th class="mobile-hide">3月 %</th>
+                    <th class="mobile-hide">YTD %</th>
+                    <th class="mobile-hide">距52週高</th>
+                    <th class="mobile-hide">RS vs {BENCHMARK} (3月)</th>
+                    <th class="mobile-hide">類別排名</th>
                 </tr>
             </thead>
             <tbody>
@@ -188,15 +201,54 @@ def generate_section_html(title, ticker_dict, prices, d_chg, w_chg, m_chg):
     </div>
     """
 
-def generate_html(prices, d_chg, w_chg, m_chg):
+def _corr_cell(value):
+    # 相關係數熱圖：正相關藍、負相關紅，越接近 ±1 越深
+    if np.isnan(value): return '<td class="gray">-</td>'
+    rgb = "88,166,255" if value > 0 else "255,123,114"
+    return f'<td style="background-color: rgba({rgb},{abs(value) * 0.6:.2f});">{value:.2f}</td>'
+
+def generate_correlation_html(corr_stats):
+    if not corr_stats: return ""
+    cs, rg = corr_stats, corr_stats['regime']
+    windows = "".join(
+        f"<tr><td>{w} 日</td><td>{cs[f'avg_corr_{w}']:.2f}</td><td>{cs[f'stock_bond_{w}']:+.2f}</td>"
+        f"<td>{cs[f'stock_ret_{w}'] * 100:+.1f}%</td></tr>" for w in correlation.WINDOWS)
+    moves = " ｜ ".join(f"{a}/{b} {l:+.2f} → {s:+.2f}" for a, b, s, l in cs['shifts'])
+    head = "".join(f'<th title="{ticker_names.get(t, t)}">{t}</th>' for t in cs['tickers'])
+    rows = "".join(f'<tr><td class="col-name" title="{ticker_names.get(t, t)}">{t}</td>{"".join(_corr_cell(v) for v in row)}</tr>'
+                   for t, row in zip(cs['tickers'], cs['matrix']))
+    return f"""
+    <div class="section-title">4. 相關性結構 (Correlation)</div>
+    <div style="padding:15px; background:#161b22; border-left: 4px solid {rg['color']}; color:#c9d1d9; margin-bottom:10px;">
+        <strong>市場狀態：</strong> {rg['title']}
+        <div style="margin-top:8px;">{rg['trend']} ｜ {rg['bond']}</div>
+        <div class="gray" style="margin-top:8px; font-size:0.9em;">相關性變化最大 ({correlation.WINDOWS[0]}日 vs {correlation.WINDOWS[-1]}日)：{moves}</div>
+    </div>
+    <div class="table-container">
+        <table>
+            <thead><tr><th style="text-align:left;">視窗</th><th>板塊平均相關</th><th>股債相關 ({correlation.STOCK}/{correlation.BOND})</th><th>{correlation.STOCK} 報酬</th></tr></thead>
+            <tbody>{windows}</tbody>
+        </table>
+    </div>
+    <div class="table-container corr" style="margin-top:10px;">
+        <table>
+            <thead><tr><th style="text-align:left;">{cs['window']} 日相關</th>{head}</tr></thead>
+            <tbody>{rows}</tbody>
+        </table>
+    </div>
+    """
+
+def build_html(table, breadth_stats=None, corr_stats=None):
     
-    macro_html = generate_section_html('1. 宏觀風險 (Macro)', tickers_config['Macro'], prices, d_chg, w_chg, m_chg)
-    sector_html = generate_section_html('2. 板塊輪動 (Sectors)', tickers_config['Sectors'], prices, d_chg, w_chg, m_chg)
-    breadth_html = generate_section_html('3. 市場廣度 (Breadth)', tickers_config['Breadth'], prices, d_chg, w_chg, m_chg)
+    macro_html = generate_section_html('1. 宏觀風險 (Macro)', tickers_config['Macro'], table)
+    sector_html = generate_section_html('2. 板塊輪動 (Sectors)', tickers_config['Sectors'], table)
+    breadth_html = generate_section_html('3. 市場廣度 (Breadth)', tickers_config['Breadth'], table)
 
     # 廣度診斷
-    val_spy = d_chg.get('SPY', 0)
-    val_rsp = d_chg.get('RSP', 0)
+    val_spy = table['d_chg'].get('SPY', 0)
+    val_rsp = table['d_chg'].get('RSP', 0)
+    if pd.isna(val_spy): val_spy = 0
+    if pd.isna(val_rsp): val_rsp = 0
     diff = val_rsp - val_spy
     
     if diff > 0.1:
@@ -209,9 +261,27 @@ def generate_html(prices, d_chg, w_chg, m_chg):
         b_msg = "🟡 中性：市場表現同步"
         b_border = "#d29922"
 
+    # 成分股廣度 (breadth.py)：McClellan > 0 代表上漲家數動能增強
+    constituent_html = ""
+    if breadth_stats:
+        bs = breadth_stats
+        mc_cls = "green" if bs['mcclellan'] > 0 else "red"
+        constituent_html = f"""
+        <div style="margin-top:8px;">
+            <strong>成分股廣度 ({bs['members']} 檔)：</strong>
+            上漲 <span class="green">{bs['advances']}</span> / 下跌 <span class="red">{bs['declines']}</span>
+            ｜ 站上 SMA50 {bs['pct_above_50']:.0f}% ｜ 站上 SMA200 {bs['pct_above_200']:.0f}%
+            ｜ 52週新高 {bs['new_highs']} / 新低 {bs['new_lows']}
+            ｜ McClellan <span class="{mc_cls}">{bs['mcclellan']:+.1f}</span>
+        </div>
+        """
+
+    correlation_html = generate_correlation_html(corr_stats)
+
     breadth_banner = f"""
     <div style="margin-top:20px; padding:15px; background:#161b22; border-left: 4px solid {b_border}; color:#c9d1d9;">
         <strong>市場廣度診斷：</strong> {b_msg}
+        {constituent_html}
     </div>
     """
 
@@ -233,6 +303,7 @@ def generate_html(prices, d_chg, w_chg, m_chg):
             
             .table-container {{ overflow-x: auto; background-color: #161b22; border: 1px solid #30363d; border-radius: 6px; }}
             table {{ width: 100%; border-collapse: collapse; min-width: 350px; }}
+            td, th {{ white-space: nowrap; }}
             th {{ background-color: #21262d; color: #8b949e; padding: 12px; font-size: 0.9em; text-align: right; }}
             td {{ padding: 12px; border-bottom: 1px solid #30363d; text-align: right; font-family: 'Consolas', monospace; }}
             tr:last-child td {{ border-bottom: none; }}
@@ -246,6 +317,7 @@ def generate_html(prices, d_chg, w_chg, m_chg):
             .green {{ color: #3fb950; }}
             .red {{ color: #ff7b72; }}
             .gray {{ color: #8b949e; }}
+            .corr td, .corr th {{ padding: 6px; font-size: 0.8em; text-align: center; }}
             
             @media (max-width: 600px) {{
                 .mobile-hide {{ display: none; }}
@@ -268,15 +340,22 @@ def generate_html(prices, d_chg, w_chg, m_chg):
         {sector_html}
         {breadth_html}
         {breadth_banner}
+        {correlation_html}
 
     </body>
     </html>
     """
-    
-    with open("structure.html", "w", encoding="utf-8") as f:
-        f.write(html)
+    return html
+
+def generate_html(table, breadth_stats=None, corr_stats=None):
+    with metrics.stage('html_write', file="structure.html") as m:
+        html = build_html(table, breadth_stats, corr_stats)
+        m['bytes'] = len(html.encode('utf-8'))
+        fsutil.atomic_write("structure.html", html)
     print("✅ Structure Dashboard Updated (Robust Table Version)!")
 
 if __name__ == "__main__":
-    prices, d_chg, w_chg, m_chg = get_data()
-    generate_html(prices, d_chg, w_chg, m_chg)
\ No newline at end of file
+    metrics.start_run('structure')
+    table = get_data()
+    generate_html(table, breadth.get_breadth(), correlation.get_correlation(refresh=False))
+    metrics.flush()
\ No newline at end of file
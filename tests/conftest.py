@@ -0,0 +1,5 @@
+# 專案模組都在根目錄 (沒有套件)：讓 tests/ 可以直接 import
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
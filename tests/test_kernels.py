@@ -0,0 +1,65 @@
+# kernels (Numba) 與 signal_engine 的 NumPy fallback 必須逐位元相同
+import numpy as np
+import pytest
+import kernels
+import signal_engine as se
+
+pytest.importorskip('numba')
+
+def numpy_path(monkeypatch, fn, *args):
+    monkeypatch.setattr(kernels, 'enabled', lambda work: False)
+    return fn(*args)
+
+def prices(seed, shape=(3, 260), nan_frac=0.03):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, shape), axis=-1))
+    high = close * (1 + np.abs(rng.normal(0, 0.005, shape)))
+    low = close * (1 - np.abs(rng.normal(0, 0.005, shape)))
+    close[:, 5:9] = close[:, 4:5]  # 平盤：delta == 0 (gain / loss 為 0 與 -0.0)
+    for a in (high, low, close):
+        a[rng.random(shape) < nan_frac] = np.nan
+    close[0, :20] = np.nan  # 上市前的前置 NaN
+    return high, low, close
+
+@pytest.mark.parametrize('seed', [0, 1])
+@pytest.mark.parametrize('window', [1, 14, 200])
+def test_rolling_kernels_match_numpy(monkeypatch, seed, window):
+    _, _, close = prices(seed)
+    for name in ('rolling_mean', 'rolling_max', 'rolling_min'):
+        compiled = getattr(kernels, name)(close, window)
+        expected = numpy_path(monkeypatch, getattr(se, name), close, window)
+        np.testing.assert_array_equal(compiled, expected, err_msg=name)
+    short = close[:, :window - 1]  # 長度不足一個視窗：全部 NaN
+    np.testing.assert_array_equal(kernels.rolling_mean(short, window), numpy_path(monkeypatch, se.rolling_mean, short, window))
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_true_range_and_rsi_match_numpy(monkeypatch, seed):
+    high, low, close = prices(seed)
+    np.testing.assert_array_equal(kernels.true_range(high, low, close),
+                                  numpy_path(monkeypatch, se.true_range, high, low, close))
+    for window in (2, 14):
+        np.testing.assert_array_equal(kernels.rsi(close, window), numpy_path(monkeypatch, se.rsi, close, window))
+    flat = np.full((1, 40), 50.0)  # gain == loss == 0 → NaN
+    np.testing.assert_array_equal(kernels.rsi(flat, 14), numpy_path(monkeypatch, se.rsi, flat, 14))
+
+def test_one_dimensional_input(monkeypatch):
+    high, low, close = (a[1] for a in prices(3))
+    np.testing.assert_array_equal(kernels.rolling_mean(close, 14), numpy_path(monkeypatch, se.rolling_mean, close, 14))
+    np.testing.assert_array_equal(kernels.true_range(high, low, close),
+                                  numpy_path(monkeypatch, se.true_range, high, low, close))
+
+@pytest.mark.parametrize('va_pct', [0.5, 0.7, 1.0])
+def test_expand_value_area_matches_numpy(monkeypatch, va_pct):
+    rng = np.random.default_rng(7)
+    vol_bin = rng.lognormal(10, 1, (64, 24))
+    vol_bin[rng.random(vol_bin.shape) < 0.2] = 0  # 空箱：上下皆 0 時提早停止
+    vol_bin[1] = 0
+    vol_bin[2, 3:6] = vol_bin[2].max() * 2  # POC 並列，取第一個
+    vol_bin[3, 7:] = vol_bin[3, :7][::-1].repeat(3)[:17]  # 上下相鄰箱等量
+    vol_bin[4, 10] = np.nan
+    vol_bin[5, :] = np.nan
+    vol_bin[6] = np.round(vol_bin[6])
+    compiled = kernels.expand_value_area(vol_bin, va_pct)
+    expected = numpy_path(monkeypatch, se.expand_value_area, vol_bin, va_pct)
+    for name, a, b in zip(('poc_idx', 'low', 'up'), compiled, expected):
+        np.testing.assert_array_equal(a, b, err_msg=name)
@@ -0,0 +1,108 @@
+# signal_engine (run / last_bar) vs 原本 main.calculate_data 的 pandas 算法
+import numpy as np
+import pandas as pd
+import pytest
+import config
+import signal_engine as se
+
+def synthetic(n, seed):
+    # 固定種子的 OHLCV；中段加入急跌讓狙擊 / 熊市 / 恐慌訊號都會出現
+    rng = np.random.default_rng(seed)
+    ret = rng.normal(0.0004, 0.012, n)
+    ret[n // 2:n // 2 + 25] -= 0.02
+    close = 100 * np.exp(np.cumsum(ret))
+    open_ = np.r_[100, close[:-1]] * np.exp(rng.normal(0, 0.003, n))
+    wick = np.abs(rng.normal(0, 0.006, (2, n)))
+    wick[:, rng.integers(0, n, n // 50)] *= 8  # 偶爾的大震幅日
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = np.round(rng.lognormal(15, 0.4, n))
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+                        index=pd.bdate_range('2010-01-04', periods=n))
+
+def calculate_rsi(data, window=14):
+    delta = data.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+def baseline(df_daily, core, sniper):
+    # main.calculate_data 改寫前的公式 (去掉下載 / 繪圖 / HTML)，只回傳數值
+    lookback_days, bins_count, va_pct = core['LOOKBACK'], core['BINS'], core['VA_PCT']
+    atr_mult, panic_mult = core['ATR_MULT'], core['PANIC_MULT']
+    sma200 = df_daily['Close'].rolling(window=200).mean().iloc[-1]
+    prev_close = df_daily['Close'].shift(1)
+    tr = pd.concat([df_daily['High'] - df_daily['Low'], (df_daily['High'] - prev_close).abs(),
+                    (df_daily['Low'] - prev_close).abs()], axis=1).max(axis=1)
+    atr = tr.rolling(window=14).mean().iloc[-1]
+    is_panic = (df_daily['High'].iloc[-1] - df_daily['Low'].iloc[-1]) > (panic_mult * atr)
+    rsi = calculate_rsi(df_daily['Close']).iloc[-1]
+    bias = (df_daily['Close'].iloc[-1] - sma200) / sma200
+    current_price = df_daily['Close'].iloc[-1]
+    is_bull_market = current_price > sma200
+    is_sniper_zone = (rsi < sniper['RSI_THRESHOLD']) and (bias < sniper['BIAS_THRESHOLD'])
+
+    df_slice = df_daily.iloc[-lookback_days:]
+    p_slice = (df_slice['High'] + df_slice['Low'] + df_slice['Close']) / 3
+    vol_bin, bin_edges = np.histogram(p_slice, bins=bins_count, range=(df_slice['Low'].min(), df_slice['High'].max()),
+                                      weights=df_slice['Volume'])
+    poc_idx = np.argmax(vol_bin)
+    bin_mids = (bin_edges[:-1] + bin_edges[1:]) / 2
+    target_v = vol_bin.sum() * va_pct
+    curr_v = vol_bin[poc_idx]
+    up, low = poc_idx, poc_idx
+    while curr_v < target_v:
+        v_u = vol_bin[up + 1] if up < bins_count - 1 else 0
+        v_d = vol_bin[low - 1] if low > 0 else 0
+        if v_u == 0 and v_d == 0: break
+        if v_u > v_d: up += 1; curr_v += v_u
+        else: low -= 1; curr_v += v_d
+    poc_price, val_price, vah_price = bin_mids[poc_idx], bin_mids[low], bin_mids[up]
+
+    stop_price = df_slice['Close'].max() - (atr_mult * atr)
+    sniper_stop = df_daily['Close'].iloc[-sniper['STOP_LOOKBACK']:].max() - (atr_mult * atr)
+
+    if is_sniper_zone: signal_code = 3
+    elif not is_bull_market: signal_code = -3 if current_price > sniper_stop else -1
+    elif is_panic: signal_code = 0
+    elif current_price < val_price: signal_code = 1
+    elif current_price > poc_price: signal_code = -2 if current_price < stop_price else 2
+    else: signal_code = 0
+    return {'signal_code': signal_code, 'poc': poc_price, 'val': val_price, 'vah': vah_price,
+            'stop_price': stop_price, 'sniper_stop': sniper_stop, 'sma200': sma200, 'atr': atr, 'rsi': rsi}
+
+FLOATS = ['poc', 'val', 'vah', 'stop_price', 'sniper_stop', 'sma200', 'atr', 'rsi']
+PARAMS = [
+    ({}, {}),
+    ({'LOOKBACK': 84, 'BINS': 9, 'VA_PCT': 0.6, 'ATR_MULT': 2.0, 'PANIC_MULT': 1.5}, {'RSI_THRESHOLD': 40, 'BIAS_THRESHOLD': -0.05}),
+]
+
+def assert_same(got, expected, where):
+    assert int(got['signal_code']) == expected['signal_code'], where
+    for k in FLOATS:
+        np.testing.assert_allclose(got[k], expected[k], rtol=1e-10, err_msg=f"{k} @ {where}")
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+@pytest.mark.parametrize('core, sniper', PARAMS)
+def test_run_matches_baseline(seed, core, sniper):
+    core, sniper = {**config.CORE_PARAMS, **core}, {**config.SNIPER_PARAMS, **sniper}
+    df = synthetic(900, seed)
+    result = se.run(*(df[c].to_numpy() for c in ('High', 'Low', 'Close', 'Volume')), core, sniper)
+    start = se.warmup(core['LOOKBACK'], sniper['STOP_LOOKBACK'])
+    codes = set()
+    for t in range(start, len(df), 3):
+        expected = baseline(df.iloc[:t + 1], core, sniper)
+        assert_same({k: v[t] for k, v in result.items()}, expected, t)
+        codes.add(expected['signal_code'])
+    assert len(codes) >= 4  # 決策樹的多個分支都有比到
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+@pytest.mark.parametrize('core, sniper', PARAMS)
+def test_last_bar_matches_baseline(seed, core, sniper):
+    core, sniper = {**config.CORE_PARAMS, **core}, {**config.SNIPER_PARAMS, **sniper}
+    df = synthetic(900, seed)
+    for end in (400, 650, 900):
+        part = df.iloc[:end]
+        bar = se.last_bar(*(part[c].to_numpy() for c in ('High', 'Low', 'Close', 'Volume')), core, sniper)
+        assert_same(bar, baseline(part, core, sniper), end)
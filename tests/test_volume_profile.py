@@ -0,0 +1,59 @@
+# RollingVolumeProfile (逐根增量 / preview) vs 每根從頭 np.histogram
+import numpy as np
+import pytest
+from volume_profile import RollingVolumeProfile, expand_value_area
+
+LOOKBACK, BINS, VA_PCT = 20, 6, 0.7
+
+def bars(n, seed, integer=True, flat=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    high = close * (1 + np.abs(rng.normal(0, 0.005, n)))
+    low = close * (1 - np.abs(rng.normal(0, 0.005, n)))
+    volume = rng.integers(1, 10_000, n).astype(float) if integer else rng.lognormal(8, 1, n)
+    high[:flat] = low[:flat] = close[:flat] = 50.0  # 前 flat 根完全沒有波動 (High == Low)
+    return high, low, close, volume
+
+def histogram_levels(high, low, close, volume):
+    # main.calculate_data 的原始算法
+    typical = (high + low + close) / 3
+    vol_bin, edges = np.histogram(typical, bins=BINS, range=(low.min(), high.max()), weights=volume)
+    mids = (edges[:-1] + edges[1:]) / 2
+    poc, lo, up = expand_value_area(vol_bin, VA_PCT)
+    return vol_bin, {'poc': mids[poc], 'val': mids[lo], 'vah': mids[up]}
+
+@pytest.mark.parametrize('integer', [True, False])
+@pytest.mark.parametrize('flat', [0, 45])
+def test_update_matches_histogram(integer, flat):
+    high, low, close, volume = bars(300, 1, integer, flat)
+    profile = RollingVolumeProfile(LOOKBACK, BINS, VA_PCT)
+    for i in range(len(close)):
+        levels = profile.update(high[i], low[i], close[i], volume[i])
+        w = slice(max(i - LOOKBACK + 1, 0), i + 1)
+        vol_bin, expected = histogram_levels(high[w], low[w], close[w], volume[w])
+        if integer:
+            np.testing.assert_array_equal(profile.vol_bin, vol_bin)
+        else:
+            np.testing.assert_allclose(profile.vol_bin, vol_bin, rtol=1e-9)
+        assert levels == expected
+
+@pytest.mark.parametrize('integer', [True, False])
+@pytest.mark.parametrize('flat', [0, 45])
+def test_preview_matches_histogram(integer, flat):
+    high, low, close, volume = bars(300, 2, integer, flat)
+    profile = RollingVolumeProfile(LOOKBACK, BINS, VA_PCT)
+    for i in range(len(close) - 1):
+        profile.update(high[i], low[i], close[i], volume[i])
+        j = i + 1
+        w = slice(max(j - LOOKBACK + 1, 0), j + 1)
+        _, expected = histogram_levels(high[w], low[w], close[w], volume[w])
+        # 盤中同一根 K 棒重複 preview (先用部分數據，再用完整數據)
+        profile.preview(high[j] * 0.999, low[j], close[j], volume[j] / 2)
+        assert profile.preview(high[j], low[j], close[j], volume[j]) == expected
+
+def test_flat_window_does_not_rebin_every_bar():
+    profile = RollingVolumeProfile(LOOKBACK, BINS, VA_PCT)
+    for _ in range(200):
+        profile.update(10.0, 10.0, 10.0, 100.0)
+    assert profile.rebins == 200 // LOOKBACK + 1  # 第一根 + 每 LOOKBACK 根強制重建
+    assert profile.range == (10.0, 10.0)
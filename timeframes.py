@@ -0,0 +1,212 @@
+# ==========================================
+# 🕰️ MULTI-TIMEFRAME (多週期分析 & 重取樣快取)
+# ==========================================
+# 策略原本只跑日線。這裡讓同一套成交量分佈 / ATR / 狙擊手邏輯 (se.last_bar) 也能跑在：
+#   - 週線 (週五結束) / 月線 (月底結束)：由本地行情庫的日線重取樣，不另外下載
+#   - 時線 (1h)：數據源有提供時另存一份 (yfinance 只給最近 730 天)，之後只補抓新的 K 棒
+# 重取樣結果以 (ticker, timeframe) 為鍵，存在記憶體與 data/resampled/<tf>/<ticker>.npz：
+#   新的日線進來時，只重算最後兩個週期 (最後一個可能未完成)，不會每次從頭重取樣。
+# 最後綜合各週期的訊號給出多週期結論 (共振 / 分歧)。
+#
+# 用法: python timeframes.py [SPY QQQ IWM] [--timeframes 1h 1d 1wk 1mo] [--no-refresh]
+import os
+import hashlib
+import argparse
+import datetime
+import numpy as np
+import config
+import market_store
+import providers
+import signal_engine as se
+
+TIMEFRAMES = ['1h', '1d', '1wk', '1mo']
+LABELS = {'1h': '時線', '1d': '日線', '1wk': '週線', '1mo': '月線'}
+WEIGHTS = {'1h': 1, '1d': 2, '1wk': 3, '1mo': 3}   # 多週期結論的權重 (週期越長越重)
+INTRADAY_DAYS = 729                                  # yfinance 1h 最多回溯 730 天
+
+_cache = {}   # (ticker, timeframe) → {'dates', 'ohlcv', ...}
+
+# ==========================================
+# 1. 日線 → 週線 / 月線
+# ==========================================
+def period_keys(dates, timeframe):
+    # 每根日線所屬週期的結束日 (同 pandas 'W-FRI' / 'ME' 的標籤)
+    d = np.asarray(dates, dtype='datetime64[D]')
+    if timeframe == '1wk':
+        weekday = (d.astype(np.int64) + 3) % 7   # 1970-01-01 是週四；0 = 週一
+        return d + (4 - weekday) % 7
+    if timeframe == '1mo':
+        return (d.astype('datetime64[M]') + 1).astype('datetime64[D]') - 1
+    raise ValueError(f"不支援由日線重取樣的週期: {timeframe}")
+
+def aggregate(dates, ohlcv, timeframe):
+    # 回傳 (週期標籤, (periods, 5) OHLCV, 每個週期第一根日線的位置)
+    keys = period_keys(dates, timeframe)
+    if len(keys) == 0:
+        return keys, np.empty((0, 5)), np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    ohlcv = np.asarray(ohlcv, dtype=np.float64)
+    out = np.column_stack([ohlcv[starts, 0],
+                           np.maximum.reduceat(ohlcv[:, 1], starts),
+                           np.minimum.reduceat(ohlcv[:, 2], starts),
+                           ohlcv[ends, 3],
+                           np.add.reduceat(ohlcv[:, 4], starts)])
+    return keys[starts], out, starts
+
+# ==========================================
+# 2. 快取 (記憶體 + 磁碟)
+# ==========================================
+def cache_path(ticker, timeframe, data_dir=None):
+    return os.path.join(data_dir or config.DATA_DIR, 'resampled', timeframe, f"{ticker.replace('/', '_')}.npz")
+
+def _prefix_hash(dates, ohlcv, n):
+    h = hashlib.sha256()
+    h.update(np.asarray(dates[:n], dtype='datetime64[D]').tobytes())
+    h.update(np.ascontiguousarray(ohlcv[:n], dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+def _load_entry(ticker, timeframe, data_dir):
+    key = (ticker, timeframe)
+    if key not in _cache:
+        path = cache_path(ticker, timeframe, data_dir)
+        if not os.path.exists(path): return None
+        with np.load(path) as f:
+            _cache[key] = {k: f[k] for k in f.files}
+    return _cache[key]
+
+def _save_entry(ticker, timeframe, entry, data_dir):
+    path = cache_path(ticker, timeframe, data_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **entry)
+    os.replace(tmp, path)
+    _cache[(ticker, timeframe)] = entry
+
+def resampled(ticker, timeframe, data_dir=None):
+    # 週線 / 月線：快取中最後兩個週期之前的日線沒變，就只重算最後兩個週期 (行情庫每次會重抓最後 2 根日線)
+    arrays = market_store.load_arrays(ticker, data_dir)
+    if arrays is None or len(arrays[0]) == 0: return None
+    dates, ohlcv = arrays
+    n = len(dates)
+    entry = _load_entry(ticker, timeframe, data_dir)
+    keep = 0
+    if entry is not None and len(entry['starts']) >= 2:
+        if int(entry['n']) == n and np.array_equal(entry['last_row'], ohlcv[-1]):
+            return entry  # 沒有新數據
+        s = int(entry['starts'][-2])
+        if s <= n and str(entry['prefix']) == _prefix_hash(dates, ohlcv, s):
+            keep = len(entry['starts']) - 2
+
+    s = int(entry['starts'][keep]) if keep else 0
+    keys, out, starts = aggregate(dates[s:], ohlcv[s:], timeframe)
+    if keep:
+        keys = np.concatenate([entry['dates'][:keep], keys])
+        out = np.concatenate([entry['ohlcv'][:keep], out])
+        starts = np.concatenate([entry['starts'][:keep], starts + s])
+
+    prefix_n = int(starts[-2]) if len(starts) >= 2 else 0
+    entry = {'dates': keys, 'ohlcv': out, 'starts': starts, 'n': np.array(n),
+             'last_row': np.asarray(ohlcv[-1], dtype=np.float64), 'prefix': np.array(_prefix_hash(dates, ohlcv, prefix_n))}
+    _save_entry(ticker, timeframe, entry, data_dir)
+    return entry
+
+# ==========================================
+# 3. 時線 (另外下載，增量補抓)
+# ==========================================
+def intraday(ticker, interval='1h', refresh=True, provider=None, data_dir=None):
+    # 從最後儲存日起補抓 (當天的 K 棒會被新數據取代)；數據源不支援時回傳已存的 (或 None)
+    entry = _load_entry(ticker, interval, data_dir)
+    if not refresh: return entry
+    provider = provider or providers.get_provider()
+    if entry is not None and len(entry['dates']):
+        start = np.asarray(entry['dates'][-1], dtype='datetime64[D]')
+    else:
+        start = np.datetime64(datetime.date.today() - datetime.timedelta(days=INTRADAY_DAYS), 'D')
+    try:
+        frame = provider.download([ticker], start=str(start), interval=interval).get(ticker)
+    except Exception as e:
+        print(f"⚠️ 無法下載 {ticker} 的 {interval} 數據: {e}")
+        return entry
+    if frame is None or len(frame) == 0: return entry
+
+    new_dates = frame.index.to_numpy().astype('datetime64[m]')
+    new_ohlcv = frame[market_store.FIELDS].to_numpy(dtype=np.float64)
+    if entry is not None:
+        keep = entry['dates'] < new_dates[0]
+        new_dates = np.concatenate([entry['dates'][keep], new_dates])
+        new_ohlcv = np.concatenate([entry['ohlcv'][keep], new_ohlcv])
+    entry = {'dates': new_dates, 'ohlcv': new_ohlcv}
+    _save_entry(ticker, interval, entry, data_dir)
+    return entry
+
+def bars(ticker, timeframe, refresh=True, data_dir=None):
+    # 統一入口 → (dates, (n, 5) OHLCV) 或 None
+    if timeframe == '1d':
+        return market_store.load_arrays(ticker, data_dir)
+    entry = intraday(ticker, timeframe, refresh, data_dir=data_dir) if timeframe == '1h' else resampled(ticker, timeframe, data_dir)
+    if entry is None or len(entry['dates']) == 0: return None
+    return entry['dates'], entry['ohlcv']
+
+# ==========================================
+# 4. 各週期訊號 & 多週期結論
+# ==========================================
+def signal(ticker, timeframe, refresh=True, data_dir=None):
+    arrays = bars(ticker, timeframe, refresh, data_dir)
+    if arrays is None: return None
+    dates, ohlcv = arrays
+    ohlcv = np.asarray(ohlcv[-se.tail_size():], dtype=np.float64)
+    bar = se.last_bar(ohlcv[:, 1], ohlcv[:, 2], ohlcv[:, 3], ohlcv[:, 4])
+    if bar is None: return None  # K 棒數不足暖機 (例如上市不久的月線)
+    return {'timeframe': timeframe, 'date': str(dates[-1]), 'price': float(ohlcv[-1, 3]),
+            'signal_code': bar['signal_code'], 'action': se.SIGNAL_LABELS[bar['signal_code']],
+            'poc': float(bar['poc']), 'val': float(bar['val']), 'stop_price': float(bar['stop_price'])}
+
+def _direction(code):
+    # 1 / 2 / 3 → 偏多；-1 / -2 → 偏空；0 / -3 → 中性
+    if code > 0: return 1
+    if code in (se.SIGNAL_BEAR, se.SIGNAL_TAKE_PROFIT): return -1
+    return 0
+
+def verdict(signals):
+    # signals: {timeframe: signal() 結果}；加權分數介於 -1 ~ 1
+    available = {tf: s for tf, s in signals.items() if s is not None}
+    if not available: return {'score': None, 'title': "⚪ 無數據", 'aligned': False}
+    total = sum(WEIGHTS[tf] for tf in available)
+    score = sum(WEIGHTS[tf] * _direction(s['signal_code']) for tf, s in available.items()) / total
+    directions = {_direction(s['signal_code']) for s in available.values()}
+    aligned = len(directions) == 1
+    if aligned and 1 in directions: title = "🚀 多週期共振偏多"
+    elif aligned and -1 in directions: title = "🚨 多週期共振偏空"
+    elif score >= 0.5: title = "📈 偏多 (短週期分歧)"
+    elif score <= -0.5: title = "📉 偏空 (短週期分歧)"
+    else: title = "⚖️ 週期分歧，觀望"
+    return {'score': round(score, 3), 'title': title, 'aligned': aligned}
+
+def get_mtf(tickers, timeframes=None, refresh=True):
+    timeframes = timeframes or TIMEFRAMES
+    if refresh: market_store.refresh(tickers)
+    out = {}
+    for t in tickers:
+        signals = {tf: signal(t, tf, refresh) for tf in timeframes}
+        out[t] = {'signals': signals, 'verdict': verdict(signals)}
+    return out
+
+if __name__ == "__main__":
+    import main
+    parser = argparse.ArgumentParser(description="多週期 (時 / 日 / 週 / 月) 訊號與綜合結論")
+    parser.add_argument('tickers', nargs='*', default=main.target_tickers)
+    parser.add_argument('--timeframes', nargs='+', default=TIMEFRAMES, choices=TIMEFRAMES)
+    parser.add_argument('--no-refresh', action='store_true', help="不更新行情，只讀本地行情庫 / 快取")
+    args = parser.parse_args()
+
+    for t, res in get_mtf(args.tickers, args.timeframes, refresh=not args.no_refresh).items():
+        print(f"\n📊 {t}: {res['verdict']['title']} (分數 {res['verdict']['score']})")
+        for tf in args.timeframes:
+            s = res['signals'][tf]
+            if s is None:
+                print(f"   {LABELS[tf]:<4} 數據不足")
+                continue
+            print(f"   {LABELS[tf]:<4} {s['date']:<20} {s['price']:>9.2f}  {s['action']}"
+                  f"  (POC {s['poc']:.2f} / VAL {s['val']:.2f} / 止盈 {s['stop_price']:.2f})")
@@ -0,0 +1,155 @@
+# ==========================================
+# 📊 ROLLING VOLUME PROFILE (滑動視窗成交量分佈)
+# ==========================================
+# main.calculate_data 每次都用 np.histogram 從頭重建最近 LOOKBACK 根的成交量分佈，
+# 再用 while 迴圈擴張價值區。逐根回測 / 串流更新時改用這個物件：
+#   - 視窗最低價 / 最高價以單調佇列 (monotonic deque) 維護，O(1) 攤銷
+#   - 區間 (Low.min ~ High.max) 不變時，只扣掉過期 K 棒、加上新 K 棒 → O(1)
+#   - 區間改變時才重新分箱 (O(LOOKBACK))
+#   - POC / VAL / VAH 每根以 O(BINS) 重新擴張
+#   - preview()：不推入，假設下一根是某根尚未收盤的 K 棒 (stream.py 盤中正在形成的日 K)，
+#     去掉即將移出的最舊一根再加上它；已收盤 K 棒的分箱依區間快取，區間不變時 O(BINS)
+# 分箱規則與 np.histogram 相同；成交量為整數時增減沒有捨入誤差，結果與從頭計算完全一致。
+from collections import deque
+import numpy as np
+import config
+import signal_engine as se
+
+def expand_value_area(vol_bin, va_pct):
+    # 單一分佈的價值區擴張 (與 main.py 的 while 迴圈相同)，回傳 (poc_idx, low_idx, up_idx)
+    bins = len(vol_bin)
+    poc_idx = int(np.argmax(vol_bin))
+    target_v = vol_bin.sum() * va_pct
+    curr_v = vol_bin[poc_idx]
+    up, low = poc_idx, poc_idx
+    while curr_v < target_v:
+        v_u = vol_bin[up + 1] if up < bins - 1 else 0
+        v_d = vol_bin[low - 1] if low > 0 else 0
+        if v_u == 0 and v_d == 0: break
+        if v_u > v_d: up += 1; curr_v += v_u
+        else: low -= 1; curr_v += v_d
+    return poc_idx, low, up
+
+def bin_of(price, bin_edges):
+    # 單點版 np.histogram 分箱 (含最後一箱包含右邊界、±1 ULP 修正)；bin_edges 由 se.histogram_bins 產生
+    bins = len(bin_edges) - 1
+    lo, hi = bin_edges[0], bin_edges[-1]
+    idx = int((price - lo) / (hi - lo) * bins)
+    if idx == bins: idx -= 1
+    if price < bin_edges[idx]: idx -= 1
+    elif price >= bin_edges[idx + 1] and idx != bins - 1: idx += 1
+    return idx
+
+class RollingVolumeProfile:
+    def __init__(self, lookback=None, bins=None, va_pct=None):
+        self.lookback = lookback or config.CORE_PARAMS['LOOKBACK']
+        self.bins = bins or config.CORE_PARAMS['BINS']
+        self.va_pct = va_pct or config.CORE_PARAMS['VA_PCT']
+
+        # 環狀緩衝區：典型價格 / 成交量 / 所屬分箱
+        self._price = np.zeros(self.lookback)
+        self._volume = np.zeros(self.lookback)
+        self._bin = np.zeros(self.lookback, dtype=np.intp)
+        self._count = 0  # 已處理的 K 棒總數
+
+        # 單調佇列：(序號, 價格)
+        self._lows = deque()
+        self._highs = deque()
+
+        self.range = None
+        self.vol_bin = np.zeros(self.bins)
+        self.bin_edges = None
+        self.bin_mids = None
+        self.rebins = 0
+        self._base = None   # preview 用：(區間, 去掉最舊一根的分佈, bin_edges, bin_mids)
+
+    @classmethod
+    def from_history(cls, df, lookback=None, bins=None, va_pct=None):
+        profile = cls(lookback, bins, va_pct)
+        window = df.iloc[-profile.lookback:]
+        for h, l, c, v in zip(window['High'].to_numpy(), window['Low'].to_numpy(),
+                              window['Close'].to_numpy(), window['Volume'].to_numpy()):
+            profile.update(h, l, c, v)
+        return profile
+
+    def __len__(self):
+        return min(self._count, self.lookback)
+
+    def _window_order(self):
+        n = len(self)
+        start = (self._count - n) % self.lookback
+        return (start + np.arange(n)) % self.lookback
+
+    def _rebin(self):
+        order = self._window_order()
+        lo, hi = self.range
+        prices = self._price[order][None, :]
+        indices, _, bin_edges = se.histogram_bins(prices, [lo], [hi], self.bins)
+        self._bin[order] = indices[0]
+        self.bin_edges = bin_edges[0]  # lo == hi 時已依 np.histogram 放寬為 ±0.5；self.range 保留原始值供比對
+        self.bin_mids = (self.bin_edges[:-1] + self.bin_edges[1:]) / 2
+        self.vol_bin = np.bincount(indices[0], weights=self._volume[order], minlength=self.bins).astype(np.float64)
+        self.rebins += 1
+
+    def update(self, high, low, close, volume):
+        # 推入一根新 K 棒 (超過 LOOKBACK 的舊 K 棒自動移出)，回傳最新的 POC / VAL / VAH
+        i = self._count
+        slot = i % self.lookback
+        expired = i >= self.lookback
+        old_bin, old_volume = self._bin[slot], self._volume[slot]
+
+        price = (high + low + close) / 3
+        self._price[slot] = price
+        self._volume[slot] = volume
+        self._count += 1
+
+        while self._lows and self._lows[-1][1] >= low: self._lows.pop()
+        self._lows.append((i, low))
+        while self._highs and self._highs[-1][1] <= high: self._highs.pop()
+        self._highs.append((i, high))
+        oldest = self._count - self.lookback
+        while self._lows[0][0] < oldest: self._lows.popleft()
+        while self._highs[0][0] < oldest: self._highs.popleft()
+
+        self._base = None
+        # 區間改變才重新分箱；另每 LOOKBACK 根強制重建一次，避免非整數成交量的增減誤差累積
+        new_range = (self._lows[0][1], self._highs[0][1])
+        if new_range != self.range or self._count % self.lookback == 0:
+            self.range = new_range
+            self._rebin()
+        else:
+            if expired: self.vol_bin[old_bin] = max(self.vol_bin[old_bin] - old_volume, 0.0)
+            self._bin[slot] = bin_of(price, self.bin_edges)
+            self.vol_bin[self._bin[slot]] += volume
+        return self.levels()
+
+    def _remaining_range(self):
+        # 推入下一根時最舊一根會移出：剩下 K 棒的 (最低價, 最高價)；單調佇列的第二個元素就是移出後的極值
+        oldest = self._count - self.lookback
+        lows = [p for i, p in list(self._lows)[:2] if i != oldest]
+        highs = [p for i, p in list(self._highs)[:2] if i != oldest]
+        return (lows[0] if lows else np.inf), (highs[0] if highs else -np.inf)
+
+    def _preview_base(self, lo, hi):
+        if self._base is not None and self._base[0] == (lo, hi): return self._base
+        order = self._window_order()
+        if len(self) == self.lookback: order = order[1:]
+        indices, keep, bin_edges = se.histogram_bins(self._price[order][None, :], [lo], [hi], self.bins)
+        vol_bin = np.bincount(indices[0][keep[0]], weights=self._volume[order][keep[0]], minlength=self.bins).astype(np.float64)
+        self._base = ((lo, hi), vol_bin, bin_edges[0], (bin_edges[0, :-1] + bin_edges[0, 1:]) / 2)
+        self.rebins += 1
+        return self._base
+
+    def preview(self, high, low, close, volume):
+        # 假設下一根是這根 K 棒時的 POC / VAL / VAH (不改變狀態；同一根 K 棒盤中可重複呼叫)
+        r_lo, r_hi = self._remaining_range()
+        _, base, bin_edges, bin_mids = self._preview_base(min(r_lo, low), max(r_hi, high))
+        vol_bin = base.copy()
+        vol_bin[bin_of((high + low + close) / 3, bin_edges)] += volume
+        poc_idx, low_idx, up_idx = expand_value_area(vol_bin, self.va_pct)
+        return {'poc': bin_mids[poc_idx], 'val': bin_mids[low_idx], 'vah': bin_mids[up_idx]}
+
+    def levels(self):
+        if self._count == 0: return None
+        poc_idx, low_idx, up_idx = expand_value_area(self.vol_bin, self.va_pct)
+        return {'poc': self.bin_mids[poc_idx], 'val': self.bin_mids[low_idx], 'vah': self.bin_mids[up_idx]}
@@ -0,0 +1,302 @@
+# ==========================================
+# 🚶 WALK-FORWARD OPTIMIZATION (滾動前進 季度健檢)
+# ==========================================
+# scan_5d_quarterly.py 用整段歷史挑參數 (樣本內)；這裡改成真正的 walk-forward：
+#   - 從 START_DATE 起每季一個視窗：前 IS_QUARTERS 季為樣本內 (IS)，下一季為樣本外 (OOS)，每次前進一季
+#   - 每個視窗在 IS 上掃描 scan_5d_quarterly 的完整網格，選出最佳參數，再到 OOS 驗證
+#   - 串接各季 OOS 報酬 → walk-forward 淨值，與固定 config 參數 / 買進持有比較
+# 快取 (scan_results/walk_forward/<ticker>/)：
+#   - profile_<LB>-<BINS>.npz：每組 (LOOKBACK, BINS) 的滾動成交量分佈，新 K 棒只補算尾段
+#   - windows/<OOS 起始日>/<LB>-<BINS>.npz：該視窗所有參數組合的 IS 績效；鍵為 IS 期間以前的數據雜湊 + 設定
+#   - 數據雜湊用「相對前一日收盤」的價格 + 成交量：除權息 / 拆股的回溯調整把整段歷史乘上同一個比例，雜湊不變
+#     (訊號只看價格之間的比較，IS 績效不受比例影響；成交量分佈的價位按比例換算)
+# 重疊的視窗共用成交量分佈；每多一季只需算新視窗，重跑不會重算幾十年的歷史。
+#
+# 用法: python walk_forward.py [--ticker QQQ] [--is-quarters 12] [--metric calmar] [--workers 8] [--cost 0.0005]
+import os
+import json
+import time
+import argparse
+import hashlib
+import itertools
+import numpy as np
+from multiprocessing import Pool
+import config
+import market_store
+import signal_engine as se
+import scan_5d_quarterly as scan
+
+IS_QUARTERS = 12          # 樣本內長度 (季)
+REVISABLE_BARS = 2        # 本地行情庫每次會重抓最後 2 根，成交量分佈快取不存這一段
+HASH_DECIMALS = 10        # 數據雜湊：相對價格四捨五入的位數 (吸收回溯調整的浮點誤差)
+CACHE_DIR = os.path.join('scan_results', 'walk_forward')
+PARAM_KEYS = [*scan.GRID, *scan.SNIPER_GRID]
+
+# ==========================================
+# 1. 視窗 & 參數組合
+# ==========================================
+def quarter_starts(dates):
+    # 每季第一根 K 棒的位置
+    q = dates.year * 4 + (dates.month - 1) // 3
+    return np.flatnonzero(np.diff(q, prepend=q[0] - 1))
+
+def build_windows(dates, is_quarters=IS_QUARTERS):
+    # IS 必須在所有 LOOKBACK 暖機完成後才開始；最後一季 (進行中) 的 OOS 為部分數據
+    ready = se.warmup(max(scan.GRID['LOOKBACK']), config.SNIPER_PARAMS['STOP_LOOKBACK'])
+    starts = [s for s in quarter_starts(dates) if s >= ready]
+    windows = []
+    for k in range(is_quarters, len(starts)):
+        oos_end = starts[k + 1] if k + 1 < len(starts) else len(dates)
+        windows.append({'id': str(dates[starts[k]].date()), 'is': (starts[k - is_quarters], starts[k]),
+                        'oos': (starts[k], oos_end), 'complete': k + 1 < len(starts)})
+    return windows
+
+def task_combos(lookback, bins):
+    # 與 scan.run_task 相同的展開順序
+    return [dict(zip(PARAM_KEYS, (lookback, bins, *rest)))
+            for rest in itertools.product(scan.GRID['VA_PCT'], scan.GRID['ATR_MULT'], scan.GRID['PANIC_MULT'],
+                                          *scan.SNIPER_GRID.values())]
+
+def all_tasks():
+    return [(lb, b) for lb in scan.GRID['LOOKBACK'] for b in scan.GRID['BINS']]
+
+# ==========================================
+# 2. 快取
+# ==========================================
+def _digest(*parts):
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else str(p).encode())
+    return h.hexdigest()
+
+def _relative(prices_volume):
+    # (..., 價格欄位, Close, Volume) → 各價格 / 前一日收盤 (第一根用自己的收盤)，四捨五入；成交量不變
+    x = np.asarray(prices_volume, dtype=np.float64)
+    ref = np.concatenate([x[:1, -2], x[:-1, -2]])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prices = np.round(x[:, :-1] / ref[:, None], HASH_DECIMALS)
+    return np.column_stack([prices, x[:, -1]])
+
+def _data_hash(ohlcv, n):
+    # ohlcv / hlcv 的前 n 根 (最後兩欄必須是 Close, Volume)；對整段價格乘上常數不變
+    return _digest(np.ascontiguousarray(_relative(ohlcv[:n])).tobytes())
+
+def _save_npz(path, **arrays):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+def cached_profile(cache_dir, hlcv, lookback, bins):
+    # 滾動成交量分佈：已存的前 n 根數據 (High / Low / Close / Volume) 沒變就只補算之後的視窗
+    path = os.path.join(cache_dir, f"profile_{scan.task_key(lookback, bins)}.npz")
+    high, low, close, volume = hlcv.T
+    total = len(close)
+    cached = None
+    if os.path.exists(path):
+        with np.load(path) as f:
+            cached = {k: f[k] for k in f.files}
+        n = int(cached['n'])
+        if n > total or str(cached['hash']) != _data_hash(hlcv, n):
+            cached = None
+    if cached is None:
+        profile = se.rolling_profile(high, low, close, volume, lookback, bins)
+    else:
+        # 快取之後若有回溯調整，價位按最後一根快取 K 棒的收盤比例換算
+        scale = close[n - 1] / float(cached['ref_close'])
+        profile = {'vol_bin': cached['vol_bin'], 'bin_mids': cached['bin_mids'] * scale, 'windows': len(cached['vol_bin'])}
+        if total > n:
+            new = se.rolling_profile(high, low, close, volume, lookback, bins, tail=total - n)
+            profile = {k: np.concatenate([profile[k], new[k]]) for k in ('vol_bin', 'bin_mids')}
+            profile['windows'] = len(profile['vol_bin'])
+
+    keep = total - REVISABLE_BARS
+    if cached is None or keep > int(cached['n']):
+        m = keep - lookback + 1
+        _save_npz(path, n=np.array(keep), hash=np.array(_data_hash(hlcv, keep)), ref_close=np.array(close[keep - 1]),
+                  vol_bin=profile['vol_bin'][:m], bin_mids=profile['bin_mids'][:m])
+    return profile
+
+def window_path(cache_dir, window_id, task):
+    return os.path.join(cache_dir, 'windows', window_id, f"{scan.task_key(*task)}.npz")
+
+def window_key(ohlcv, window, settings):
+    # IS 績效只取決於 IS 結束前的數據 (指標皆為因果) 與回測設定
+    return _digest(_data_hash(ohlcv, window['is'][1]), window['is'][0], json.dumps(scan.GRID), json.dumps(scan.SNIPER_GRID),
+                   settings['cost'], settings['sniper_size'], settings['stop_lookback'])
+
+def load_window(cache_dir, window_id, task, key):
+    path = window_path(cache_dir, window_id, task)
+    if not os.path.exists(path): return None
+    with np.load(path) as f:
+        return f['is_metrics'] if str(f['key']) == key else None
+
+# ==========================================
+# 3. Worker：一組 (LOOKBACK, BINS) × 所有待算視窗
+# ==========================================
+def run_window_task(task):
+    lookback, bins = task
+    s = scan._shared
+    settings = s['_settings']
+    cache_dir, windows = settings['cache_dir'], settings['windows']
+    pending = [w for w in windows if load_window(cache_dir, w['id'], task, w['key']) is None]
+    if not pending: return task, 0
+
+    # 只算涵蓋待算 IS 期間的一段訊號
+    a = min(w['is'][0] for w in pending)
+    b = max(w['is'][1] for w in pending)
+    hlcv = np.column_stack([s['high'], s['low'], s['close'], s['volume']])
+    profile = cached_profile(cache_dir, hlcv, lookback, bins)
+    close = s['close']
+    ind = {k: s[k][a:b] for k in ('sma200', 'atr', 'rsi', 'bias', 'day_range')}
+    highest_close = se.rolling_max(close, lookback)[a:b]
+    short_high = se.rolling_max(close, settings['stop_lookback'])[a:b]
+
+    combos = task_combos(lookback, bins)
+    codes = np.empty((len(combos), b - a), dtype=np.int8)
+    i = 0
+    for va_pct in scan.GRID['VA_PCT']:
+        levels = se.value_area(None, None, close, None, lookback, bins, va_pct, profile=profile)
+        levels = {k: v[a:b] for k, v in levels.items()}
+        for atr_mult in scan.GRID['ATR_MULT']:
+            stop_price = highest_close - atr_mult * ind['atr']
+            sniper_stop = short_high - atr_mult * ind['atr']
+            for panic_mult, rsi_th, bias_th in itertools.product(scan.GRID['PANIC_MULT'], *scan.SNIPER_GRID.values()):
+                codes[i] = se.decide(close[a:b], ind, levels, stop_price, sniper_stop, panic_mult, rsi_th, bias_th)
+                i += 1
+
+    # 每個視窗從 IS 起點空手開始，所有組合一次向量化
+    for w in pending:
+        lo, hi = w['is'][0] - a, w['is'][1] - a
+        positions = se.positions_from_signals(codes[:, lo:hi], settings['sniper_size'])
+        returns = se.strategy_returns(np.broadcast_to(close[w['is'][0]:w['is'][1]], positions.shape), positions, settings['cost'])
+        perf = se.performance(returns)
+        metrics = np.stack([perf[m] for m in scan.METRICS], axis=-1).astype(np.float32)
+        _save_npz(window_path(cache_dir, w['id'], task), key=np.array(w['key']), is_metrics=metrics)
+    return task, len(pending)
+
+# ==========================================
+# 4. 選參數 & OOS 驗證
+# ==========================================
+def window_returns(hlcv, ind, params, window, cost, sniper_size, codes_cache):
+    # 以指定參數從 IS 起點空手開始，回傳 OOS 期間的日報酬 (訊號為因果，同一組參數的全歷史訊號只算一次)
+    high, low, close, volume = hlcv.T
+    key = scan.param_key(params)
+    if key not in codes_cache:
+        core = {k: params[k] for k in scan.GRID}
+        sniper = {k: params[k] for k in scan.SNIPER_GRID}
+        codes_cache[key] = se.run(high, low, close, volume, core, sniper, indicators=ind)['signal_code']
+    codes = codes_cache[key]
+    a, b = window['is'][0], window['oos'][1]
+    positions = se.positions_from_signals(codes[a:b], sniper_size)
+    returns = se.strategy_returns(close[a:b], positions, cost)
+    return returns[window['oos'][0] - a:]
+
+def best_params(cache_dir, window, metric):
+    tasks = all_tasks()
+    metrics = np.concatenate([load_window(cache_dir, window['id'], t, window['key']) for t in tasks])
+    combos = [c for t in tasks for c in task_combos(*t)]
+    i = int(np.argmax(metrics[:, scan.METRICS.index(metric)]))
+    return combos[i], {m: float(v) for m, v in zip(scan.METRICS, metrics[i])}
+
+def walk_forward(ticker, metric='calmar', is_quarters=IS_QUARTERS, workers=None, cost=0.0, cache_dir=None):
+    df = market_store.get(ticker, start=config.START_DATE)
+    if len(df) == 0:
+        print(f"❌ 找不到 {ticker} 的數據")
+        return None
+    cache_dir = cache_dir or os.path.join(CACHE_DIR, ticker)
+    ohlcv = df[market_store.FIELDS].to_numpy(dtype=np.float64)
+    hlcv = np.ascontiguousarray(ohlcv[:, 1:5])
+    high, low, close, volume = hlcv.T
+    ind = se.base_indicators(high, low, close)
+    settings = {'cost': cost, 'sniper_size': config.SNIPER_PARAMS['SIZE'],
+                'stop_lookback': config.SNIPER_PARAMS['STOP_LOOKBACK'], 'cache_dir': cache_dir}
+
+    windows = build_windows(df.index, is_quarters)
+    if not windows:
+        print(f"❌ {ticker} 的歷史不足 {is_quarters} 季 (暖機後)")
+        return None
+    for w in windows: w['key'] = window_key(ohlcv, w, settings)
+    settings['windows'] = windows
+
+    tasks = all_tasks()
+    pending = [t for t in tasks if any(load_window(cache_dir, w['id'], t, w['key']) is None for w in windows)]
+    print(f"⏳ {ticker}: {len(windows)} 個視窗 (IS {is_quarters} 季 / OOS 1 季，{windows[0]['id']} ~ {windows[-1]['id']})，"
+          f"{len(tasks) * scan.combos_per_task()} 組參數，{len(pending)}/{len(tasks)} 個任務有視窗待算")
+
+    if pending:
+        arrays = {'high': high, 'low': low, 'close': close, 'volume': volume, **ind}
+        shm, shape = scan._create_shared(arrays)
+        t0 = time.perf_counter()
+        try:
+            with Pool(workers, initializer=scan._attach_shared, initargs=(shm.name, shape, settings)) as pool:
+                for i, (task, n) in enumerate(pool.imap_unordered(run_window_task, pending), 1):
+                    print(f"   [{i}/{len(pending)}] LB {task[0]} / BINS {task[1]}: {n} 個視窗 ({time.perf_counter() - t0:.1f}s)")
+        finally:
+            shm.close()
+            shm.unlink()
+
+    static = {**config.CORE_PARAMS, **{k: config.SNIPER_PARAMS[k] for k in scan.SNIPER_GRID}}
+    rows, wf_ret, static_ret, hold_ret, codes_cache = [], [], [], [], {}
+    for w in windows:
+        params, is_perf = best_params(cache_dir, w, metric)
+        oos = window_returns(hlcv, ind, params, w, cost, settings['sniper_size'], codes_cache)
+        base = window_returns(hlcv, ind, static, w, cost, settings['sniper_size'], codes_cache)
+        o0, o1 = w['oos']
+        hold = close[o0:o1] / close[o0 - 1:o1 - 1] - 1
+        wf_ret.append(oos); static_ret.append(base); hold_ret.append(hold)
+        rows.append({'window': w['id'], 'complete': w['complete'], 'is_start': str(df.index[w['is'][0]].date()),
+                     'oos_end': str(df.index[o1 - 1].date()), **params, f'is_{metric}': round(is_perf[metric], 6),
+                     'oos_return': float(np.prod(1 + oos) - 1), 'static_return': float(np.prod(1 + base) - 1),
+                     'hold_return': float(np.prod(1 + hold) - 1)})
+
+    summary = {name: {k: float(v) for k, v in se.performance(np.concatenate(r)).items()}
+               for name, r in (('walk_forward', wf_ret), ('static', static_ret), ('buy_hold', hold_ret))}
+    return {'ticker': ticker, 'metric': metric, 'is_quarters': is_quarters, 'cost': cost,
+            'windows': rows, 'summary': summary}
+
+# ==========================================
+# 5. 報告
+# ==========================================
+def report(result):
+    metric = result['metric']
+    print(f"\n📋 {result['ticker']} walk-forward (IS {result['is_quarters']} 季，依 {metric} 選參數):")
+    print(f"   {'OOS':<12}{'LB':>4}{'BINS':>5}{'VA':>6}{'ATR':>5}{'PANIC':>6}{'RSI':>4}{'Bias':>6}"
+          f"{'IS ' + metric:>11}{'OOS':>9}{'固定':>8}{'持有':>8}")
+    for r in result['windows']:
+        print(f"   {r['window']:<12}{r['LOOKBACK']:>4}{r['BINS']:>5}{r['VA_PCT']:>6.2f}{r['ATR_MULT']:>5.1f}{r['PANIC_MULT']:>6.1f}"
+              f"{r['RSI_THRESHOLD']:>4}{r['BIAS_THRESHOLD'] * 100:>5.0f}%{r[f'is_{metric}']:>11.2f}"
+              f"{r['oos_return'] * 100:>8.1f}%{r['static_return'] * 100:>7.1f}%{r['hold_return'] * 100:>7.1f}%"
+              f"{'' if r['complete'] else '  (進行中)'}")
+
+    changes = sum(scan.param_key(a) != scan.param_key(b) for a, b in zip(result['windows'], result['windows'][1:]))
+    print(f"\n📊 串接 OOS ({len(result['windows'])} 季，參數更換 {changes} 次):")
+    for name, label in (('walk_forward', 'Walk-forward'), ('static', '固定 config'), ('buy_hold', '買進持有')):
+        p = result['summary'][name]
+        print(f"   {label:<14} CAGR {p['cagr'] * 100:>6.1f}% | MDD {p['max_dd'] * 100:>6.1f}% | Calmar {p['calmar']:>5.2f} | Sharpe {p['sharpe']:>5.2f}")
+
+    current = result['windows'][-1]
+    print(f"\n👉 本季 ({current['window']} 起) 依最近 {result['is_quarters']} 季選出的參數:")
+    print("CORE_PARAMS = {" + ", ".join(f"'{k}': {current[k]}" for k in scan.GRID) + "}")
+    print("SNIPER_PARAMS 門檻: " + ", ".join(f"'{k}': {current[k]}" for k in scan.SNIPER_GRID))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward 季度健檢：滾動樣本內最佳化 + 樣本外驗證 (結果快取)")
+    parser.add_argument('--ticker', default=config.TICKER)
+    parser.add_argument('--metric', default='calmar', choices=scan.METRICS)
+    parser.add_argument('--is-quarters', type=int, default=IS_QUARTERS, help="樣本內長度 (季)")
+    parser.add_argument('--workers', type=int, default=None, help="行程數 (預設 = CPU 核心數)")
+    parser.add_argument('--cost', type=float, default=0.0, help="單邊交易成本 (例如 0.0005 = 5bps)")
+    parser.add_argument('--cache-dir', default=None, help="快取目錄，預設 scan_results/walk_forward/<ticker>")
+    parser.add_argument('--out', default=None, help="結果 JSON，預設 <快取目錄>/report_<metric>.json")
+    args = parser.parse_args()
+
+    result = walk_forward(args.ticker, args.metric, args.is_quarters, args.workers, args.cost, args.cache_dir)
+    if result:
+        report(result)
+        out = args.out or os.path.join(args.cache_dir or os.path.join(CACHE_DIR, args.ticker), f"report_{args.metric}.json")
+        os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"✅ 結果已存到 {out}")